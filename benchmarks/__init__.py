@@ -0,0 +1,37 @@
+"""Benchmarks for django-record.
+
+Benchmarks run against an in-memory sqlite database configured by
+`runtests.py`. Run them from the repository root, e.g.::
+
+    python -m benchmarks.bench_dispatch
+"""
+import os
+import sys
+import timeit
+
+
+def setup():
+    """Configures django and creates the test database.
+
+    :return: The database connection the benchmarks run against.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+
+    # Configures settings on import.
+    import runtests  # noqa
+
+    from django.db import connection
+    connection.creation.create_test_db(verbosity=0)
+    return connection
+
+
+def measure(func, number=1000, repeat=3):
+    """Returns the best seconds taken per call of the function.
+
+    :param func: The function to measure.
+    :param number: Number of calls in a single repetition.
+    :param repeat: Number of repetitions.
+    :rtype: float
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
@@ -0,0 +1,60 @@
+"""Save overhead of an unaudited model against the number of record models.
+
+Saves of models that are neither recorded nor audited should cost the same no
+matter how many record models have been registered, since recorders are only
+dispatched to the senders they care about.
+"""
+from __future__ import print_function
+
+from . import setup, measure
+
+
+RECORD_MODEL_COUNTS = [0, 10, 40, 120]
+MODULE = 'django_record.tests.models'
+
+
+def make_record_models(start, stop):
+    from django.db import models
+    from django_record.models import RecordModel
+
+    for i in range(start, stop):
+        recording_model = type('Bench{}'.format(i), (models.Model,), {
+            '__module__': MODULE,
+            'value': models.IntegerField(default=0),
+        })
+        type('Bench{}Record'.format(i), (RecordModel,), {
+            '__module__': MODULE,
+            'recording_model': recording_model,
+            'recording_fields': ['value'],
+        })
+
+
+def main():
+    connection = setup()
+
+    from django.db import models
+    from django.db.models.signals import post_save
+
+    untracked_model = type('Untracked', (models.Model,), {
+        '__module__': MODULE,
+        'value': models.IntegerField(default=0),
+    })
+    with connection.schema_editor() as editor:
+        editor.create_model(untracked_model)
+
+    instance = untracked_model.objects.create()
+    created = 0
+
+    print('record models | post_save receivers | save (us)')
+    for count in RECORD_MODEL_COUNTS:
+        make_record_models(created, count)
+        created = count
+
+        seconds = measure(instance.save)
+        print('{:>13} | {:>19} | {:>9.2f}'.format(
+            count, len(post_save.receivers), seconds * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
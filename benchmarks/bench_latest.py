@@ -0,0 +1,93 @@
+"""Latency of `latest()` against the depth of record histories.
+
+Latest records are looked up by the composite (recording, created, id) index
+of record models, so that `latest()` costs the same no matter how many records
+a recording instance has. Without the index, records of the recording instance
+are fetched by the foreign key index and sorted.
+"""
+from __future__ import print_function
+
+from datetime import datetime, timedelta
+
+from . import setup, measure
+
+
+HISTORY_DEPTHS = [10, 100, 1000, 10000]
+RECORDING_NUM = 10
+MODULE = 'django_record.tests.models'
+
+
+def make_record_model(name, index_recording_created):
+    from django.db import models
+    from django_record.models import RecordModel
+
+    recording_model = type(name, (models.Model,), {
+        '__module__': MODULE,
+        'value': models.IntegerField(default=0),
+    })
+    record_meta = type('RecordMeta', (object,), {
+        'index_recording_created': index_recording_created,
+    })
+    return type('{}Record'.format(name), (RecordModel,), {
+        '__module__': MODULE,
+        'recording_model': recording_model,
+        'recording_fields': ['value'],
+        'RecordMeta': record_meta,
+    })
+
+
+def fill_histories(record_model, depth):
+    """Fills histories of recording instances up to the depth."""
+    recording_model = record_model.recording_model
+    start = datetime(2015, 11, 9)
+
+    for recording in recording_model.objects.all():
+        count = recording.records.count()
+        record_model.objects.bulk_create([
+            record_model(recording=recording, value=i) for i in
+            range(count, depth)
+        ])
+
+    # Records are created in order, but not in the order of primary keys
+    # across recording instances.
+    for i, pk in enumerate(record_model.objects.values_list('pk', flat=True)):
+        record_model.objects.filter(pk=pk).update(
+            created=start + timedelta(seconds=i)
+        )
+
+
+def main():
+    connection = setup()
+
+    record_models = [
+        make_record_model('LatestBench', False),
+        make_record_model('IndexedLatestBench', True),
+    ]
+
+    with connection.schema_editor() as editor:
+        for record_model in record_models:
+            editor.create_model(record_model.recording_model)
+            editor.create_model(record_model)
+
+    for record_model in record_models:
+        # Bulk creation doesn't send `post_save` signals.
+        record_model.recording_model.objects.bulk_create([
+            record_model.recording_model() for _ in range(RECORDING_NUM)
+        ])
+
+    print('history depth | latest() without index (us) | '
+          'latest() with index (us)')
+    for depth in HISTORY_DEPTHS:
+        latencies = []
+
+        for record_model in record_models:
+            fill_histories(record_model, depth)
+            recording = record_model.recording_model.objects.last()
+            latencies.append(measure(recording.records.latest, number=200))
+
+        print('{:>13} | {:>27.2f} | {:>24.2f}'.format(
+            depth, latencies[0] * 1e6, latencies[1] * 1e6
+        ))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""Benchmark suite of recording overhead and history queries.
+
+Measures, on the test models:
+
+* save latency and queries per save of recorded models with different
+  recording options,
+* records written per second by `record_many()` and `record_queryset()`,
+* cost of indirect fan-outs against the number of affected recording
+  instances, and
+* latency of `latest()`, `resample()` and `as_of()` against history depth.
+
+Results are written as JSON, and compared with results of a former run to
+track regressions between releases, e.g.::
+
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --compare results.json --threshold 0.2
+
+The comparison exits with status 1 if any result got slower by more than the
+threshold.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+
+from datetime import datetime, timedelta
+
+from . import setup, measure
+
+
+FAN_OUT_CARDINALITIES = [1, 10, 100, 1000]
+HISTORY_DEPTHS = [10, 100, 1000, 10000]
+THROUGHPUT_INSTANCE_NUM = 1000
+
+# Smaller sizes for quick runs, e.g. in CI.
+QUICK_FAN_OUT_CARDINALITIES = [1, 10, 100]
+QUICK_HISTORY_DEPTHS = [10, 100, 1000]
+QUICK_THROUGHPUT_INSTANCE_NUM = 100
+
+
+class Results(object):
+    """Results of benchmarks keyed by their names and parameters."""
+    def __init__(self):
+        self.results = []
+
+    def add(self, name, value, unit, **params):
+        self.results.append({
+            'name': name,
+            'params': params,
+            'value': value,
+            'unit': unit,
+        })
+        print('{:<24} {:<48} {:>14.2f} {}'.format(
+            name, ', '.join('{}={}'.format(key, params[key]) for key in
+                            sorted(params)),
+            value, unit
+        ))
+
+    def to_dict(self):
+        import django
+
+        return {
+            'created': datetime.utcnow().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+            },
+            'results': self.results,
+        }
+
+
+def get_result_key(result):
+    return result['name'], tuple(sorted(result['params'].items()))
+
+
+def compare(results, baseline, threshold):
+    """Prints changes of results from a baseline.
+
+    Records per second get better as they grow, while anything else gets
+    better as it shrinks.
+
+    :return: Keys of results regressed by more than the threshold.
+    :rtype: list
+    """
+    baseline = dict((get_result_key(result), result) for result in
+                    baseline['results'])
+    regressions = []
+
+    print()
+    print('{:<24} {:<48} {:>10}'.format('benchmark', 'params', 'change'))
+    for result in results:
+        key = get_result_key(result)
+        if key not in baseline or not baseline[key]['value']:
+            continue
+
+        change = result['value'] / baseline[key]['value'] - 1
+        if result['unit'] == 'records/s':
+            change = -change
+
+        print('{:<24} {:<48} {:>+9.1f}%{}'.format(
+            result['name'],
+            ', '.join('{}={}'.format(*item) for item in key[1]),
+            change * 100, ' REGRESSED' if change > threshold else ''
+        ))
+        if change > threshold:
+            regressions.append(key)
+
+    return regressions
+
+
+def count_queries(connection, func):
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context)
+
+
+def bench_saves(connection, results):
+    """Save latency and queries per save of changed recording instances."""
+    from django_record.tests.models import Article, Author, Bookmark
+    from django_record.tests.models import Comment, Event, Member, Profile
+    from django_record.tests.models import Team, Vote
+
+    article = Article.objects.create(title='article')
+    comment = Comment.objects.create(article=article, point='point',
+                                     text='text', impact=0, impact_rate=0.5)
+    vote = Vote.objects.create(comment=comment, score=0)
+
+    # Each save changes a recorded field, so that every save is recorded.
+    cases = [
+        ('Author', 'plain', Author.objects.create(name='author'),
+         'reputation'),
+        ('Comment', 'properties, audited', comment, 'impact'),
+        ('Member', 'tracked, audited',
+         Member.objects.create(team=Team.objects.create(name='team'),
+                               name='member'), 'level'),
+        ('Vote', 'audited', vote, 'score'),
+        ('Bookmark', 'fingerprint',
+         Bookmark.objects.create(article=article, note='note'), 'position'),
+        ('Profile', 'delta', Profile.objects.create(), 'views'),
+        ('Event', 'partitioned', Event.objects.create(name='event'),
+         'count'),
+    ]
+
+    for model, options, instance, attname in cases:
+        def save():
+            setattr(instance, attname, getattr(instance, attname) + 1)
+            instance.save()
+
+        results.add('save_latency', measure(save, number=200) * 1e6, 'us',
+                    model=model, options=options)
+        results.add('queries_per_save', count_queries(connection, save),
+                    'queries', model=model, options=options)
+
+        def save_unchanged():
+            instance.save()
+
+        results.add('unchanged_save_latency',
+                    measure(save_unchanged, number=200) * 1e6, 'us',
+                    model=model, options=options)
+
+
+def bench_throughput(connection, results, instance_num):
+    """Records written per second by bulk recording."""
+    from django.apps import apps
+    from django_record.tests.models import Author
+
+    record_model = apps.get_model('tests', 'AuthorRecord')
+    Author.objects.bulk_create([
+        Author(name='author {}'.format(i)) for i in range(instance_num)
+    ])
+    authors = list(Author.objects.all())
+
+    seconds = measure(lambda: record_model.record_many(authors), number=1,
+                      repeat=3)
+    results.add('records_per_second', len(authors) / seconds, 'records/s',
+                method='record_many')
+
+    # Every instance has changed since the last records.
+    def record_queryset():
+        Author.objects.update(reputation=datetime.now().microsecond)
+        return record_model.record_queryset(Author.objects.all())
+
+    seconds = measure(record_queryset, number=1, repeat=3)
+    results.add('records_per_second', len(authors) / seconds, 'records/s',
+                method='record_queryset')
+
+
+def bench_fan_out(connection, results, cardinalities):
+    """Cost of saves of a relative against the number of recording instances
+    affected by it."""
+    from django_record.tests.models import Article, Comment
+
+    for cardinality in cardinalities:
+        article = Article.objects.create(title='article')
+        Comment.objects.bulk_create([
+            Comment(article=article, point='point', text='text', impact=0,
+                    impact_rate=0.5) for _ in range(cardinality)
+        ])
+        article.title = 'title 0'
+        article.save()
+
+        # Comments record titles of their articles.
+        def save():
+            article.title = 'title {}'.format(
+                int(article.title.split()[-1]) + 1
+            )
+            article.save()
+
+        number = max(1, 1000 // cardinality)
+        results.add('fan_out_latency', measure(save, number=number) * 1e6,
+                    'us', cardinality=cardinality)
+        results.add('fan_out_queries', count_queries(connection, save),
+                    'queries', cardinality=cardinality)
+
+
+def bench_history(connection, results, depths):
+    """Latency of history queries against the depth of record histories."""
+    from django.apps import apps
+    from django_record.tests.models import Author
+
+    record_model = apps.get_model('tests', 'AuthorRecord')
+    author = Author.objects.create(name='history')
+    start = datetime(2015, 11, 9)
+
+    for depth in depths:
+        count = author.records.count()
+        record_model.objects.bulk_create([
+            record_model(recording=author, name='history', reputation=i) for
+            i in range(count, depth)
+        ])
+        for i, pk in enumerate(author.records.order_by('pk')
+                               .values_list('pk', flat=True)):
+            if i >= count:
+                record_model.objects.filter(pk=pk).update(
+                    created=start + timedelta(minutes=i)
+                )
+
+        middle = start + timedelta(minutes=depth // 2)
+        queries = [
+            ('latest', lambda: author.records.latest()),
+            ('resample', lambda: list(author.records.resample('H'))),
+            ('as_of', lambda: list(author.records.as_of(middle))),
+        ]
+        for query, func in queries:
+            results.add('history_latency', measure(func, number=20) * 1e6,
+                        'us', query=query, depth=depth)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--output', help='Writes results as JSON to a file.')
+    parser.add_argument('--compare', help='Compares results with results '
+                                          'of a former run in a JSON file.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown regarded as a regression.')
+    parser.add_argument('--quick', action='store_true',
+                        help='Runs with smaller sizes.')
+    args = parser.parse_args(argv)
+
+    connection = setup()
+    results = Results()
+
+    bench_saves(connection, results)
+    bench_throughput(connection, results, QUICK_THROUGHPUT_INSTANCE_NUM if
+                     args.quick else THROUGHPUT_INSTANCE_NUM)
+    bench_fan_out(connection, results, QUICK_FAN_OUT_CARDINALITIES if
+                  args.quick else FAN_OUT_CARDINALITIES)
+    bench_history(connection, results, QUICK_HISTORY_DEPTHS if
+                  args.quick else HISTORY_DEPTHS)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results.to_dict(), f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results.results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,3 @@
 VERSION = '0.2.3'
+
+default_app_config = 'django_record.apps.DjangoRecordConfig'
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class DjangoRecordConfig(AppConfig):
+    name = 'django_record'
+    verbose_name = 'Django Record'
+
+    def ready(self):
+        from .registry import recorder_registry
+        recorder_registry.build()
@@ -0,0 +1,345 @@
+from collections import namedtuple
+
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.fields.related import OneToOneField
+
+
+# Directions of audit paths, named after the recording instance getters of
+# RecordModel.
+#
+# `related`: The `recording_model` refers to the relative, so recording
+#            instances are reached via the relative's related accessor.
+# `reverse_related`: The relative refers to the `recording_model`, so the
+#                    recording instance is reached via the relative's field.
+RELATED = 'related'
+REVERSE_RELATED = 'reverse_related'
+
+
+class AuditPath(namedtuple('AuditPath', [
+        'relative_model', 'accessor', 'direction', 'many', 'lookup',
+        'attname'])):
+    """An immutable path from a relative to instances of `recording_model`.
+
+    Attributes:
+        relative_model (class): The audited relative model.
+        accessor (str): Name of the relative's attribute leading to
+            recording instances.
+        direction (str): Either `RELATED` or `REVERSE_RELATED`.
+        many (bool): Whether the accessor gives a manager of recording
+            instances rather than a single recording instance.
+        lookup (str): Lookup of the `recording_model` to filter recording
+            instances reached from a relative.
+        attname (str): Name of the relative's attribute whose value the
+            `lookup` is filtered by.
+    """
+    __slots__ = ()
+
+    def get_filter(self, relative):
+        """Returns a filter of recording instances reached from the relative.
+
+        :param relative: An instance of the `relative_model`.
+        :return: A `Q` object, or `None` if no recording instance is reached.
+        """
+        value = getattr(relative, self.attname)
+        return None if value is None else Q(**{self.lookup: value})
+
+    def as_dict(self):
+        return {
+            'relative_model': get_label(self.relative_model),
+            'accessor': self.accessor,
+            'direction': self.direction,
+            'many': self.many,
+            'lookup': self.lookup,
+            'attname': self.attname,
+        }
+
+
+class AuditPlan(namedtuple('AuditPlan', [
+        'record_model', 'auditing_relatives', 'paths'])):
+    """An immutable audit plan of a record model.
+
+    Audit plans are compiled once after apps are ready, so that indirect effect
+    recorders don't have to walk through model metas on every save.
+
+    Attributes:
+        record_model (class): The RecordModel subclass of the plan.
+        auditing_relatives (tuple): Names of the audited relatives.
+        paths (tuple): `AuditPath`s from audited relatives to instances of the
+            `recording_model`.
+    """
+    __slots__ = ()
+
+    @property
+    def relative_models(self):
+        """A frozenset of the audited relative models."""
+        return frozenset(path.relative_model for path in self.paths)
+
+    def get_paths(self, relative_model, direction=None):
+        """Returns audit paths from the relative model.
+
+        :param relative_model: The relative model class.
+        :param direction: Only paths of the direction will be returned if
+            given.
+        :rtype: tuple
+        """
+        return tuple(
+            path for path in self.paths if
+            path.relative_model == relative_model and
+            (direction is None or path.direction == direction)
+        )
+
+    def as_dict(self):
+        """Dumps the audit plan into a dictionary of primitives."""
+        return {
+            'record_model': get_label(self.record_model),
+            'recording_model': get_label(self.record_model.recording_model),
+            'auditing_relatives': list(self.auditing_relatives),
+            'paths': [path.as_dict() for path in self.paths],
+        }
+
+
+def get_label(model):
+    return '{}.{}'.format(model._meta.app_label, model._meta.object_name)
+
+
+def get_auditing_relatives(record_model):
+    """Returns names of the relatives audited by the record model.
+
+    :param record_model: The RecordModel subclass.
+    :rtype: list
+    """
+    meta = record_model.recording_model._meta
+
+    # Audit all relatives if RecordMeta's audit_all_relatives flag is True.
+    if record_model.RecordMeta.audit_all_relatives:
+        return [
+            name for name in meta.get_all_field_names() if
+            'related' in meta.get_field_by_name(name)[0].__module__
+        ]
+
+    return list(record_model.auditing_relatives)
+
+
+def get_relative_model(record_model, name):
+    """Returns the model of an audited relative.
+
+    :param record_model: The RecordModel subclass.
+    :param name: Name of the audited relative.
+    """
+    field = record_model.recording_model._meta.get_field_by_name(name)[0]
+
+    try:
+        # Related models.
+        return field.get_path_info()[0].to_opts.model
+
+    except AttributeError:
+        # Reverse related models.
+        return field.get_reverse_path_info()[0].from_opts.model
+
+
+def get_audit_paths(recording_model, relative_model):
+    """Returns audit paths from a relative model to the recording model.
+
+    :param recording_model: The recorded model class.
+    :param relative_model: The relative model class.
+    :rtype: list
+    """
+    meta = relative_model._meta
+    paths = []
+
+    # Related objects and many to many related objects of the relative which
+    # are instances of the `recording_model`.
+    for rel in meta.get_all_related_objects() + \
+            meta.get_all_related_many_to_many_objects():
+        if rel.field.rel.is_hidden() or rel.field.model != recording_model:
+            continue
+
+        paths.append(AuditPath(
+            relative_model=relative_model,
+            accessor=rel.get_accessor_name(),
+            direction=RELATED,
+            many=not isinstance(rel.field, OneToOneField),
+            lookup=rel.field.name,
+            attname='pk'
+        ))
+
+    # Fields of the relative referring to the `recording_model`.
+    for field in meta.fields + meta.many_to_many:
+        if hasattr(field, 'get_path_info') and \
+                field.get_path_info()[-1].to_opts.model == recording_model:
+            many = field in meta.many_to_many
+            paths.append(AuditPath(
+                relative_model=relative_model,
+                accessor=field.name,
+                direction=REVERSE_RELATED,
+                many=many,
+                lookup=field.related_query_name() if many else 'pk',
+                attname='pk' if many else field.attname
+            ))
+
+    return paths
+
+
+def compile_audit_plan(record_model):
+    """Compiles an audit plan of the record model.
+
+    :param record_model: The RecordModel subclass.
+    :rtype: AuditPlan
+    """
+    auditing_relatives = get_auditing_relatives(record_model)
+    relative_models = []
+
+    for name in auditing_relatives:
+        model = get_relative_model(record_model, name)
+        if model != record_model and model not in relative_models:
+            relative_models.append(model)
+
+    paths = []
+    for model in relative_models:
+        paths.extend(get_audit_paths(record_model.recording_model, model))
+
+    return AuditPlan(
+        record_model=record_model,
+        auditing_relatives=tuple(auditing_relatives),
+        paths=tuple(paths)
+    )
+
+
+def get_expression_lookups(expression):
+    """Returns lookups an expression refers to.
+
+    :param expression: An expression or an aggregate, e.g. `Count('comments')`.
+    :return: A tuple of lookups, e.g. `('comments', )`.
+    :rtype: tuple
+    """
+    if isinstance(expression, F):
+        return (expression.name, )
+
+    lookups = ()
+    for source in expression.get_source_expressions():
+        lookups += tuple(lookup for lookup in get_expression_lookups(source) if
+                         lookup not in lookups)
+
+    return lookups
+
+
+def get_dependencies(record_model):
+    """Returns lookups each of `recording_fields` depends on.
+
+    Ordinary fields depend on themselves, and expressions on lookups they
+    refer to, while properties depend on lookups declared in
+    `RecordMeta.recording_dependencies`, e.g.
+    `{'full_name': ('first_name', 'last_name')}`. Lookups spanning relatives
+    such as `'topic__title'` are allowed.
+
+    :param record_model: The RecordModel subclass.
+    :return: A dictionary of recording field names and tuples of lookups they
+        depend on. Properties without declared dependencies are mapped to
+        `None`.
+    :rtype: dict
+    """
+    meta = record_model.recording_model._meta
+    declared = record_model.RecordMeta.recording_dependencies
+    field_names = set(field.name for field in meta.concrete_fields)
+    dependencies = {}
+
+    for name in record_model.recording_fields:
+        if name in declared:
+            dependencies[name] = tuple(declared[name])
+        elif name in record_model.recording_expressions:
+            dependencies[name] = get_expression_lookups(
+                record_model.recording_expressions[name]
+            )
+        elif name in field_names:
+            dependencies[name] = (name,)
+        else:
+            dependencies[name] = None
+
+    return dependencies
+
+
+def get_tracked_fields(record_model):
+    """Returns concrete fields of the `recording_model` to track in memory.
+
+    :param record_model: The RecordModel subclass.
+    :return: A tuple of attribute names of the concrete fields of the
+        `recording_model` that `recording_fields` depend on, or `None` if any
+        property's dependencies have not been declared.
+    :rtype: tuple
+    """
+    meta = record_model.recording_model._meta
+    tracked_fields = []
+
+    for lookups in get_dependencies(record_model).values():
+        if lookups is None:
+            return None
+
+        for lookup in lookups:
+            field, _, direct, m2m = \
+                meta.get_field_by_name(lookup.split(LOOKUP_SEP)[0])
+
+            # Only concrete fields of the recording model itself are
+            # trackable. Changes via relatives are audited instead.
+            if direct and not m2m and field.attname not in tracked_fields:
+                tracked_fields.append(field.attname)
+
+    return tuple(tracked_fields)
+
+
+def get_dependent_fields(record_model, model):
+    """Returns fields of a model that `recording_fields` depend on.
+
+    Saves with `update_fields` disjoint with those can't change any of
+    `recording_fields`, and recorders skip them.
+
+    :param record_model: The RecordModel subclass.
+    :param model: Either the `recording_model` or an audited relative model.
+    :return: A frozenset of names and attribute names of the model's fields, or
+        `None` if any property's dependencies have not been declared.
+    :rtype: frozenset
+    """
+    recording_model = record_model.recording_model
+    dependent_fields = set()
+    relative_dependent = False
+
+    for lookups in get_dependencies(record_model).values():
+        if lookups is None:
+            return None
+
+        for lookup in lookups:
+            parts = lookup.split(LOOKUP_SEP)
+            field, _, direct, m2m = \
+                recording_model._meta.get_field_by_name(parts[0])
+
+            if model == recording_model:
+                if direct and not m2m:
+                    dependent_fields.update([field.name, field.attname])
+                continue
+
+            if not field.is_relation or \
+                    get_relative_model(record_model, parts[0]) != model:
+                continue
+
+            relative_dependent = True
+
+            # Lookups of relatives themselves, e.g. counted by an aggregate,
+            # depend only on references between them.
+            if len(parts) < 2:
+                continue
+
+            field, _, direct, m2m = model._meta.get_field_by_name(parts[1])
+            if direct and not m2m:
+                dependent_fields.update([field.name, field.attname])
+
+    # Changing the relative's references to the `recording_model` changes
+    # recording instances it affects.
+    if relative_dependent:
+        for path in record_model.get_audit_plan().get_paths(
+                model, REVERSE_RELATED):
+            field = model._meta.get_field_by_name(path.accessor)[0]
+            dependent_fields.update(
+                [field.name, getattr(field, 'attname', field.name)]
+            )
+
+    return frozenset(dependent_fields)
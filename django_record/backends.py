@@ -0,0 +1,371 @@
+import atexit
+import logging
+import threading
+
+from collections import namedtuple
+
+from six.moves import queue
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection, transaction
+from django.utils.module_loading import import_string
+
+from .batch import BATCH_SUPPORTED
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'django_record.backends.SyncBackend'
+
+
+class RecordJob(namedtuple('RecordJob', [
+        'record_model', 'pk', 'values', 'created'])):
+    """Minimal data needed to record a recording instance later.
+
+    Attributes:
+        record_model (str): Label of the RecordModel subclass.
+        pk: Primary key of the recording instance.
+        values (dict): Snapshot of the recording instance's concrete fields
+            keyed by their attribute names, or `None` if the recording instance
+            should be reloaded and re-evaluated, e.g. for properties that may
+            run their own queries.
+        created (bool): Whether if the recording instance has been created.
+    """
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Jobs of the same key are run in the order they have been submitted.
+        """
+        return self.record_model, self.pk
+
+    @classmethod
+    def capture(cls, record_model, instance, created=False):
+        """Captures a job from a recording instance without any query.
+
+        :param record_model: The RecordModel subclass recording the instance.
+        :param instance: The recording instance.
+        :param created: Whether if the recording instance has been created.
+        :rtype: RecordJob
+        """
+        meta = record_model.recording_model._meta
+        fields = dict((field.name, field) for field in meta.concrete_fields)
+
+        # Snapshots are taken only if all `recording_fields` are concrete
+        # fields of the `recording_model`.
+        if all(name in fields and
+               name not in record_model.RecordMeta.recording_dependencies
+               for name in record_model.recording_fields):
+            values = dict(
+                (fields[name].attname, getattr(instance, fields[name].attname))
+                for name in record_model.recording_fields
+            )
+        else:
+            values = None
+
+        return cls(
+            record_model='{}.{}'.format(record_model._meta.app_label,
+                                        record_model._meta.object_name),
+            pk=instance.pk,
+            values=values,
+            created=created
+        )
+
+    def run(self):
+        """Records the recording instance if it has been created or changed."""
+        record_model = apps.get_model(self.record_model)
+        recording_model = record_model.recording_model
+
+        if self.values is None:
+            instance = recording_model._default_manager \
+                .filter(pk=self.pk).first()
+
+            # The recording instance has been deleted in the meantime.
+            if instance is None:
+                return
+
+        else:
+            instance = recording_model(pk=self.pk, **self.values)
+
+        record_model.record_changed(instance, self.created)
+
+
+class FanOutJob(namedtuple('FanOutJob', [
+        'record_model', 'relative_model', 'relative_pk', 'after'])):
+    """Resumable job recording instances affected by a save of a relative.
+
+    Attributes:
+        record_model (str): Label of the RecordModel subclass.
+        relative_model (str): Label of the audited relative model.
+        relative_pk: Primary key of the relative.
+        after: Only recording instances with greater primary keys are left to
+            be recorded, or `None` if none of them has been recorded yet.
+    """
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Jobs of the same key are run in the order they have been deferred.
+        """
+        return self.record_model, self.relative_model, self.relative_pk
+
+    @classmethod
+    def capture(cls, record_model, relative, after=None):
+        """Captures a job from a relative without any query.
+
+        :param record_model: The RecordModel subclass auditing the relative.
+        :param relative: The relative.
+        :param after: Primary key of the last recording instance recorded.
+        :rtype: FanOutJob
+        """
+        relative_meta = relative._meta.concrete_model._meta
+
+        return cls(
+            record_model='{}.{}'.format(record_model._meta.app_label,
+                                        record_model._meta.object_name),
+            relative_model='{}.{}'.format(relative_meta.app_label,
+                                          relative_meta.object_name),
+            relative_pk=relative.pk,
+            after=after
+        )
+
+    def run(self, limit=None):
+        """Records changed recording instances affected by the relative.
+
+        :param limit: Maximum number of recording instances to be checked for
+            changes, in whole chunks. All of them are if `None`.
+        :return: A job resuming the rest of recording instances, or `None` if
+            all of them have been recorded.
+        :rtype: FanOutJob
+        """
+        record_model = apps.get_model(self.record_model)
+        relative = apps.get_model(self.relative_model)._default_manager \
+            .filter(pk=self.relative_pk).first()
+
+        # The relative has been deleted in the meantime.
+        if relative is None:
+            return None
+
+        count = 0
+
+        for instances in record_model.iter_affected_recordings(relative,
+                                                               self.after):
+            record_model.record_many(instances, detect_changes=True)
+            count += len(instances)
+
+            if limit is not None and count >= limit:
+                return self._replace(after=instances[-1].pk)
+
+        return None
+
+
+class BaseBackend(object):
+    """Base class of recording backends.
+
+    Recording backends decide when and where recording instances get recorded
+    after recorders found them possibly changed.
+    """
+    def submit(self, record_model, instance, created=False):
+        """Submits a recording instance to be recorded if it has been created or
+        changed.
+
+        :param record_model: The RecordModel subclass recording the instance.
+        :param instance: The recording instance.
+        :param created: Whether if the recording instance has been created.
+        """
+        raise NotImplementedError
+
+    def submit_many(self, record_model, instances):
+        """Submits recording instances to be recorded if they have been
+        changed.
+
+        :param record_model: The RecordModel subclass recording the instances.
+        :param instances: The recording instances.
+        """
+        for instance in instances:
+            self.submit(record_model, instance)
+
+    def defer(self, job):
+        """Defers a `FanOutJob` to be run later.
+
+        Jobs are run right away unless backends defer them.
+
+        :param job: The job recording the rest of a fan-out.
+        """
+        while job is not None:
+            job = job.run()
+
+    def flush(self):
+        """Blocks until all submitted recording instances are recorded."""
+        pass
+
+    def shutdown(self):
+        """Flushes the backend and releases it's resources."""
+        self.flush()
+
+
+class SyncBackend(BaseBackend):
+    """Records recording instances synchronously within their save() calls.
+
+    This is the default backend, and the one to be used in tests.
+    """
+    def submit(self, record_model, instance, created=False):
+        record_model.record_changed(instance, created)
+
+    def submit_many(self, record_model, instances):
+        # Detect changes of all instances with a single query, and record the
+        # changed ones with a single `bulk_create()`.
+        record_model.record_many(instances, detect_changes=True)
+
+
+class ThreadPoolBackend(BaseBackend):
+    """Records recording instances with a bounded in-process thread pool.
+
+    Recorders only capture `RecordJob`s on save() calls, and worker threads
+    detect changes and record them off the request path. Jobs of a recording
+    instance are always run by the same worker in the order they have been
+    submitted. Deferred `FanOutJob`s are run by workers as well. Jobs of
+    transactions are submitted once they commit.
+
+    Submitting blocks when the worker's queue is full, and jobs are run
+    synchronously if the queue stays full for `timeout` seconds, so that
+    recording never falls too far behind. Pending jobs are flushed on
+    interpreter shutdown.
+
+    Args:
+        workers (int): Number of worker threads.
+        max_queue_size (int): Maximum number of pending jobs per worker.
+        timeout (float): Seconds to wait for a free slot in the queue before
+            running a job synchronously. Waits forever if `None`.
+    """
+    def __init__(self, workers=2, max_queue_size=1000, timeout=1):
+        self.timeout = timeout
+        self.queues = [queue.Queue(max_queue_size) for _ in range(workers)]
+        self.threads = []
+        self.lock = threading.Lock()
+
+        atexit.register(self.shutdown)
+
+    def submit(self, record_model, instance, created=False):
+        self.put_on_commit(RecordJob.capture(record_model, instance, created))
+
+    def defer(self, job):
+        self.put_on_commit(job)
+
+    def put_on_commit(self, job):
+        """Puts a job into a worker's queue once the current transaction
+        commits, since workers can't see rows of uncommitted transactions.
+
+        Jobs are discarded along with transactions rolled back. Jobs are run
+        synchronously within the transaction on Django versions without
+        `transaction.on_commit`, so that they're rolled back as well.
+
+        :param job: The job to be run by a worker thread.
+        """
+        if not transaction.get_connection().in_atomic_block:
+            self.put(job)
+        elif BATCH_SUPPORTED:
+            transaction.on_commit(lambda: self.put(job))
+        else:
+            job.run()
+
+    def put(self, job):
+        """Puts a job into a worker's queue, or runs it if the queue is full.
+
+        :param job: The job to be run by a worker thread.
+        """
+        self._start()
+        job_queue = self.queues[hash(job.key) % len(self.queues)]
+
+        try:
+            job_queue.put(job, timeout=self.timeout)
+        except queue.Full:
+            job.run()
+
+    def flush(self):
+        for job_queue in self.queues:
+            job_queue.join()
+
+    def shutdown(self):
+        with self.lock:
+            threads, self.threads = self.threads, []
+
+        if threads:
+            for job_queue in self.queues:
+                job_queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _start(self):
+        if self.threads:
+            return
+
+        with self.lock:
+            if not self.threads:
+                for job_queue in self.queues:
+                    thread = threading.Thread(
+                        target=self._work, args=(job_queue, )
+                    )
+                    thread.daemon = True
+                    thread.start()
+                    self.threads.append(thread)
+
+    def _work(self, job_queue):
+        try:
+            while True:
+                job = job_queue.get()
+
+                try:
+                    if job is None:
+                        return
+
+                    close_old_connections()
+                    job.run()
+
+                except Exception:
+                    logger.exception('Failed to run %r', job)
+
+                finally:
+                    job_queue.task_done()
+
+        finally:
+            connection.close()
+
+
+_backend = None
+
+
+def get_backend():
+    """Returns the recording backend configured by `RECORD_BACKEND` setting.
+
+    Example:
+        RECORD_BACKEND = {
+            'BACKEND': 'django_record.backends.ThreadPoolBackend',
+            'OPTIONS': {'workers': 4, 'max_queue_size': 10000},
+        }
+    """
+    global _backend
+
+    if _backend is None:
+        config = getattr(settings, 'RECORD_BACKEND', {})
+        backend_class = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+        _backend = backend_class(**config.get('OPTIONS', {}))
+
+    return _backend
+
+
+def reset_backend(**kwargs):
+    """Shuts the recording backend down to be reconfigured."""
+    global _backend
+
+    if kwargs.get('setting', 'RECORD_BACKEND') != 'RECORD_BACKEND':
+        return
+
+    if _backend is not None:
+        _backend.shutdown()
+        _backend = None
+
+
+setting_changed.connect(reset_backend)
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+
+# `transaction.on_commit` is available from Django 1.9.
+BATCH_SUPPORTED = hasattr(transaction, 'on_commit')
+
+
+class RecordBatch(object):
+    """Recording instances pending in a transaction.
+
+    Pending recording instances are coalesced per record model and recording
+    instance, and get recorded with a single `bulk_create()` per record model
+    when the transaction commits. Batches of transactions rolled back are
+    discarded along with their on commit callbacks.
+
+    Note that recording instances added within a savepoint rolled back are
+    still recorded on commit if the batch has been created before the
+    savepoint.
+    """
+    def __init__(self):
+        self.pending = OrderedDict()
+
+    def add(self, record_model, instance):
+        """Adds a recording instance to be recorded on commit.
+
+        :param record_model: The RecordModel subclass recording the instance.
+        :param instance: The recording instance.
+        """
+        self.pending[(record_model, instance.pk)] = instance
+
+    def flush(self):
+        """Records pending recording instances that have been changed."""
+        instances_by_record_model = OrderedDict()
+
+        for (record_model, _), instance in self.pending.items():
+            instances_by_record_model.setdefault(record_model, []) \
+                .append(instance)
+
+        self.pending.clear()
+
+        for record_model, instances in instances_by_record_model.items():
+            record_model.record_many(instances, detect_changes=True)
+
+
+def check_batch_supported(record_model):
+    """Raises `ImproperlyConfigured` if a record model batches recording in
+    transactions while `transaction.on_commit` is not available."""
+    if record_model.RecordMeta.batch_in_transaction and not BATCH_SUPPORTED:
+        raise ImproperlyConfigured(
+            '{}.{}: RecordMeta.batch_in_transaction requires Django 1.9 or '
+            'later.'.format(record_model._meta.app_label,
+                            record_model._meta.object_name)
+        )
+
+
+def in_transaction(using):
+    """Returns whether if the connection is in a transaction to batch."""
+    return transaction.get_connection(using).in_atomic_block
+
+
+def get_batch(using):
+    """Returns the record batch of the connection's current transaction.
+
+    :param using: Alias of the database connection.
+    :rtype: RecordBatch
+    """
+    connection = transaction.get_connection(using)
+    batch = getattr(connection, 'record_batch', None)
+
+    # Start a new batch if there's no batch whose flush is pending on commit of
+    # the current transaction.
+    if batch is None or not any(
+            func == batch.flush for _, func in connection.run_on_commit):
+        batch = connection.record_batch = RecordBatch()
+        transaction.on_commit(batch.flush, using=using)
+
+    return batch
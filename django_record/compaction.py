@@ -0,0 +1,288 @@
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .partitions import drop_partitions, get_partition_tables
+from .partitions import prune_partitions
+from .resampling import get_resample_sql
+
+
+# Number of recording instances whose records are compacted in a transaction.
+DEFAULT_BATCH_SIZE = 100
+
+
+class RetentionWindow(namedtuple('RetentionWindow', [
+        'since', 'until', 'rule'])):
+    """Period of records retained by a resampling rule.
+
+    Attributes:
+        since (datetime): Records created since the time are in the window, or
+            `None` if the window is unbounded.
+        until (datetime): Records created before the time are in the window.
+        rule (str): The pandas resampling rule records are downsampled to, or
+            `None` if records are deleted.
+    """
+    __slots__ = ()
+
+
+class CompactionReport(namedtuple('CompactionReport', [
+        'recordings', 'deleted'])):
+    """Records compacted in a batch of recording instances.
+
+    Attributes:
+        recordings (int): Number of recording instances in the batch.
+        deleted (int): Number of records deleted.
+    """
+    __slots__ = ()
+
+
+def get_retention_windows(record_model, now=None):
+    """Returns retention windows of a record model as of a time.
+
+    Retention policies are declared in `RecordMeta.retention` as tuples of an
+    age and a resampling rule applied to records older than the age, until the
+    age of the next policy.
+
+    :param record_model: The RecordModel subclass.
+    :param now: The datetime to be the current time.
+    :return: A list of `RetentionWindow`s, from the latest to the oldest.
+    :rtype: list
+    :raises ValueError: If the records can't be compacted.
+    """
+    if record_model.RecordMeta.delta and record_model.RecordMeta.retention:
+        raise ValueError(
+            "Delta records can't be compacted, since they're rebuilt from "
+            "their former records."
+        )
+
+    now = timezone.now() if now is None else now
+    policies = sorted(record_model.RecordMeta.retention,
+                      key=lambda policy: policy[0])
+
+    return [
+        RetentionWindow(
+            since=now - policies[i + 1][0] if i + 1 < len(policies) else None,
+            until=now - age,
+            rule=rule
+        ) for i, (age, rule) in enumerate(policies)
+    ]
+
+
+def get_delete_statements(record_model, connection, doomed_sql, since=None,
+                          until=None):
+    """Returns `DELETE` statements deleting records selected by a subquery.
+
+    Records are selected in a derived table, so that they're deleted in a
+    single statement per table even on databases which don't allow subqueries
+    on the table being deleted from. Records of partitioned record models are
+    deleted from each partition of the period.
+
+    :param record_model: The RecordModel subclass.
+    :param connection: The database connection.
+    :param doomed_sql: A subquery selecting primary keys of records alone.
+    :param since: Creation time of the earliest record selected if known.
+    :param until: Creation time of the latest record selected if known.
+    :rtype: list
+    """
+    qn = connection.ops.quote_name
+
+    return [
+        (
+            'DELETE FROM {table} WHERE {pk} IN ('
+            'SELECT * FROM ({doomed}) doomed)'
+        ).format(
+            table=qn(table),
+            pk=qn(record_model._meta.pk.column),
+            doomed=doomed_sql
+        ) for table in get_partition_tables(record_model, connection, since,
+                                            until)
+    ]
+
+
+def iter_recording_batches(records, batch_size, after=None):
+    """Yields primary keys of recording instances of records in batches.
+
+    Recording instances are looked up by the index of records on their
+    recording instances in the order of their primary keys, so that batches
+    are taken from where the former ones have been left off.
+
+    :param records: A queryset of records.
+    :param batch_size: Number of recording instances in a batch.
+    :param after: Only recording instances with greater primary keys are
+        yielded if given.
+    :return: An iterator of lists of primary keys of recording instances.
+    """
+    while True:
+        recordings = records.order_by('recording') \
+            .values_list('recording', flat=True) \
+            .distinct()
+        if after is not None:
+            recordings = recordings.filter(recording__gt=after)
+        recordings = list(recordings[:batch_size])
+
+        if not recordings:
+            return
+
+        yield recordings
+        after = recordings[-1]
+
+
+def run_batches(batches, limit=None):
+    """Runs batches of a resumable job until a number of recording instances.
+
+    :param batches: An iterator of tuples of jobs resuming the rest of batches
+        and reports of the batches, e.g. `CompactionJob.iter_batches()`.
+    :param limit: Maximum number of recording instances, in whole batches. All
+        of the batches are run if `None`.
+    :return: A tuple of a job resuming the rest of batches, or `None` if all
+        of them have been run, and a list of reports of the batches run.
+    :rtype: tuple
+    """
+    count = 0
+    reports = []
+
+    for job, report in batches:
+        reports.append(report)
+        count += report.recordings
+
+        if limit is not None and count >= limit:
+            return job, reports
+
+    return None, reports
+
+
+def get_compaction_sql(record_model, queryset, rule, since=None,
+                       until=None):
+    """Returns `DELETE` statements compacting a record queryset.
+
+    Only the last record of each recording instance in each bucket is kept,
+    or none at all if `rule` is `None`.
+
+    :param record_model: The RecordModel subclass.
+    :param queryset: A queryset of records to be compacted.
+    :param rule: The pandas resampling rule records are downsampled to.
+    :param since: Creation time of the earliest record in the queryset if
+        known.
+    :param until: Creation time of the latest record in the queryset if known.
+    :return: A tuple of the statements and their parameters.
+    :rtype: tuple
+    """
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    meta = record_model._meta
+
+    if rule is not None:
+        kept_sql, kept_params = get_resample_sql(queryset, rule,
+                                                 ('recording', ))
+        queryset = queryset.extra(
+            where=['{}.{} NOT IN ({})'.format(
+                qn(meta.db_table), qn(meta.pk.column), kept_sql
+            )],
+            params=kept_params
+        )
+
+    doomed_sql, doomed_params = queryset \
+        .order_by() \
+        .values_list('pk') \
+        .query.sql_with_params()
+
+    return get_delete_statements(record_model, connection, doomed_sql,
+                                 since, until), doomed_params
+
+
+class CompactionJob(namedtuple('CompactionJob', [
+        'record_model', 'now', 'after'])):
+    """Resumable job compacting records by retention policies of a record
+    model.
+
+    Records are compacted in batches of recording instances ordered by their
+    primary keys, each of them in a short transaction with a `DELETE` statement
+    per retention window. Compacting is idempotent, so interrupted jobs can be
+    resumed from the last batch, or run all over again.
+
+    Partitions of partitioned record models are dropped as a whole first, if
+    they've expired by a retention policy deleting records.
+
+    Attributes:
+        record_model (str): Label of the RecordModel subclass.
+        now (datetime): The time retention windows are taken as of.
+        after: Only records of recording instances with greater primary keys
+            are left to be compacted, or `None` if none of them has been
+            compacted yet.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def capture(cls, record_model, now=None, after=None):
+        """Captures a job compacting records of a record model.
+
+        :param record_model: The RecordModel subclass.
+        :param now: The datetime to be the current time.
+        :param after: Primary key of the last recording instance compacted.
+        :rtype: CompactionJob
+        """
+        return cls(
+            record_model='{}.{}'.format(record_model._meta.app_label,
+                                        record_model._meta.object_name),
+            now=timezone.now() if now is None else now,
+            after=after
+        )
+
+    def iter_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Compacts records batch by batch.
+
+        :param batch_size: Number of recording instances compacted at once.
+        :return: An iterator of tuples of jobs resuming the rest of batches and
+            `CompactionReport`s of the batches.
+        """
+        record_model = apps.get_model(self.record_model)
+        windows = get_retention_windows(record_model, self.now)
+
+        if not windows:
+            return
+
+        # Only recording instances having records old enough are compacted.
+        records = record_model.objects.filter(created__lt=windows[0].until)
+        connection = connections[records.db]
+
+        if record_model.RecordMeta.partition and windows[-1].rule is None:
+            drop_partitions(record_model, windows[-1].until, records.db)
+
+        for recordings in iter_recording_batches(records, batch_size,
+                                                 self.after):
+            deleted = 0
+
+            with transaction.atomic(using=records.db):
+                for window in windows:
+                    queryset = records.filter(recording__in=recordings,
+                                              created__lt=window.until)
+                    if window.since is not None:
+                        queryset = queryset.filter(created__gte=window.since)
+                    queryset = prune_partitions(queryset, window.since,
+                                                window.until)
+
+                    statements, params = get_compaction_sql(
+                        record_model, queryset, window.rule, window.since,
+                        window.until
+                    )
+                    with connection.cursor() as cursor:
+                        for sql in statements:
+                            cursor.execute(sql, params)
+                            deleted += cursor.rowcount
+
+            yield self._replace(after=recordings[-1]), \
+                CompactionReport(len(recordings), deleted)
+
+    def run(self, limit=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Compacts records of the record model.
+
+        :param limit: Maximum number of recording instances to be compacted,
+            in whole batches. All of them are if `None`.
+        :param batch_size: Number of recording instances compacted at once.
+        :return: A job resuming the rest of recording instances, or `None` if
+            all of them have been compacted.
+        :rtype: CompactionJob
+        """
+        return run_batches(self.iter_batches(batch_size), limit)[0]
@@ -0,0 +1,212 @@
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import connections, transaction
+
+from .compaction import DEFAULT_BATCH_SIZE
+from .compaction import get_delete_statements, iter_recording_batches
+from .compaction import run_batches
+from .partitions import get_table_sql
+from .resampling import supports_window_functions
+from .snapshots import DEFAULT_NULL_SAFE_EQUALS, NULL_SAFE_EQUALS
+
+
+def get_compared_fields(record_model):
+    """Returns names of record fields compared to find duplicate records.
+
+    :param record_model: The RecordModel subclass.
+    :return: `['fingerprint']` if records are fingerprinted, or
+        `recording_fields` otherwise.
+    :rtype: list
+    :raises ValueError: If the records can't be deduplicated.
+    """
+    if record_model.RecordMeta.delta:
+        raise ValueError(
+            "Delta records can't be deduplicated, since they're rebuilt from "
+            "their former records."
+        )
+
+    return ['fingerprint'] if record_model.RecordMeta.fingerprint else \
+        list(record_model.recording_fields)
+
+
+def get_duplicates_sql(queryset):
+    """Returns a subquery selecting primary keys of duplicate records, i.e.
+    records whose compared fields equal their former records of the same
+    recording instances.
+
+    Former records are picked by a `LAG` window function if the database
+    supports it, and by a correlated subquery otherwise. The first record of
+    each run of duplicates is never selected.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :return: A tuple of the SQL and it's parameters.
+    :rtype: tuple
+    """
+    record_model = queryset.model
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    meta = record_model._meta
+    equals = NULL_SAFE_EQUALS.get(connection.vendor, DEFAULT_NULL_SAFE_EQUALS)
+
+    columns = [qn(meta.get_field(name).column) for name in
+               get_compared_fields(record_model)]
+    pk = qn(meta.pk.column)
+    recording = qn(meta.get_field('recording').column)
+    created = qn(meta.get_field('created').column)
+
+    if supports_window_functions(connection):
+        source_sql, source_params = queryset \
+            .order_by() \
+            .values_list('pk', 'recording', 'created',
+                         *get_compared_fields(record_model)) \
+            .query.sql_with_params()
+
+        window = 'OVER (PARTITION BY source.{recording} ' \
+            'ORDER BY source.{created}, source.{pk})'.format(
+                recording=recording, created=created, pk=pk
+            )
+        sql = (
+            'SELECT compared.pk FROM ('
+            'SELECT source.{pk} AS pk, ROW_NUMBER() {window} AS position, '
+            '{columns} FROM ({source}) source'
+            ') compared WHERE compared.position > 1 AND {comparisons}'
+        ).format(
+            pk=pk,
+            window=window,
+            columns=', '.join(
+                'source.{0} AS current_{1}, LAG(source.{0}) {2} AS former_{1}'
+                .format(column, i, window) for i, column in enumerate(columns)
+            ),
+            source=source_sql,
+            comparisons=' AND '.join(
+                equals.format('compared.current_{}'.format(i),
+                              'compared.former_{}'.format(i))
+                for i in range(len(columns))
+            ) or '1 = 1',
+        )
+        return sql, source_params
+
+    source_sql, source_params = queryset \
+        .order_by() \
+        .values_list('pk') \
+        .query.sql_with_params()
+
+    table = get_table_sql(record_model, connection)
+    sql = (
+        'SELECT current.{pk} FROM {table} current '
+        'INNER JOIN {table} former ON former.{pk} = ('
+        'SELECT record.{pk} FROM {table} record '
+        'WHERE record.{recording} = current.{recording} '
+        'AND (record.{created} < current.{created} OR '
+        '(record.{created} = current.{created} AND '
+        'record.{pk} < current.{pk})) '
+        'ORDER BY record.{created} DESC, record.{pk} DESC LIMIT 1'
+        ') WHERE current.{pk} IN ({source}) AND {comparisons}'
+    ).format(
+        pk=pk,
+        table=table,
+        recording=recording,
+        created=created,
+        source=source_sql,
+        comparisons=' AND '.join(
+            equals.format('current.' + column, 'former.' + column)
+            for column in columns
+        ) or '1 = 1',
+    )
+    return sql, source_params
+
+
+class DuplicateReport(namedtuple('DuplicateReport', [
+        'recordings', 'duplicates'])):
+    """Duplicate records found in a batch of recording instances.
+
+    Attributes:
+        recordings (int): Number of recording instances in the batch.
+        duplicates (int): Number of duplicate records deleted, or to be
+            deleted in dry runs.
+    """
+    __slots__ = ()
+
+
+class DeduplicationJob(namedtuple('DeduplicationJob', [
+        'record_model', 'after'])):
+    """Resumable job deleting consecutive duplicate records of a record model.
+
+    Records are deduplicated in batches of recording instances ordered by their
+    primary keys, each of them in a short transaction with a `DELETE` statement
+    per table. Only former records of the same recording instances are
+    compared, so duplicates are found within a batch.
+
+    Attributes:
+        record_model (str): Label of the RecordModel subclass.
+        after: Only records of recording instances with greater primary keys
+            are left to be deduplicated, or `None` if none of them has been
+            deduplicated yet.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def capture(cls, record_model, after=None):
+        """Captures a job deduplicating records of a record model.
+
+        :param record_model: The RecordModel subclass.
+        :param after: Primary key of the last recording instance deduplicated.
+        :rtype: DeduplicationJob
+        """
+        return cls(
+            record_model='{}.{}'.format(record_model._meta.app_label,
+                                        record_model._meta.object_name),
+            after=after
+        )
+
+    def iter_batches(self, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        """Deduplicates records batch by batch.
+
+        :param batch_size: Number of recording instances deduplicated at once.
+        :param dry_run: Only counts duplicate records without deleting them if
+            `True`.
+        :return: An iterator of tuples of jobs resuming the rest of batches and
+            `DuplicateReport`s of the batches.
+        """
+        record_model = apps.get_model(self.record_model)
+        get_compared_fields(record_model)
+
+        records = record_model.objects.all()
+        connection = connections[records.db]
+
+        for recordings in iter_recording_batches(records, batch_size,
+                                                 self.after):
+            sql, params = get_duplicates_sql(
+                records.filter(recording__in=recordings)
+            )
+
+            if dry_run:
+                sql = 'SELECT COUNT(*) FROM ({}) duplicates'.format(sql)
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    duplicates = cursor.fetchone()[0]
+
+            else:
+                duplicates = 0
+                with transaction.atomic(using=records.db):
+                    with connection.cursor() as cursor:
+                        for statement in get_delete_statements(
+                                record_model, connection, sql):
+                            cursor.execute(statement, params)
+                            duplicates += cursor.rowcount
+
+            yield self._replace(after=recordings[-1]), \
+                DuplicateReport(len(recordings), duplicates)
+
+    def run(self, limit=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Deletes duplicate records of the record model.
+
+        :param limit: Maximum number of recording instances to be
+            deduplicated, in whole batches. All of them are if `None`.
+        :param batch_size: Number of recording instances deduplicated at once.
+        :return: A job resuming the rest of recording instances, or `None` if
+            all of them have been deduplicated.
+        :rtype: DeduplicationJob
+        """
+        return run_batches(self.iter_batches(batch_size), limit)[0]
@@ -0,0 +1,242 @@
+from collections import namedtuple
+
+from django.db import connections
+
+from .partitions import get_table_sql
+
+
+# Depth of keyframes, i.e. records storing full values.
+KEYFRAME_DEPTH = 0
+
+# Maximum number of `recording_fields` a delta mask holds, i.e. bits of a
+# signed 64-bit integer.
+MAX_DELTA_FIELDS = 63
+
+
+class RecordState(namedtuple('RecordState', ['values', 'depth'])):
+    """Full values of a record and it's depth from the former keyframe.
+
+    Attributes:
+        values (dict): `recording_fields` values of the record.
+        depth (int): Number of delta records since the former keyframe, or
+            `KEYFRAME_DEPTH` if the record is a keyframe.
+    """
+    __slots__ = ()
+
+
+def get_delta_mask(record_model, names):
+    """Returns a bitmask of recording fields stored in a delta record.
+
+    :param record_model: The RecordModel subclass.
+    :param names: Names of stored recording fields.
+    :rtype: int
+    """
+    mask = 0
+    for i, name in enumerate(record_model.recording_fields):
+        if name in names:
+            mask |= 1 << i
+    return mask
+
+
+def get_delta_names(record_model, mask):
+    """Returns names of recording fields stored in a delta record.
+
+    :param record_model: The RecordModel subclass.
+    :param mask: Bitmask of stored recording fields.
+    :rtype: list
+    """
+    return [name for i, name in enumerate(record_model.recording_fields) if
+            mask & (1 << i)]
+
+
+def get_delta(record_model, values, state):
+    """Returns values and depth of a record following a state.
+
+    Keyframes are taken every `RecordMeta.keyframe_interval` records, and delta
+    records hold only values which have been changed since the state.
+
+    :param record_model: The RecordModel subclass.
+    :param values: `recording_fields` values to be recorded.
+    :param state: `RecordState` of the latest record, or `None` if the
+        recording instance has not been recorded yet.
+    :return: A tuple of values to be stored, their delta mask and depth.
+    :rtype: tuple
+    """
+    if state is None or \
+            state.depth + 1 >= record_model.RecordMeta.keyframe_interval:
+        return values, get_delta_mask(record_model, values), KEYFRAME_DEPTH
+
+    changed = dict(
+        (name, value) for name, value in values.items() if
+        value != state.values[name]
+    )
+    return changed, get_delta_mask(record_model, changed), state.depth + 1
+
+
+def fold_states(record_model, rows):
+    """Rebuilds states of records of a recording instance.
+
+    :param record_model: The RecordModel subclass.
+    :param rows: Dictionaries of `recording_fields` values, `delta_depth` and
+        `delta_fields` of records, ordered by their creation time.
+    :return: An iterator of `RecordState`s of the records, or `None` for
+        records without a former keyframe.
+    """
+    state = None
+
+    for row in rows:
+        if row['delta_depth'] == KEYFRAME_DEPTH:
+            state = RecordState(
+                values=dict((name, row[name]) for name in
+                            record_model.recording_fields),
+                depth=KEYFRAME_DEPTH
+            )
+        elif state is not None:
+            values = dict(state.values)
+            values.update((name, row[name]) for name in
+                          get_delta_names(record_model, row['delta_fields']))
+            state = RecordState(values=values, depth=row['delta_depth'])
+
+        yield state
+
+
+def get_latest_keyframe_sql(record_model, connection, created_until=False):
+    """Returns a condition of records created since the latest keyframe of
+    their recording instances.
+
+    :param record_model: The RecordModel subclass.
+    :param connection: The database connection.
+    :param created_until: Only keyframes created until a datetime parameter
+        are considered if `True`. Records of recording instances without such
+        keyframes are not filtered out at all.
+    :rtype: str
+    """
+    qn = connection.ops.quote_name
+    meta = record_model._meta
+
+    return (
+        '{table}.{created} >= COALESCE(('
+        'SELECT keyframe.{created} FROM {source} keyframe '
+        'WHERE keyframe.{recording} = {table}.{recording} '
+        'AND keyframe.{depth} = {keyframe_depth}{until} '
+        'ORDER BY keyframe.{created} DESC, keyframe.{pk} DESC LIMIT 1'
+        '){fallback})'
+    ).format(
+        table=qn(meta.db_table),
+        source=get_table_sql(record_model, connection),
+        created=qn(meta.get_field('created').column),
+        recording=qn(meta.get_field('recording').column),
+        depth=qn(meta.get_field('delta_depth').column),
+        keyframe_depth=KEYFRAME_DEPTH,
+        pk=qn(meta.pk.column),
+        until=' AND keyframe.{} <= %s'.format(
+            qn(meta.get_field('created').column)
+        ) if created_until else '',
+        fallback=', {}.{}'.format(
+            qn(meta.db_table), qn(meta.get_field('created').column)
+        ) if created_until else ', NULL',
+    )
+
+
+def get_latest_record_states(record_model, pks):
+    """Returns states of the latest records of recording instances in a single
+    query.
+
+    Records from the latest keyframe of each recording instance on are fetched,
+    and folded into full values.
+
+    :param record_model: The RecordModel subclass.
+    :param pks: Primary keys of recording instances.
+    :return: A dictionary of primary keys of recording instances and
+        `RecordState`s of their latest records. Recording instances that have
+        not been recorded yet are left out.
+    :rtype: dict
+    """
+    queryset = record_model.objects.filter(recording__in=pks)
+    connection = connections[queryset.db]
+
+    rows = queryset \
+        .extra(where=[get_latest_keyframe_sql(record_model, connection)]) \
+        .order_by('recording', 'created', 'pk') \
+        .values('recording', 'delta_depth', 'delta_fields',
+                *record_model.recording_fields)
+
+    rows_by_recording = {}
+    for row in rows:
+        rows_by_recording.setdefault(row['recording'], []).append(row)
+
+    states = {}
+    for recording, recording_rows in rows_by_recording.items():
+        state = None
+        for state in fold_states(record_model, recording_rows):
+            pass
+        if state is not None:
+            states[recording] = state
+
+    return states
+
+
+def reconstruct_records(queryset):
+    """Fills full values of delta records in a record queryset.
+
+    Records of each recording instance are folded from the keyframe former to
+    the earliest one of them, fetched with a single query along with any
+    records in between.
+
+    :param queryset: A queryset of a RecordModel subclass storing deltas.
+    :return: A list of the records with full `recording_fields` values, in the
+        order of the queryset.
+    :rtype: list
+    """
+    record_model = queryset.model
+    records = list(queryset)
+
+    # Recording instances whose earliest records are not keyframes need
+    # records since their former keyframes.
+    earliest_records = {}
+    for record in sorted(records, key=lambda r: (r.created, r.pk)):
+        earliest_records.setdefault(record.recording_id, record)
+    pending = [record for record in earliest_records.values() if
+               record.delta_depth != KEYFRAME_DEPTH]
+
+    former_rows = []
+    if pending:
+        connection = connections[queryset.db]
+        since = min(record.created for record in pending)
+
+        # Records since the latest keyframe created until the earliest pending
+        # record. Recording instances without such keyframes have not been
+        # recorded before it, since their first records are keyframes.
+        former_rows = record_model.objects \
+            .filter(recording__in=[record.recording_id for record in pending],
+                    created__lte=max(record.created for record in pending)) \
+            .exclude(pk__in=[record.pk for record in records]) \
+            .extra(
+                where=[get_latest_keyframe_sql(record_model, connection,
+                                               created_until=True)],
+                params=[record_model._meta.get_field('created')
+                        .get_db_prep_value(since, connection)]
+            ) \
+            .values('pk', 'recording', 'created', 'delta_depth',
+                    'delta_fields', *record_model.recording_fields)
+
+    rows_by_recording = {}
+    for row in former_rows:
+        rows_by_recording.setdefault(row['recording'], []).append(row)
+    for record in records:
+        row = dict((name, getattr(record, name)) for name in
+                   record_model.recording_fields)
+        row.update(pk=record.pk, recording=record.recording_id,
+                   created=record.created, delta_depth=record.delta_depth,
+                   delta_fields=record.delta_fields, record=record)
+        rows_by_recording.setdefault(record.recording_id, []).append(row)
+
+    for rows in rows_by_recording.values():
+        rows.sort(key=lambda row: (row['created'], row['pk']))
+
+        for row, state in zip(rows, fold_states(record_model, rows)):
+            if 'record' in row and state is not None:
+                for name, value in state.values.items():
+                    setattr(row['record'], name, value)
+
+    return records
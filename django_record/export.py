@@ -0,0 +1,210 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from django.db import models
+from django.utils import timezone
+
+
+# Dtypes of record fields whose values are never null.
+DTYPES = (
+    ((models.BooleanField, ), 'bool'),
+    ((models.AutoField, models.IntegerField), 'int64'),
+    ((models.FloatField, models.DecimalField), 'float64'),
+    ((models.DateTimeField, ), 'datetime64[us]'),
+    ((models.DateField, ), 'datetime64[D]'),
+)
+
+# Dtypes standing for nullable ones that can't hold missing values.
+NULLABLE_DTYPES = {
+    'bool': 'object',
+    'int64': 'float64',
+}
+
+DEFAULT_CHUNKSIZE = 10000
+
+
+def get_default_columns(record_model):
+    """Returns names of record fields exported by default.
+
+    :param record_model: The RecordModel subclass.
+    :rtype: list
+    """
+    return ['created', 'recording'] + list(record_model.recording_fields)
+
+
+def get_dtype(field):
+    """Returns the NumPy dtype holding values of a record field.
+
+    Integers of nullable fields are held by floats to represent missing values
+    as `NaN`, and values of fields without a native dtype by objects. Foreign
+    keys are held like the fields they refer to.
+
+    :param field: A field of a RecordModel subclass.
+    :rtype: str
+    """
+    dtype = 'object'
+
+    if isinstance(field, models.ForeignKey):
+        dtype = get_dtype(field.rel.get_related_field())
+
+    for field_classes, field_dtype in DTYPES:
+        if isinstance(field, field_classes):
+            dtype = field_dtype
+            break
+
+    return NULLABLE_DTYPES.get(dtype, dtype) if field.null else dtype
+
+
+def to_array(values, field):
+    """Converts values of a record field into a NumPy array.
+
+    :param values: A sequence of values fetched from the database.
+    :param field: The record field.
+    :rtype: numpy.ndarray
+    """
+    dtype = get_dtype(field)
+
+    # NumPy doesn't take aware datetimes, so they're converted to naive ones in
+    # UTC.
+    if dtype.startswith('datetime64') and isinstance(field,
+                                                     models.DateTimeField):
+        values = [
+            timezone.make_naive(value, timezone.utc) if
+            value is not None and timezone.is_aware(value) else value
+            for value in values
+        ]
+
+    if dtype == 'float64':
+        values = [np.nan if value is None else value for value in values]
+
+    return np.array(values, dtype=dtype)
+
+
+def check_chunked_queryset(queryset):
+    """Raises an error if a record queryset can't be paginated by primary
+    keys.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :raises TypeError: If the queryset is sliced.
+    :raises ValueError: If the queryset is ordered by other than primary keys.
+    """
+    if queryset.query.low_mark or queryset.query.high_mark is not None:
+        raise TypeError('Cannot export a sliced queryset in chunks, since '
+                        'chunks are paginated by primary keys.')
+
+    order_by = list(queryset.query.order_by) + \
+        list(queryset.query.extra_order_by)
+    if order_by and order_by not in (['pk'], [queryset.model._meta.pk.name]):
+        raise ValueError('Cannot export a queryset ordered by {} in chunks, '
+                         'since rows are exported in order of primary '
+                         'keys.'.format(', '.join(order_by)))
+
+
+def iter_chunks(queryset, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Streams columns of a record queryset in chunks of rows.
+
+    Rows are fetched as tuples chunk by chunk, paginated by the primary key of
+    the last row of each chunk rather than by offsets, so that neither model
+    instances nor the whole result are held in memory. Rows are streamed in
+    order of primary keys, thus sliced querysets and ones ordered otherwise
+    are rejected.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param columns: Names of record fields to be exported. `created`,
+        `recording` and `recording_fields` are exported if `None`.
+    :param chunksize: Maximum number of rows fetched at once.
+    :return: An iterator of ordered dictionaries of column names and NumPy
+        arrays.
+    """
+    check_chunked_queryset(queryset)
+
+    columns = get_default_columns(queryset.model) if columns is None else \
+        list(columns)
+    return _iter_chunks(queryset, columns, chunksize)
+
+
+def _iter_chunks(queryset, columns, chunksize):
+    meta = queryset.model._meta
+    fields = [meta.get_field(name) for name in columns]
+
+    queryset = queryset.order_by('pk').values_list('pk', *columns)
+    last_pk = None
+
+    while True:
+        chunk = queryset if last_pk is None else \
+            queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunksize])
+
+        if not rows:
+            return
+
+        last_pk = rows[-1][0]
+        values_by_column = list(zip(*rows))[1:]
+
+        yield OrderedDict(
+            (name, to_array(values, field)) for name, values, field in
+            zip(columns, values_by_column, fields)
+        )
+
+        if len(rows) < chunksize:
+            return
+
+
+def to_arrays(queryset, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Exports columns of a record queryset into NumPy arrays.
+
+    Arrays are allocated for the number of records counted beforehand and
+    filled chunk by chunk, so that chunks aren't held in memory along with the
+    arrays. Records created while exporting are left out. Use `iter_chunks()`
+    to process records chunk by chunk instead.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param columns: Names of record fields to be exported. `created`,
+        `recording` and `recording_fields` are exported if `None`.
+    :param chunksize: Maximum number of rows fetched at once.
+    :return: An ordered dictionary of column names and NumPy arrays, ordered
+        by primary keys of records.
+    :rtype: collections.OrderedDict
+    """
+    meta = queryset.model._meta
+    columns = get_default_columns(queryset.model) if columns is None else \
+        list(columns)
+    chunks = iter_chunks(queryset, columns, chunksize)
+
+    count = queryset.count()
+    arrays = OrderedDict(
+        (name, np.empty(count, dtype=get_dtype(meta.get_field(name))))
+        for name in columns
+    )
+
+    filled = 0
+    for chunk in chunks if count else ():
+        size = 0
+        for name, values in chunk.items():
+            size = min(len(values), count - filled)
+            arrays[name][filled:filled + size] = values[:size]
+
+        filled += size
+        if not size or filled == count:
+            break
+
+    # Records deleted while exporting leave the rest of the arrays unfilled.
+    return OrderedDict(
+        (name, array[:filled]) for name, array in arrays.items()
+    )
+
+
+def to_frame(queryset, columns=None, chunksize=DEFAULT_CHUNKSIZE, index=None):
+    """Exports columns of a record queryset into a pandas DataFrame.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param columns: Names of record fields to be exported. `created`,
+        `recording` and `recording_fields` are exported if `None`.
+    :param chunksize: Maximum number of rows fetched at once.
+    :param index: Name of the column to be the index, e.g. `'created'`.
+    :rtype: pandas.DataFrame
+    """
+    frame = pd.DataFrame(to_arrays(queryset, columns, chunksize))
+    return frame if index is None else frame.set_index(index)
@@ -0,0 +1,97 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from django_record.compaction import DEFAULT_BATCH_SIZE, CompactionJob
+from django_record.compaction import run_batches
+from django_record.registry import recorder_registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Compacts records by retention policies declared in RecordMeta of '
+        'record models, in batches of recording instances.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'record_models', nargs='*', metavar='app_label.ModelName',
+            help='Record models to be compacted. All record models with '
+                 'retention policies are compacted if omitted.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Number of recording instances compacted in a transaction.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of recording instances compacted per record '
+                 'model, in whole batches.'
+        )
+        parser.add_argument(
+            '--after', default=None,
+            help='Resumes compaction of a single record model after the '
+                 'primary key of a recording instance.'
+        )
+        parser.add_argument(
+            '--now', default=None,
+            help='Takes retention windows as of an ISO 8601 datetime rather '
+                 'than the current time, e.g. to resume a compaction.'
+        )
+
+    def handle(self, *args, **options):
+        record_models = self.get_record_models(options['record_models'])
+
+        if options['after'] is not None and len(record_models) != 1:
+            raise CommandError('--after requires a single record model.')
+
+        now = None
+        if options['now'] is not None:
+            now = parse_datetime(options['now'])
+            if now is None:
+                raise CommandError(
+                    "'{}' is not a valid datetime.".format(options['now'])
+                )
+
+        for record_model in record_models:
+            job = CompactionJob.capture(record_model, now, options['after'])
+            self.compact(job, options['batch_size'], options['limit'])
+
+    def get_record_models(self, labels):
+        if not labels:
+            return [record_model for record_model in
+                    recorder_registry.record_models if
+                    record_model.RecordMeta.retention]
+
+        try:
+            record_models = [apps.get_model(label) for label in labels]
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for record_model in record_models:
+            if record_model not in recorder_registry.record_models:
+                raise CommandError('{}.{} is not a record model.'.format(
+                    record_model._meta.app_label,
+                    record_model._meta.object_name
+                ))
+
+        return record_models
+
+    def compact(self, job, batch_size, limit):
+        try:
+            remainder, reports = run_batches(job.iter_batches(batch_size),
+                                             limit)
+        except ValueError as e:
+            raise CommandError('{}: {}'.format(job.record_model, e))
+
+        self.stdout.write('{}: deleted {} records.'.format(
+            job.record_model, sum(report.deleted for report in reports)
+        ))
+
+        if remainder is not None:
+            self.stdout.write(
+                'Resume with: compact_records {} --after {} --now {}'.format(
+                    remainder.record_model, remainder.after,
+                    remainder.now.isoformat()
+                )
+            )
@@ -0,0 +1,66 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from django_record.partitions import create_partition, get_partition_bounds
+from django_record.partitions import get_partition_key
+from django_record.registry import recorder_registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates partitions of the current and upcoming periods of '
+        'partitioned record models, so that they are not created on demand '
+        'by recorders.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'record_models', nargs='*', metavar='app_label.ModelName',
+            help='Record models to be partitioned. All partitioned record '
+                 'models are if omitted.'
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=1,
+            help='Number of upcoming periods to create partitions of.'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to create partitions in.'
+        )
+
+    def handle(self, *args, **options):
+        for record_model in self.get_record_models(options['record_models']):
+            key = get_partition_key(record_model, timezone.now())
+
+            for _ in range(options['ahead'] + 1):
+                model = create_partition(record_model, key,
+                                         options['database'])
+                self.stdout.write('Created {}.'.format(model._meta.db_table))
+                key = get_partition_key(
+                    record_model, get_partition_bounds(record_model, key)[1]
+                )
+
+    def get_record_models(self, labels):
+        if not labels:
+            return [record_model for record_model in
+                    recorder_registry.record_models if
+                    record_model.RecordMeta.partition]
+
+        try:
+            record_models = [apps.get_model(label) for label in labels]
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for record_model in record_models:
+            if record_model not in recorder_registry.record_models or \
+                    not record_model.RecordMeta.partition:
+                raise CommandError(
+                    '{}.{} is not a partitioned record model.'.format(
+                        record_model._meta.app_label,
+                        record_model._meta.object_name
+                    )
+                )
+
+        return record_models
@@ -0,0 +1,93 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from django_record.compaction import DEFAULT_BATCH_SIZE, run_batches
+from django_record.dedup import DeduplicationJob
+from django_record.registry import recorder_registry
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes records identical to their former records of the same '
+        'recording instances, in batches of recording instances.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'record_models', nargs='*', metavar='app_label.ModelName',
+            help='Record models to be deduplicated. All record models not '
+                 'storing deltas are deduplicated if omitted.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Number of recording instances deduplicated in a '
+                 'transaction.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of recording instances deduplicated per '
+                 'record model, in whole batches.'
+        )
+        parser.add_argument(
+            '--after', default=None,
+            help='Resumes deduplication of a single record model after the '
+                 'primary key of a recording instance.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true', default=False,
+            help='Reports duplicate records without deleting them.'
+        )
+
+    def handle(self, *args, **options):
+        record_models = self.get_record_models(options['record_models'])
+
+        if options['after'] is not None and len(record_models) != 1:
+            raise CommandError('--after requires a single record model.')
+
+        for record_model in record_models:
+            job = DeduplicationJob.capture(record_model, options['after'])
+            self.deduplicate(job, options['batch_size'], options['limit'],
+                             options['dry_run'])
+
+    def get_record_models(self, labels):
+        if not labels:
+            return [record_model for record_model in
+                    recorder_registry.record_models if
+                    not record_model.RecordMeta.delta]
+
+        try:
+            record_models = [apps.get_model(label) for label in labels]
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for record_model in record_models:
+            if record_model not in recorder_registry.record_models:
+                raise CommandError('{}.{} is not a record model.'.format(
+                    record_model._meta.app_label,
+                    record_model._meta.object_name
+                ))
+
+        return record_models
+
+    def deduplicate(self, job, batch_size, limit, dry_run):
+        try:
+            remainder, reports = run_batches(
+                job.iter_batches(batch_size, dry_run), limit
+            )
+        except ValueError as e:
+            raise CommandError('{}: {}'.format(job.record_model, e))
+
+        self.stdout.write(
+            '{}: {} {} duplicate records of {} recording instances.'.format(
+                job.record_model, 'found' if dry_run else 'deleted',
+                sum(report.duplicates for report in reports),
+                sum(report.recordings for report in reports)
+            )
+        )
+
+        if remainder is not None:
+            self.stdout.write(
+                'Resume with: dedup_records {} --after {}'.format(
+                    remainder.record_model, remainder.after
+                )
+            )
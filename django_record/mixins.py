@@ -24,6 +24,8 @@ def register_record_model(sender, **kwargs):
     # properly mixed-in class of RecordedModelMixin.
     if (issubclass(sender, Model) and
         issubclass(sender, RecordedModelMixin) and
+        # Historical models rendered from migrations shouldn't be recorded.
+        sender.__module__ != '__fake__' and
         # Registering record models should done only once
         # in app registering process.
         not sender._meta.apps.ready):
@@ -1,16 +1,46 @@
+import operator
 import six
 
 from copy import deepcopy
+from functools import reduce
 
+from django.db import DEFAULT_DB_ALIAS
+from django.db import DatabaseError
+from django.db import connections
 from django.db import models
+from django.db import router
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_init
 from django.db.models.signals import post_save
 from django.db.models.signals import class_prepared
 
 from django.db.models.fields import Field
 from django.db.models.base import ModelBase
+from django.db.models.options import normalize_together
 from django.db.models import Model
-
+from django.utils import timezone
+
+from .audit import RELATED, REVERSE_RELATED
+from .audit import compile_audit_plan
+from .audit import get_dependent_fields
+from .audit import get_tracked_fields
+from .backends import FanOutJob, get_backend
+from .batch import check_batch_supported, get_batch, in_transaction
+from .compaction import DEFAULT_BATCH_SIZE, CompactionJob
+from .dedup import DeduplicationJob
+from .deltas import MAX_DELTA_FIELDS
+from .deltas import get_delta, get_latest_record_states
+from .partitions import PERIOD_FORMATS, route_record
+from .profiling import profile_recording_fields
 from .querysets import RecordQuerySet
+from .registry import recorder_registry
+from .snapshots import get_latest_record_pk_sql
+from .snapshots import insert_snapshots
+from .utils import chunked, fingerprint, get_comparable_value
+
+
+# Stands for deferred fields in snapshots of tracked fields.
+DEFERRED = object()
 
 
 class AbstractTimeStampedModel(Model):
@@ -41,30 +71,87 @@ class RecordModelMetaClass(ModelBase):
         # storing composite of field names and property tuples.
         attrs['recording_fields'] = []
 
+        # Expressions of recording fields computed in SQL, keyed by their
+        # names.
+        attrs['recording_expressions'] = {}
+
         # Only django models are recordable.
         assert(issubclass(recording_model, Model))
 
+        # Inherit default options of RecordMeta that are not given.
+        record_meta = attrs.get('RecordMeta', bases[0].RecordMeta)
+        if not issubclass(record_meta, bases[0].RecordMeta):
+            record_meta = attrs['RecordMeta'] = type(
+                'RecordMeta', (record_meta, bases[0].RecordMeta, object), {}
+            )
+
         for field_entry in recording_fields:
-            # recording field given in a tuple format (properties allowed).
+            # recording field given in a tuple format (properties and
+            # expressions allowed).
             if isinstance(field_entry, tuple):
-                field_name, field = field_entry
+                field_name, field = field_entry[:2]
                 assert(isinstance(field, Field))
 
+                if len(field_entry) > 2:
+                    attrs['recording_expressions'][field_name] = field_entry[2]
+
             # recording field given in ordinary format (ordinary fields).
             else:
                 field_name = field_entry
                 field = deepcopy(recording_model._meta.get_field(field_name))
 
+            # Fields left out of delta records are stored as nulls.
+            if record_meta.delta:
+                field.null = True
+
             # Register recording fields to the subclass of a
             # RecordModel and keep their names for later usage.
             attrs[field_name] = field
             attrs['recording_fields'].append(field_name)
 
+        # Register digest of recorded values to the RecordModel if records
+        # should be fingerprinted.
+        if record_meta.fingerprint:
+            assert('fingerprint' not in attrs['recording_fields'])
+            attrs['fingerprint'] = models.CharField(
+                max_length=40, db_index=True, editable=False
+            )
+
+        # Register depth from the former keyframe and bitmask of stored
+        # `recording_fields` to the RecordModel if records store deltas.
+        if record_meta.delta:
+            assert(len(attrs['recording_fields']) <= MAX_DELTA_FIELDS)
+            attrs['delta_depth'] = models.PositiveIntegerField(
+                default=0, editable=False
+            )
+            attrs['delta_fields'] = models.BigIntegerField(
+                default=0, editable=False
+            )
+
+        # Only calendar periods are supported for partitions.
+        assert(not record_meta.partition or
+               record_meta.partition in PERIOD_FORMATS)
+
         # Register foreign key to the RecordModel.
         attrs['recording'] = models.ForeignKey(
             recording_model, related_name='records'
         )
 
+        # Register indexes for lookups of records by their recording instances
+        # and creation time.
+        meta = attrs.get('Meta', bases[0].Meta)
+        index_together = [
+            tuple(fields) for fields in
+            normalize_together(getattr(meta, 'index_together', ()))
+        ]
+        if record_meta.index_recording_created:
+            index_together.append(('recording', 'created', 'id'))
+        if record_meta.index_created:
+            index_together.append(('created', ))
+        attrs['Meta'] = type('Meta', (meta, ), {
+            'index_together': index_together
+        })
+
         # Generate RecordModel subclass
         return super_new(cls, name, bases, attrs)
 
@@ -168,11 +255,17 @@ class RecordModel(six.with_metaclass(RecordModelMetaClass,
     # If you want to monitor on ordinary django model field, then it's perfectly
     # ok to just simply put the field's name instead of the tuple.
     #
+    # Derived values can also be computed in SQL rather than by properties,
+    # with tuples of a name, a field and an expression or an aggregate. Those
+    # are computed for many instances at once with `annotate()`.
+    #
     # Example: recording_fields = [
     #                                 'first_name', 'last_name',
     #                                 ('liquidity', IntegerField()),
     #                                 ('liquidity_ratio', FloatField()),
-    #                                 ('full_name', CharField(max_length=100))
+    #                                 ('full_name', CharField(max_length=100)),
+    #                                 ('friend_count', IntegerField(),
+    #                                  Count('friends'))
     #                             ]
     recording_fields = []
 
@@ -195,6 +288,110 @@ class RecordModel(six.with_metaclass(RecordModelMetaClass,
         # performance issue in large scale database.
         audit_all_relatives = False
 
+        # Cache `recording_fields` values of the latest record on recording
+        # instances, so that change detection of an instance which has been
+        # recorded or checked before doesn't need any query.
+        #
+        # Note that cached values can go stale when records of the same
+        # recording are created via other instances of it.
+        cache_latest_record = False
+
+        # Store a stable digest of recorded values in an indexed `fingerprint`
+        # column of records, so that changes are detected by comparing a
+        # single value rather than whole `recording_fields` of records.
+        fingerprint = False
+
+        # Snapshot concrete fields `recording_fields` depend on when recording
+        # instances are loaded, and skip recording of saves which didn't
+        # change any of them without a single query.
+        #
+        # Note that changes which have been made in other instances of the same
+        # row after snapshots are not noticed.
+        track_changes = False
+
+        # Lookups each property of `recording_fields` depends on. Tracking
+        # changes is possible only when dependencies of all properties are
+        # declared. Lookups spanning relatives are allowed, and changes via
+        # relatives are recorded by indirect effect recorders anyway.
+        #
+        # Example: recording_dependencies = {
+        #              'full_name': ('first_name', 'last_name'),
+        #              'father_name': ('father__first_name', ),
+        #          }
+        recording_dependencies = {}
+
+        # Collect recording instances saved in a transaction, and record changed
+        # ones with a single `bulk_create()` per record model when the
+        # transaction commits. Nothing will be recorded for transactions rolled
+        # back.
+        #
+        # Note that this requires `transaction.on_commit` of Django 1.9 or
+        # later. `ImproperlyConfigured` is raised on earlier versions.
+        batch_in_transaction = False
+
+        # Index records by their recording instances, creation time and
+        # primary keys, so that latest records and records of recording
+        # instances created in a period are looked up by the index rather than
+        # by sorting whole histories.
+        index_recording_created = True
+
+        # Index records by their creation time alone, for queries across
+        # recording instances, e.g. resampling all records.
+        index_created = False
+
+        # Number of recording instances affected by a save of a relative to be
+        # streamed and checked for changes at once.
+        fan_out_chunk_size = 500
+
+        # Maximum number of recording instances affected by a save of a
+        # relative to be recorded within the save, in whole chunks. The rest
+        # are deferred to a resumable `FanOutJob` handed to the recording
+        # backend. All of them are recorded within the save if `None`.
+        #
+        # Note that `SyncBackend` runs deferred jobs right away, so this takes
+        # effect with other backends only.
+        fan_out_limit = None
+
+        # Store only `recording_fields` values which have been changed since
+        # the former record, along with a full keyframe every
+        # `keyframe_interval` records. Full values of records are rebuilt by
+        # `RecordQuerySet.reconstruct()`.
+        #
+        # Note that stored columns of delta records are null for unchanged
+        # values, so records can't be snapshotted in SQL and resampled or
+        # exported records hold stored values only.
+        delta = False
+
+        # Number of records from a keyframe to the next one, including the
+        # keyframe, when records store deltas.
+        keyframe_interval = 10
+
+        # Retention policies of records, as tuples of an age and a pandas
+        # resampling rule. Records older than the age are downsampled to the
+        # last record of each recording instance in each bucket of the rule,
+        # until the age of the next policy. Records are deleted if the rule is
+        # `None`. Records are compacted by `compact_records()` or
+        # `compact_records` management command only.
+        #
+        # Example: retention = [
+        #              (timedelta(days=7), 'H'),
+        #              (timedelta(days=90), 'D'),
+        #              (timedelta(days=365 * 3), None),
+        #          ]
+        retention = ()
+
+        # Route records to tables of calendar periods of their creation time,
+        # either 'day', 'month' or 'year', created on demand or by
+        # `create_partitions` management command. Record querysets select from
+        # all partitions, and time filters prune partitions out of their
+        # periods. Retention policies deleting records drop whole partitions.
+        #
+        # Note that the table of the record model still holds records created
+        # before partitioning was turned on. Records are updated and deleted in
+        # the tables they're in, and deleted along with their recording
+        # instances. See `django_record.partitions`.
+        partition = None
+
     class Meta(AbstractTimeStampedModel.Meta):
         abstract = True
 
@@ -213,123 +410,786 @@ class RecordModel(six.with_metaclass(RecordModelMetaClass,
     # RecordModel Methods
     # ====================
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """
+        Saves the record, in the partition of it's creation time if the record
+        model is partitioned.
+
+        Records of partitioned record models are inserted into the partition
+        of the current time, or updated in the partition they're in, except
+        for their creation time telling the partition. Note that they're saved
+        without `pre_save` and `post_save` signals.
+
+        """
+        if not self.RecordMeta.partition:
+            return super(RecordModel, self).save(force_insert, force_update,
+                                                 using, update_fields)
+
+        using = using or router.db_for_write(type(self), instance=self)
+
+        if self._state.adding or force_insert:
+            now = timezone.now()
+            self.created = self.modified = now
+
+            model = route_record(type(self), now, using)
+            record = model(**dict(
+                (field.attname, getattr(self, field.attname)) for field in
+                self._meta.concrete_fields
+            ))
+            record.save(force_insert=True, using=using)
+
+            self.pk = record.pk
+            self._state.adding = False
+            self._state.db = using
+            return
+
+        updated = self._get_partition_queryset(using).update(**dict(
+            (field.attname, getattr(self, field.attname)) for field in
+            self._meta.concrete_fields if
+            not field.primary_key and field.name != 'created' and
+            (update_fields is None or field.name in update_fields)
+        ))
+        if not updated:
+            raise DatabaseError(
+                'Record {} is not in the partition of {}.'.format(
+                    self.pk, self.created
+                )
+            )
+
+    def delete(self, using=None, **kwargs):
+        """
+        Deletes the record, from the partition it's in if the record model is
+        partitioned.
+
+        """
+        if not self.RecordMeta.partition:
+            return super(RecordModel, self).delete(using, **kwargs)
+
+        assert self._get_pk_val() is not None, \
+            '{} object can\'t be deleted because its {} attribute is set ' \
+            'to None.'.format(self._meta.object_name, self._meta.pk.attname)
+
+        using = using or router.db_for_write(type(self), instance=self)
+        deleted = self._get_partition_queryset(using).delete()
+        self.pk = None
+        return deleted
+
+    def _get_partition_queryset(self, using):
+        # Records are told by their creation time as well as their primary
+        # keys, since primary keys may collide across partitions.
+        return type(self)._default_manager \
+            .using(using) \
+            .filter(pk=self.pk, created=self.created) \
+            .prune_partitions(self.created, self.created)
+
     @classmethod
-    def record(cls, instance):
+    def record(cls, instance, values=None):
         """
         Records an given instance of the `recording_model`.
 
+        :param instance: The recording instance.
+        :param values: `recording_fields` values of the recording instance if
+            they have been evaluated already.
         """
-        ckwargs = {name: getattr(instance, name) for name in
-                   cls.recording_fields}
-        ckwargs['recording'] = instance
-        cls.objects.create(**ckwargs)
+        if values is None:
+            values = cls.get_recording_values(instance)
+
+        state = cls.get_latest_record_states([instance.pk]) \
+            .get(instance.pk) if cls.RecordMeta.delta else None
+        cls._save_record(instance, values, state)
 
     @classmethod
-    def recording_instance_changed(cls, instance):
+    def record_changed(cls, instance, created=False):
         """
-        Check whether if any of `recording_fields` of the recording instance has
-        been changed.
+        Records an given instance of the `recording_model` if it has been
+        created or changed, right away.
+
+        `recording_fields` values of the recording instance are evaluated only
+        once, and shared by change detection and the record.
 
+        :param instance: The recording instance.
+        :param created: Whether if the recording instance has been created.
+        :return: Whether if the recording instance has been recorded.
+        :rtype: bool
         """
-        # Consider a model instance has been changed if records doesn't exist.
-        if not instance.records.exists():
-            return True
+        values = cls.get_recording_values(instance)
 
-        latest_record = instance.records.latest()
+        # The latest record's state is shared by change detection and the
+        # delta record.
+        if cls.RecordMeta.delta:
+            state = cls.get_latest_record_states([instance.pk]) \
+                .get(instance.pk)
 
-        # Compare fields of the instance with the latest record.
-        for name in cls.recording_fields:
-            if getattr(instance, name) != getattr(latest_record, name):
+            if created or cls._values_changed(
+                    values, state.values if state is not None else None):
+                cls._save_record(instance, values, state)
                 return True
 
+            return False
+
+        if created or cls.recording_instance_changed(instance, values):
+            cls.record(instance, values)
+            return True
+
         return False
 
-    # TODO: Can be potential performance bottleneck, implement in other ways
-    #       rather than in a method.
     @classmethod
-    def get_relative_models_to_audit(cls):
+    def record_many(cls, instances, detect_changes=False):
         """
-        Returns a set of all models of `recording_relatives`.
+        Records given instances of the `recording_model` with a single
+        `bulk_create()`.
 
+        :param instances: Instances of the `recording_model` to be recorded.
+        :param detect_changes: Records only changed instances if `True`.
+        :return: A list of recorded instances.
+        :rtype: list
         """
-        meta = cls.recording_model._meta
+        instances = list(instances)
+        cls.evaluate_recording_expressions(instances)
+        values_list = [cls.get_recording_values(instance) for instance in
+                       instances]
+
+        # States of the latest records are fetched with a single query if
+        # records store deltas, and reused for change detection.
+        states = cls.get_latest_record_states(
+            [instance.pk for instance in instances]
+        ) if cls.RecordMeta.delta else {}
+
+        # Detect changes of all instances with a single query.
+        if detect_changes:
+            instances, values_list = cls._filter_changed(
+                instances, values_list, dict(
+                    (pk, state.values) for pk, state in states.items()
+                ) if cls.RecordMeta.delta else None
+            )
+
+        records = []
+
+        for instance, values in zip(instances, values_list):
+            records.append(cls._make_record(instance, values,
+                                            states.get(instance.pk)))
+
+            if cls.RecordMeta.cache_latest_record:
+                cls._cache_latest_record_values(instance, values)
+
+        # Records are created with a `bulk_create()` per partition.
+        records_by_model = {}
+        for record in records:
+            records_by_model.setdefault(type(record), []).append(record)
+        for model, model_records in records_by_model.items():
+            model._default_manager.bulk_create(model_records)
+
+        return instances
 
-        # Audit all relatives if RecordMeta's audit_all_relatives flag is
-        # True.
-        if cls.RecordMeta.audit_all_relatives:
-            cls.auditing_relatives = [
-                name for name in meta.get_all_field_names() if
-                'related' in meta.get_field_by_name(name)[0].__module__
-            ]
+    @classmethod
+    def record_queryset(cls, queryset, detect_changes=True, chunk_size=500):
+        """
+        Records instances of the `recording_model` in a queryset in chunks.
+
+        Use this to record changes made by `QuerySet.update()` or
+        `bulk_create()`, which don't send `post_save` signals. Each chunk is
+        recorded with a query for change detection and a `bulk_create()`, along
+        with any queries properties of `recording_fields` make.
+
+        :param queryset: A queryset of the `recording_model`.
+        :param detect_changes: Records only changed instances if `True`.
+        :param chunk_size: Number of instances to be recorded at once.
+        :return: Number of created records.
+        :rtype: int
+        """
+        assert(queryset.model == cls.recording_model)
 
-        relative_models = set()
+        count = 0
 
-        for name in cls.auditing_relatives:
-            field = meta.get_field_by_name(name)[0]
+        for instances in chunked(queryset.iterator(), chunk_size):
+            count += len(cls.record_many(instances, detect_changes))
 
-            try:
-                # Related models.
-                model = field.get_path_info()[0].to_opts.model
+        return count
 
-            except AttributeError:
-                # Reverse related models.
-                model = field.get_reverse_path_info()[0].from_opts.model
+    @classmethod
+    def record_if_changed(cls, instance, created=False,
+                          using=DEFAULT_DB_ALIAS):
+        """
+        Records an given instance of the `recording_model` if it has been
+        created or changed.
+
+        Recording is deferred until the current transaction commits if
+        RecordMeta's `batch_in_transaction` flag is True. Otherwise the
+        recording instance is submitted to the recording backend configured by
+        `RECORD_BACKEND` setting. See `django_record.backends`.
 
-            if not model == cls:
-                relative_models.add(model)
+        """
+        check_batch_supported(cls)
 
-        return relative_models
+        if cls.RecordMeta.batch_in_transaction and in_transaction(using):
+            get_batch(using).add(cls, instance)
+
+        else:
+            get_backend().submit(cls, instance, created=created)
 
     @classmethod
-    def get_related_recording_instances(cls, relative):
+    def record_many_if_changed(cls, instances, using=DEFAULT_DB_ALIAS):
         """
-        Get related instances of the `recording_model` from a relative.
+        Records given instances of the `recording_model` which have been
+        changed, like `record_if_changed()` does for each of them.
+
+        Changes of the instances are detected together rather than one by one
+        by the default recording backend. See `recording_instances_changed()`.
 
         """
-        recording_instances = []
+        check_batch_supported(cls)
 
-        # Links to related objects.
-        related_links = [rel.get_accessor_name() for rel in
-                         relative._meta.get_all_related_objects()]
+        if cls.RecordMeta.batch_in_transaction and in_transaction(using):
+            batch = get_batch(using)
+            for instance in instances:
+                batch.add(cls, instance)
 
-        # Links to many to many related objects.
-        many_to_many_links = [rel.get_accessor_name() for rel in
-                              relative._meta
-                              .get_all_related_many_to_many_objects()]
+        else:
+            get_backend().submit_many(cls, instances)
+
+    @classmethod
+    def get_recording_values(cls, instance):
+        """
+        Returns a dictionary of `recording_fields` values of the recording
+        instance.
 
-        for link in related_links + many_to_many_links:
-            try:
-                instances = getattr(relative, link).all()
-                if instances.model == cls.recording_model:
-                    recording_instances.extend(instances)
+        Values of expressions are taken from annotations of the recording
+        instance, which are consumed so that they're never reused for another
+        recording. They're computed with a single query otherwise.
 
-            except AttributeError:
-                instance = getattr(relative, link)
-                recording_instances.append(instance)
+        """
+        cls.evaluate_recording_expressions([instance])
 
-        return recording_instances
+        return {
+            name: instance.__dict__.pop(cls.get_expression_alias(name), None)
+            if name in cls.recording_expressions else getattr(instance, name)
+            for name in cls.recording_fields
+        }
 
     @classmethod
-    def get_reverse_related_recording_instances(cls, relative):
+    def get_expression_alias(cls, name):
         """
-        Get reverse related instances of the `recording_model` from a relative.
+        Returns the alias annotating the expression of a recording field.
+
+        Aliases don't clash with properties of the `recording_model` computing
+        the same values in Python.
+
+        """
+        return '_recording_{}'.format(name)
+
+    @classmethod
+    def annotate_recording_values(cls, queryset, names=None):
+        """
+        Annotates expressions of `recording_fields` to a queryset of the
+        `recording_model` with their aliases.
+
+        :param queryset: A queryset of the `recording_model`.
+        :param names: Names of recording fields to be annotated. All of
+            expressions are annotated if `None`.
+        :rtype: QuerySet
+        """
+        names = cls.recording_expressions.keys() if names is None else names
+
+        return queryset.annotate(**{
+            cls.get_expression_alias(name): cls.recording_expressions[name]
+            for name in names
+        })
+
+    @classmethod
+    def evaluate_recording_expressions(cls, instances):
+        """
+        Computes expressions of `recording_fields` for recording instances which
+        have not been annotated with them yet, with a single query.
+
+        :param instances: Instances of the `recording_model`.
+        """
+        aliases = [cls.get_expression_alias(name) for name in
+                   cls.recording_expressions]
+        instances = [
+            instance for instance in instances if instance.pk is not None and
+            any(alias not in instance.__dict__ for alias in aliases)
+        ]
+
+        if not instances:
+            return
+
+        # Expressions are annotated on a queryset filtered only by primary
+        # keys, so that aggregates are not affected by joins of other filters.
+        annotated_values = {
+            values.pop('pk'): values for values in
+            cls.annotate_recording_values(
+                cls.recording_model._default_manager
+                .filter(pk__in=[instance.pk for instance in instances])
+            )
+            .values('pk', *aliases)
+        }
+
+        for instance in instances:
+            instance.__dict__.update(annotated_values.get(instance.pk, {}))
+
+    @classmethod
+    def get_fingerprint(cls, values):
+        """
+        Returns a stable digest of `recording_fields` values.
+
+        Values are normalized by their record fields before being digested, so
+        that fingerprints of recording instances and their records match.
+        Related instances are digested by their primary keys.
+
+        """
+        return fingerprint(
+            cls._meta.get_field(name).to_python(
+                get_comparable_value(values[name])
+            ) for name in cls.recording_fields
+        )
+
+    @classmethod
+    def profile_recording_fields(cls, instances, using=DEFAULT_DB_ALIAS):
+        """
+        Profiles evaluation of `recording_fields` of recording instances to find
+        out which properties dominate the cost of recording.
+
+        See `django_record.profiling.profile_recording_fields`.
+
+        """
+        return profile_recording_fields(cls, instances, using)
+
+    @classmethod
+    def snapshot_queryset(cls, queryset, only_changed=False):
+        """
+        Records instances of the `recording_model` in a queryset with a single
+        `INSERT ... SELECT` statement, without any model instance.
+
+        Only available when all `recording_fields` are either ordinary fields or
+        expressions, and records are not fingerprinted. See
+        `django_record.snapshots`.
+
+        :param queryset: A queryset of the `recording_model`.
+        :param only_changed: Records only instances whose values differ from
+            their latest records if `True`.
+        :return: Number of created records.
+        :rtype: int
+        """
+        assert(queryset.model == cls.recording_model)
+        return insert_snapshots(cls, queryset, only_changed)
+
+    @classmethod
+    def compact_records(cls, now=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Compacts records by retention policies of RecordMeta in batches of
+        recording instances, each of them in a short transaction. See
+        `django_record.compaction`.
+
+        :param now: The datetime to take retention windows as of.
+        :param batch_size: Number of recording instances compacted at once.
+        :return: Number of deleted records.
+        :rtype: int
+        """
+        return sum(
+            report.deleted for _, report in
+            CompactionJob.capture(cls, now).iter_batches(batch_size)
+        )
+
+    @classmethod
+    def deduplicate_records(cls, batch_size=DEFAULT_BATCH_SIZE,
+                            dry_run=False):
+        """
+        Deletes records identical to their former records of the same recording
+        instances, in batches of recording instances. Fingerprints are compared
+        if records are fingerprinted. See `django_record.dedup`.
+
+        :param batch_size: Number of recording instances deduplicated at once.
+        :param dry_run: Only counts duplicate records without deleting them if
+            `True`.
+        :return: Number of duplicate records.
+        :rtype: int
+        """
+        return sum(
+            report.duplicates for _, report in
+            DeduplicationJob.capture(cls).iter_batches(batch_size, dry_run)
+        )
+
+    @classmethod
+    def get_latest_record_values(cls, instance):
+        """
+        Returns a dictionary of `recording_fields` values of the latest record
+        of the recording instance, or `None` if it has not been recorded yet.
+
+        Only `recording_fields` columns of the latest record are fetched in a
+        single query, or none at all if the values are cached on the instance.
+
+        """
+        if cls.RecordMeta.cache_latest_record:
+            cache = getattr(instance, '_latest_record_values', {})
+            if cls in cache:
+                return cache[cls]
+
+        if cls.RecordMeta.delta:
+            state = cls.get_latest_record_states([instance.pk]) \
+                .get(instance.pk)
+            latest_values = state.values if state is not None else None
+
+        else:
+            latest_values = cls.objects \
+                .filter(recording=instance) \
+                .order_by('-created', '-pk') \
+                .values(*cls.recording_fields) \
+                .first()
+
+        if cls.RecordMeta.cache_latest_record and latest_values is not None:
+            cls._cache_latest_record_values(instance, latest_values)
+
+        return latest_values
+
+    @classmethod
+    def get_latest_record_values_in_bulk(cls, pks):
+        """
+        Returns `recording_fields` values of the latest records of many
+        recording instances in a single query.
+
+        Only fingerprints of the latest records are fetched if records are
+        fingerprinted. Values of records storing deltas are rebuilt from their
+        former keyframes.
+
+        :param pks: Primary keys of recording instances.
+        :return: A dictionary of recording instances' primary keys and
+            dictionaries of their latest records' values. Recording instances
+            that have not been recorded yet are left out.
+        :rtype: dict
+        """
+        if cls.RecordMeta.delta and not cls.RecordMeta.fingerprint:
+            return dict(
+                (pk, state.values) for pk, state in
+                cls.get_latest_record_states(pks).items()
+            )
+
+        fields = ['fingerprint'] if cls.RecordMeta.fingerprint else \
+            cls.recording_fields
+
+        connection = connections[cls.objects.db]
+        qn = connection.ops.quote_name
+        latest_record_pk_sql = get_latest_record_pk_sql(
+            cls, connection, '{}.{}'.format(
+                qn(cls._meta.db_table),
+                qn(cls._meta.get_field('recording').column)
+            )
+        )
+
+        # Each latest record is picked by a correlated subquery, so that
+        # records are ordered just like `get_latest_record_values()` does.
+        return {
+            values.pop('recording'): values for values in
+            cls.objects
+            .filter(recording__in=pks)
+            .extra(where=['{}.{} = ({})'.format(
+                qn(cls._meta.db_table), qn(cls._meta.pk.column),
+                latest_record_pk_sql
+            )])
+            .values('recording', *fields)
+        }
+
+    @classmethod
+    def get_latest_record_states(cls, pks):
+        """
+        Returns states of the latest records of many recording instances, when
+        records store deltas. See `django_record.deltas.RecordState`.
+
+        :param pks: Primary keys of recording instances.
+        :return: A dictionary of recording instances' primary keys and states
+            of their latest records. Recording instances that have not been
+            recorded yet are left out.
+        :rtype: dict
+        """
+        return get_latest_record_states(cls, pks)
+
+    @classmethod
+    def get_latest_record_fingerprint(cls, instance):
+        """
+        Returns the fingerprint of the latest record of the recording instance,
+        or `None` if it has not been recorded yet.
+
+        """
+        return cls.objects \
+            .filter(recording=instance) \
+            .order_by('-created', '-pk') \
+            .values_list('fingerprint', flat=True) \
+            .first()
+
+    @classmethod
+    def recording_instance_changed(cls, instance, values=None):
+        """
+        Check whether if any of `recording_fields` of the recording instance has
+        been changed.
+
+        :param instance: The recording instance.
+        :param values: `recording_fields` values of the recording instance if
+            they have been evaluated already.
+        :rtype: bool
+        """
+        if values is None:
+            values = cls.get_recording_values(instance)
+
+        # Compare the fingerprint of the instance with the latest record's if
+        # records are fingerprinted, unless latest values are already cached.
+        if cls.RecordMeta.fingerprint and \
+                cls not in getattr(instance, '_latest_record_values', {}):
+            return cls.get_latest_record_fingerprint(instance) != \
+                cls.get_fingerprint(values)
+
+        # Compare values of the instance with the latest record. Consider a
+        # model instance has been changed if records doesn't exist.
+        return cls._values_changed(values,
+                                   cls.get_latest_record_values(instance))
+
+    @classmethod
+    def recording_instances_changed(cls, instances):
+        """
+        Returns instances of the `recording_model` whose `recording_fields`
+        have been changed, out of given ones.
+
+        Latest records of all instances are fetched in a single query and
+        compared with the instances in memory, rather than querying them one by
+        one with `recording_instance_changed()`.
+
+        :param instances: Instances of the `recording_model`.
+        :rtype: list
+        """
+        instances = list(instances)
+        cls.evaluate_recording_expressions(instances)
+        changed_instances, _ = cls._filter_changed(instances, [
+            cls.get_recording_values(instance) for instance in instances
+        ])
+        return changed_instances
+
+    @classmethod
+    def get_tracked_fields(cls):
+        """
+        Returns a tuple of attribute names of concrete fields which are tracked
+        in memory, or `None` if changes of recording instances are not
+        trackable. See `django_record.audit.get_tracked_fields`.
+
+        """
+        if '_tracked_fields' not in cls.__dict__:
+            cls._tracked_fields = get_tracked_fields(cls)
+
+        return cls._tracked_fields
+
+    @classmethod
+    def get_dependent_fields(cls, model):
+        """
+        Returns a frozenset of names of the model's fields that
+        `recording_fields` depend on, or `None` if they are unknown. See
+        `django_record.audit.get_dependent_fields`.
 
         """
-        recording_instances = []
+        return get_dependent_fields(cls, model)
 
-        for field in relative._meta.fields:
-            if hasattr(field, 'get_path_info') and \
-                    field.get_path_info()[0].to_opts.model == \
-                    cls.recording_model:
-                try:
-                    instances = getattr(relative, field.name).all()
-                    recording_instances.extend(instances)
+    @classmethod
+    def recording_instance_dirty(cls, instance):
+        """
+        Check whether if any of tracked fields of the recording instance has
+        been changed since it's been loaded or saved, without any query.
+
+        Recording instances are always considered dirty if their changes are not
+        tracked.
+
+        """
+        snapshot = getattr(instance, '_tracked_snapshots', {}).get(cls)
 
-                except AttributeError:
-                    instance = getattr(relative, field.name)
-                    recording_instances.append(instance)
+        if snapshot is None:
+            return True
 
-        return recording_instances
+        return snapshot != cls._take_snapshot(instance)
+
+    @classmethod
+    def _take_snapshot(cls, instance):
+        return tuple(
+            instance.__dict__.get(attname, DEFERRED) for attname in
+            cls.get_tracked_fields()
+        )
+
+    @classmethod
+    def _track_changes(cls, instance):
+        if '_tracked_snapshots' not in instance.__dict__:
+            instance._tracked_snapshots = {}
+
+        instance._tracked_snapshots[cls] = cls._take_snapshot(instance)
+
+    @classmethod
+    def _filter_changed(cls, instances, values_list, latest_values=None):
+        if latest_values is None:
+            latest_values = cls.get_latest_record_values_in_bulk(
+                [instance.pk for instance in instances]
+            )
+        changed = [
+            (instance, values) for instance, values in
+            zip(instances, values_list) if
+            cls._values_changed(values, latest_values.get(instance.pk))
+        ]
+        return [instance for instance, _ in changed], \
+            [values for _, values in changed]
+
+    @classmethod
+    def _values_changed(cls, values, latest_values):
+        if latest_values is None:
+            return True
+
+        if 'fingerprint' in latest_values:
+            return cls.get_fingerprint(values) != latest_values['fingerprint']
+
+        # Latest values fetched by `values()` hold primary keys of related
+        # instances rather than the instances.
+        return any(
+            get_comparable_value(values[name]) !=
+            get_comparable_value(latest_values[name])
+            for name in cls.recording_fields
+        )
+
+    @classmethod
+    def _make_record(cls, instance, values, state=None):
+        model, kwargs = cls, {}
+
+        # Records of partitioned record models are created in the partition
+        # of their creation time.
+        if cls.RecordMeta.partition:
+            now = timezone.now()
+            model = route_record(cls, now, router.db_for_write(cls))
+            kwargs.update(created=now, modified=now)
+
+        if cls.RecordMeta.delta:
+            stored_values, mask, depth = get_delta(cls, values, state)
+            kwargs.update(delta_depth=depth, delta_fields=mask)
+            kwargs.update((name, stored_values.get(name)) for name in
+                          cls.recording_fields)
+        else:
+            kwargs.update(values)
+
+        record = model(recording=instance, **kwargs)
+
+        # Fingerprints are digests of full values even for delta records.
+        if cls.RecordMeta.fingerprint:
+            record.fingerprint = cls.get_fingerprint(values)
+
+        return record
+
+    @classmethod
+    def _save_record(cls, instance, values, state=None):
+        cls._make_record(instance, values, state).save(force_insert=True)
+
+        if cls.RecordMeta.cache_latest_record:
+            cls._cache_latest_record_values(instance, values)
+
+    @classmethod
+    def _cache_latest_record_values(cls, instance, values):
+        if '_latest_record_values' not in instance.__dict__:
+            instance._latest_record_values = {}
+
+        instance._latest_record_values[cls] = values
+
+    @classmethod
+    def get_audit_plan(cls):
+        """
+        Returns the audit plan of the record model.
+
+        Audit plan is compiled only once after apps are ready and reused on
+        every save of relatives. See `django_record.audit.AuditPlan`.
+
+        """
+        if '_audit_plan' not in cls.__dict__:
+            cls._audit_plan = compile_audit_plan(cls)
+
+            # Expose all audited relatives if RecordMeta's
+            # `audit_all_relatives` flag is True.
+            if cls.RecordMeta.audit_all_relatives:
+                cls.auditing_relatives = \
+                    list(cls._audit_plan.auditing_relatives)
+
+        return cls._audit_plan
+
+    @classmethod
+    def get_relative_models_to_audit(cls):
+        """
+        Returns a set of all models of `auditing_relatives`.
+
+        """
+        return set(cls.get_audit_plan().relative_models)
+
+    @classmethod
+    def get_affected_recordings(cls, relative, direction=None):
+        """
+        Returns a queryset of instances of the `recording_model` affected by a
+        relative.
+
+        Recording instances reached via all audit paths from the relative are
+        filtered in a single query, or none at all if no path is taken. Use
+        `values_list('pk', flat=True)` on the queryset to fetch their primary
+        keys only.
+
+        :param relative: An instance of an audited relative model.
+        :param direction: Only audit paths of the direction are taken if given.
+        :rtype: QuerySet
+        """
+        manager = cls.recording_model._default_manager
+        filters = [
+            path_filter for path_filter in (
+                path.get_filter(relative) for path in
+                cls.get_audit_plan().get_paths(
+                    relative._meta.concrete_model, direction
+                )
+            ) if path_filter is not None
+        ]
+
+        if not filters:
+            return manager.none()
+
+        queryset = manager.filter(reduce(operator.or_, filters))
+        return queryset.distinct() if len(filters) > 1 else queryset
+
+    @classmethod
+    def iter_affected_recordings(cls, relative, after=None):
+        """
+        Streams instances of the `recording_model` affected by a relative in
+        chunks of `fan_out_chunk_size`, ordered by their primary keys.
+
+        Each chunk is fetched by a query paginated by primary keys, so that
+        only chunks consumed are fetched.
+
+        :param relative: An instance of an audited relative model.
+        :param after: Only recording instances with greater primary keys are
+            streamed if given.
+        :return: An iterator of lists of recording instances.
+        """
+        queryset = cls.get_affected_recordings(relative).order_by('pk')
+        chunk_size = cls.RecordMeta.fan_out_chunk_size
+
+        while True:
+            chunk = list(
+                (queryset if after is None else
+                 queryset.filter(pk__gt=after))[:chunk_size]
+            )
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+
+            after = chunk[-1].pk
+
+    @classmethod
+    def get_related_recording_instances(cls, relative):
+        """
+        Get related instances of the `recording_model` from a relative.
+
+        """
+        return list(cls.get_affected_recordings(relative, RELATED))
+
+    @classmethod
+    def get_reverse_related_recording_instances(cls, relative):
+        """
+        Get reverse related instances of the `recording_model` from a relative.
+
+        """
+        return list(cls.get_affected_recordings(relative, REVERSE_RELATED))
 
     @classmethod
     def _register_recorder(cls):
@@ -337,17 +1197,55 @@ class RecordModel(six.with_metaclass(RecordModelMetaClass,
         Registers a recorder.
 
         """
+        track_changes = cls.RecordMeta.track_changes and \
+            cls.get_tracked_fields() is not None
+        dependent_fields = cls.get_dependent_fields(cls.recording_model)
+
         # RECORDER
-        def recorder(sender, created, instance, **kwargs):
-            # Ensure that the recorder audits and records only instances of the
-            # `recording model`.
-            if sender != cls.recording_model:
+        def recorder(sender, created, instance, update_fields=None,
+                     using=DEFAULT_DB_ALIAS, **kwargs):
+            # Skip saves which didn't update any of fields `recording_fields`
+            # depend on.
+            if not created and update_fields is not None and \
+                    dependent_fields is not None and \
+                    dependent_fields.isdisjoint(update_fields):
                 return
 
-            if created or cls.recording_instance_changed(instance):
-                cls.record(instance)
+            # Skip saves which didn't change any of tracked fields.
+            if track_changes and not created and \
+                    not cls.recording_instance_dirty(instance):
+                return
+
+            cls.record_if_changed(instance, created=created, using=using)
+
+            if track_changes:
+                cls._track_changes(instance)
 
-        post_save.connect(recorder, weak=False)
+        # CHANGE TRACKER
+        def change_tracker(sender, instance, **kwargs):
+            cls._track_changes(instance)
+
+        # PARTITION CLEANER
+        def partition_cleaner(sender, instance, using=DEFAULT_DB_ALIAS,
+                              **kwargs):
+            # Records in partitions have no database constraint on their
+            # recording instances, and no reverse relation to cascade.
+            cls._default_manager.using(using) \
+                .filter(recording=instance.pk) \
+                .delete()
+
+        # Only saves of the `recording_model` are dispatched to the recorder.
+        recorder_registry.connect(post_save, cls.recording_model, recorder)
+
+        if track_changes:
+            recorder_registry.connect(
+                post_init, cls.recording_model, change_tracker
+            )
+
+        if cls.RecordMeta.partition:
+            recorder_registry.connect(
+                post_delete, cls.recording_model, partition_cleaner
+            )
 
     @classmethod
     def _register_indirect_effect_recorder(cls):
@@ -355,40 +1253,62 @@ class RecordModel(six.with_metaclass(RecordModelMetaClass,
         Registers an indirect effect recorder.
 
         """
+        dependent_fields = {
+            model: cls.get_dependent_fields(model) for model in
+            cls.get_relative_models_to_audit()
+        }
+
         # INDIRECT EFFECT RECORDER
-        def indirect_effect_recorder(sender, instance, **kwargs):
-            # Ensure that only instances of relative models are audited and
-            # have indirect effect on recording.
-            if sender not in cls.get_relative_models_to_audit():
+        def indirect_effect_recorder(sender, instance, update_fields=None,
+                                     using=DEFAULT_DB_ALIAS, **kwargs):
+            # Skip saves which didn't update any of the relative's fields
+            # `recording_fields` depend on.
+            if update_fields is not None and \
+                    dependent_fields[sender] is not None and \
+                    dependent_fields[sender].isdisjoint(update_fields):
                 return
 
             # Set alias for readability.
             relative = instance
 
-            # Get `recording_model` instances from the relative.
-            recording_instances = \
-                cls.get_related_recording_instances(relative) + \
-                cls.get_reverse_related_recording_instances(relative)
-
-            for recording in recording_instances:
-                if cls.recording_instance_changed(recording):
-                    cls.record(recording)
-
-        post_save.connect(indirect_effect_recorder, weak=False)
+            # Stream `recording_model` instances from the relative, and record
+            # changed ones chunk by chunk until the fan-out limit is reached.
+            limit = cls.RecordMeta.fan_out_limit
+            count = 0
+            for recording_instances in cls.iter_affected_recordings(relative):
+                cls.record_many_if_changed(recording_instances, using=using)
+                count += len(recording_instances)
+
+                # Defer the rest of recording instances, if any is left.
+                if limit is not None and count >= limit:
+                    after = recording_instances[-1].pk
+                    if cls.get_affected_recordings(relative) \
+                            .filter(pk__gt=after).exists():
+                        get_backend().defer(FanOutJob.capture(
+                            cls, relative, after=after
+                        ))
+                    break
+
+        # Only saves of relative models are dispatched to the indirect effect
+        # recorder.
+        for model in cls.get_relative_models_to_audit():
+            recorder_registry.connect(
+                post_save, model, indirect_effect_recorder
+            )
 
 
 # ================================================
 # Listen for RecordModel subclass prepared signals
 # ================================================
 
-# Registers recorders for RecordModel subclasses on their `class_prepared`
-# signals.
+# Registers RecordModel subclasses to the recorder registry on their
+# `class_prepared` signals. Recorders will be connected once apps are ready.
 def register_recorders(sender, **kwargs):
     base_names = [base.__name__ for base in sender.__bases__]
     # Since the model has not been fully registered, we use 'RecordModel' rather
     # than `issubclass` function.
     if 'RecordModel' in base_names:
-        sender._register_recorder()
-        sender._register_indirect_effect_recorder()
+        check_batch_supported(sender)
+        recorder_registry.register(sender)
 
 class_prepared.connect(register_recorders, weak=False)
@@ -0,0 +1,478 @@
+import time
+
+from copy import deepcopy
+from datetime import datetime, timedelta
+
+from django.apps.registry import Apps
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db import connections, models, transaction
+from django.db.models.sql import Query
+from django.db.models.sql.datastructures import BaseTable
+from django.utils import timezone
+
+
+# Formats of partition keys of periods, which are suffixes of partition
+# tables as well.
+PERIOD_FORMATS = {
+    'day': '%Y%m%d',
+    'month': '%Y%m',
+    'year': '%Y',
+}
+
+# Seconds to cache partition tables found in the database. Partitions created
+# or dropped by other processes are noticed after the timeout.
+PARTITION_CACHE_TIMEOUT = 60
+
+# Registry of partition models, apart from the global one so that they're
+# never picked up by migrations or reverse relations of recording models.
+partition_apps = Apps()
+
+_partition_models = {}
+_partition_keys = {}
+_seeded_partitions = set()
+
+
+def normalize_datetime(value):
+    """Returns a naive datetime in UTC, or as it is if it's naive already."""
+    if value is not None and timezone.is_aware(value):
+        value = timezone.make_naive(value, timezone.utc)
+    return value
+
+
+def get_partition_key(record_model, created):
+    """Returns the key of the partition of records created at a time.
+
+    :param record_model: The partitioned RecordModel subclass.
+    :param created: Creation time of records.
+    :rtype: str
+    """
+    return normalize_datetime(created) \
+        .strftime(PERIOD_FORMATS[record_model.RecordMeta.partition])
+
+
+def get_partition_bounds(record_model, key):
+    """Returns the period of a partition.
+
+    :param record_model: The partitioned RecordModel subclass.
+    :param key: The partition key.
+    :return: A tuple of naive datetimes of the start of the period and the
+        start of the next period.
+    :rtype: tuple
+    """
+    period = record_model.RecordMeta.partition
+    start = datetime.strptime(key, PERIOD_FORMATS[period])
+
+    if period == 'day':
+        end = start + timedelta(days=1)
+    elif period == 'month':
+        end = start.replace(year=start.year + start.month // 12,
+                            month=start.month % 12 + 1)
+    else:
+        end = start.replace(year=start.year + 1)
+
+    return start, end
+
+
+def get_partition_table(record_model, key):
+    """Returns the table name of a partition."""
+    return '{}_{}'.format(record_model._meta.db_table, key)
+
+
+def get_partition_model(record_model, key):
+    """Returns the model of a partition.
+
+    Partition models have the same fields as the record model, except that
+    relations have neither reverse accessors nor database constraints, and
+    creation time is given rather than set on save.
+
+    :param record_model: The partitioned RecordModel subclass.
+    :param key: The partition key.
+    :rtype: class
+    """
+    if (record_model, key) in _partition_models:
+        return _partition_models[(record_model, key)]
+
+    meta = record_model._meta
+    attrs = {'__module__': record_model.__module__}
+
+    for field in meta.local_fields:
+        field = deepcopy(field)
+
+        if field.is_relation:
+            field.rel.related_name = '+'
+            field.db_constraint = False
+        if field.name in ('created', 'modified'):
+            field.auto_now = field.auto_now_add = False
+
+        attrs[field.name] = field
+
+    attrs['Meta'] = type('Meta', (object, ), {
+        'apps': partition_apps,
+        'app_label': meta.app_label,
+        'db_table': get_partition_table(record_model, key),
+        'index_together': meta.index_together,
+    })
+
+    model = type(str('{}{}'.format(meta.object_name, key)),
+                 (models.Model, ), attrs)
+    _partition_models[(record_model, key)] = model
+    return model
+
+
+def get_partition_keys(record_model, connection, refresh=False):
+    """Returns sorted keys of partitions of a record model in the database.
+
+    Partition tables are looked up in the database once in
+    `PARTITION_CACHE_TIMEOUT` seconds.
+
+    :param record_model: The partitioned RecordModel subclass.
+    :param connection: The database connection.
+    :param refresh: Looks partition tables up right away if `True`.
+    :rtype: list
+    """
+    cache_key = (connection.alias, record_model)
+    cached = _partition_keys.get(cache_key)
+
+    if not refresh and cached is not None and \
+            time.time() - cached[0] < PARTITION_CACHE_TIMEOUT:
+        return cached[1]
+
+    prefix = get_partition_table(record_model, '')
+    keys = []
+
+    for table in connection.introspection.table_names():
+        if not table.startswith(prefix):
+            continue
+
+        key = table[len(prefix):]
+        try:
+            datetime.strptime(key, PERIOD_FORMATS[
+                record_model.RecordMeta.partition
+            ])
+        except ValueError:
+            continue
+        keys.append(key)
+
+    keys.sort()
+    _partition_keys[cache_key] = (time.time(), keys)
+    return keys
+
+
+def get_partition_tables(record_model, connection, since=None, until=None):
+    """Returns tables holding records of a record model created in a period.
+
+    The table of the record model itself is the default partition holding any
+    records that have not been routed to partitions, e.g. records created
+    before partitioning was turned on, so it's never pruned.
+
+    :param record_model: The RecordModel subclass.
+    :param connection: The database connection.
+    :param since: Partitions of periods ending at or before the time are
+        pruned if given.
+    :param until: Partitions of periods starting after the time are pruned if
+        given.
+    :rtype: list
+    """
+    tables = [record_model._meta.db_table]
+
+    if not record_model.RecordMeta.partition:
+        return tables
+
+    since, until = normalize_datetime(since), normalize_datetime(until)
+
+    for key in get_partition_keys(record_model, connection):
+        start, end = get_partition_bounds(record_model, key)
+
+        if since is not None and end <= since or \
+                until is not None and start > until:
+            continue
+        tables.append(get_partition_table(record_model, key))
+
+    return tables
+
+
+def get_table_sql(record_model, connection, since=None, until=None):
+    """Returns SQL of a table of records of a record model created in a
+    period, to be selected from.
+
+    Partition tables are concatenated by `UNION ALL` if the record model is
+    partitioned. See `get_partition_tables()`.
+
+    :rtype: str
+    """
+    qn = connection.ops.quote_name
+    tables = get_partition_tables(record_model, connection, since, until)
+
+    if len(tables) == 1:
+        return qn(tables[0])
+
+    columns = ', '.join(qn(field.column) for field in
+                        record_model._meta.concrete_fields)
+    return '({})'.format(' UNION ALL '.join(
+        'SELECT {} FROM {}'.format(columns, qn(table)) for table in tables
+    ))
+
+
+def get_greatest_pk(record_model, connection):
+    """Returns the greatest primary key of records of a record model in any
+    partition, or `None` if there's no record."""
+    qn = connection.ops.quote_name
+    pk = qn(record_model._meta.pk.column)
+
+    # Each table is looked up by it's primary key index on it's own.
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT MAX(greatest.pk) FROM ({}) greatest'.format(
+            ' UNION ALL '.join(
+                'SELECT MAX({}) AS pk FROM {}'.format(pk, qn(table)) for
+                table in get_partition_tables(record_model, connection)
+            )
+        ))
+        return cursor.fetchone()[0]
+
+
+def set_sequence_start(connection, model, value):
+    """Makes primary keys of a model's table generated after a value, unless
+    they're generated after a greater one already."""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = MAX(seq, %s) '
+                'WHERE name = %s', [value, table]
+            )
+            if not cursor.rowcount:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [table, value]
+                )
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_get_serial_sequence(%s, %s)',
+                           [qn(table), model._meta.pk.column])
+            sequence = cursor.fetchone()[0]
+            cursor.execute(
+                'SELECT setval(%s, GREATEST(%s, last_value)) FROM {}'.format(
+                    sequence
+                ), [sequence, value]
+            )
+        elif connection.vendor == 'mysql':
+            # MySQL never lowers the counter below the greatest primary key.
+            cursor.execute('ALTER TABLE {} AUTO_INCREMENT = {}'.format(
+                qn(table), int(value) + 1
+            ))
+
+
+def seed_partition(record_model, key, using=DEFAULT_DB_ALIAS):
+    """Makes primary keys of a partition generated after the greatest primary
+    key of records of the record model.
+
+    :param record_model: The partitioned RecordModel subclass.
+    :param key: The partition key.
+    :param using: Alias of the database connection.
+    """
+    connection = connections[using]
+
+    # Partitions created by other processes are looked up as well.
+    get_partition_keys(record_model, connection, refresh=True)
+    greatest_pk = get_greatest_pk(record_model, connection)
+
+    if greatest_pk:
+        set_sequence_start(connection,
+                           get_partition_model(record_model, key),
+                           greatest_pk)
+
+
+def create_partition(record_model, key, using=DEFAULT_DB_ALIAS):
+    """Creates the table of a partition unless it exists.
+
+    Primary keys of the partition are generated after the greatest primary key
+    of records of the record model, and again once records are routed to the
+    partition, since partitions created ahead of time are seeded before the
+    records of the current partition. Primary keys are unique across
+    partitions as long as records are created only in the latest partition.
+
+    :param record_model: The partitioned RecordModel subclass.
+    :param key: The partition key.
+    :param using: Alias of the database connection.
+    :return: The partition model.
+    :rtype: class
+    """
+    connection = connections[using]
+    model = get_partition_model(record_model, key)
+
+    if key in get_partition_keys(record_model, connection):
+        return model
+
+    # Partitions may have been created by other processes in the meantime.
+    try:
+        with transaction.atomic(using=using):
+            with connection.schema_editor() as editor:
+                editor.create_model(model)
+            seed_partition(record_model, key, using)
+    except DatabaseError:
+        if key not in get_partition_keys(record_model, connection,
+                                         refresh=True):
+            raise
+
+    get_partition_keys(record_model, connection, refresh=True)
+    return model
+
+
+def route_record(record_model, created, using=DEFAULT_DB_ALIAS):
+    """Returns the model of the partition records created at a time go to,
+    creating it's table if needed.
+
+    Partitions are seeded once per process when records are first routed to
+    them. See `create_partition()`.
+
+    :rtype: class
+    """
+    key = get_partition_key(record_model, created)
+    model = create_partition(record_model, key, using)
+
+    if (using, record_model, key) not in _seeded_partitions:
+        seed_partition(record_model, key, using)
+        _seeded_partitions.add((using, record_model, key))
+
+    return model
+
+
+def drop_partitions(record_model, before, using=DEFAULT_DB_ALIAS):
+    """Drops partitions of periods ending at or before a time.
+
+    :param record_model: The partitioned RecordModel subclass.
+    :param before: The time records created before are dropped.
+    :param using: Alias of the database connection.
+    :return: Keys of dropped partitions.
+    :rtype: list
+    """
+    connection = connections[using]
+    before = normalize_datetime(before)
+    keys = [
+        key for key in get_partition_keys(record_model, connection,
+                                          refresh=True)
+        if get_partition_bounds(record_model, key)[1] <= before
+    ]
+
+    for key in keys:
+        with connection.schema_editor() as editor:
+            editor.delete_model(get_partition_model(record_model, key))
+        _seeded_partitions.discard((using, record_model, key))
+
+    get_partition_keys(record_model, connection, refresh=True)
+    return keys
+
+
+class PartitionTable(BaseTable):
+    """Base table of record querysets selecting from partitions of records
+    created in the partition range of their queries, or from the partition
+    table of their queries alone if given."""
+    def as_sql(self, compiler, connection):
+        since, until = getattr(compiler.query, 'partition_range',
+                               (None, None))
+        table = getattr(compiler.query, 'partition_table', None)
+        table_sql = get_table_sql(compiler.query.model, connection, since,
+                                  until) if table is None else \
+            connection.ops.quote_name(table)
+
+        if table_sql == connection.ops.quote_name(self.table_name):
+            return super(PartitionTable, self).as_sql(compiler, connection)
+
+        return '{} {}'.format(
+            table_sql, compiler.quote_name_unless_alias(self.table_alias)
+        ), []
+
+
+class PartitionedQuery(Query):
+    """Query of records of a partitioned record model.
+
+    Records are selected from the partitions of records created in the
+    `partition_range` of the query, and the table of the record model, or
+    from the `partition_table` alone if given. Updates and deletes are made in
+    each of the tables by `get_partition_querysets()`.
+    """
+    partition_range = (None, None)
+    partition_table = None
+
+    def clone(self, *args, **kwargs):
+        obj = super(PartitionedQuery, self).clone(*args, **kwargs)
+        obj.partition_range = self.partition_range
+        obj.partition_table = self.partition_table
+        return obj
+
+    def get_initial_alias(self):
+        alias = super(PartitionedQuery, self).get_initial_alias()
+        table = self.alias_map[alias]
+
+        if type(table) is BaseTable and \
+                table.table_name == self.get_meta().db_table:
+            self.alias_map[alias] = PartitionTable(table.table_name,
+                                                   table.table_alias)
+
+        return alias
+
+
+def prune_partitions(queryset, since=None, until=None):
+    """Narrows the partition range of a record queryset.
+
+    Partitions of records created out of the range are not selected from.
+    Records should be filtered by the range as well, since partitions are
+    pruned by whole periods.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param since: Records created before the time are pruned if given.
+    :param until: Records created after the time are pruned if given.
+    :rtype: QuerySet
+    """
+    if not isinstance(queryset.query, PartitionedQuery):
+        return queryset
+
+    queryset = queryset._clone()
+    former_since, former_until = queryset.query.partition_range
+
+    if former_since is not None:
+        since = former_since if since is None else max(since, former_since)
+    if former_until is not None:
+        until = former_until if until is None else min(until, former_until)
+
+    queryset.query.partition_range = (since, until)
+    return queryset
+
+
+def get_partition_querysets(queryset):
+    """Returns querysets of each table holding records of a partitioned record
+    queryset, to update or delete the records with.
+
+    Records are selected from each table on it's own, so that records of
+    different tables are never mistaken for each other even if their primary
+    keys collide. The selected primary keys are wrapped in a derived table, so
+    that they're selected even on databases which don't allow subqueries on the
+    table being updated.
+
+    :param queryset: A queryset of a partitioned RecordModel subclass.
+    :return: A list of querysets of the record model and partition models.
+    :rtype: list
+    """
+    record_model = queryset.model
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    since, until = queryset.query.partition_range
+    prefix = get_partition_table(record_model, '')
+    querysets = []
+
+    for table in get_partition_tables(record_model, connection, since, until):
+        selected = queryset.order_by().values_list('pk')
+        selected.query.partition_table = table
+        sql, params = selected.query.sql_with_params()
+
+        model = record_model if table == record_model._meta.db_table else \
+            get_partition_model(record_model, table[len(prefix):])
+        querysets.append(model._base_manager.using(queryset.db).extra(
+            where=['{} IN (SELECT * FROM ({}) selected)'.format(
+                qn(record_model._meta.pk.column), sql
+            )],
+            params=params
+        ))
+
+    return querysets
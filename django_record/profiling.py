@@ -0,0 +1,67 @@
+import time
+
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class FieldProfile(namedtuple('FieldProfile', [
+        'name', 'calls', 'seconds', 'queries'])):
+    """Cost of evaluating a recording field of recording instances.
+
+    Attributes:
+        name (str): Name of the recording field.
+        calls (int): Number of recording instances the field is evaluated on.
+        seconds (float): Total seconds spent on evaluating the field.
+        queries (int): Total number of queries the field made.
+    """
+    __slots__ = ()
+
+
+def profile_recording_fields(record_model, instances, using=DEFAULT_DB_ALIAS):
+    """Profiles evaluation of `recording_fields` of recording instances.
+
+    Each field is evaluated just like recording does, while counting time and
+    queries it takes. Ordinary fields are free, whereas properties may run
+    queries of their own. Expressions are computed for all instances with a
+    single query.
+
+    Example:
+        >>> for profile in profile_recording_fields(
+        ...         CommentRecord, Comment.objects.all()[:100]):
+        ...     print(profile)
+        FieldProfile(name='related_property', calls=100, seconds=0.0711, ...)
+
+    :param record_model: The RecordModel subclass.
+    :param instances: Instances of the `recording_model`.
+    :param using: Alias of the database connection to count queries of.
+    :return: A list of `FieldProfile`s, the most expensive one first.
+    :rtype: list
+    """
+    instances = list(instances)
+    pks = [instance.pk for instance in instances]
+    profiles = []
+
+    for name in record_model.recording_fields:
+        with CaptureQueriesContext(connections[using]) as context:
+            started = time.time()
+            if name in record_model.recording_expressions:
+                list(record_model.annotate_recording_values(
+                    record_model.recording_model._default_manager
+                    .filter(pk__in=pks), [name]
+                ).values_list('pk'))
+            else:
+                for instance in instances:
+                    getattr(instance, name)
+            seconds = time.time() - started
+
+        profiles.append(FieldProfile(
+            name=name,
+            calls=len(instances),
+            seconds=seconds,
+            queries=len(context.captured_queries)
+        ))
+
+    return sorted(profiles, key=lambda profile: profile.seconds, reverse=True)
@@ -1,9 +1,15 @@
 from datetime import timedelta
 
+from django.db import transaction
 from django.db.models import QuerySet
 from django.utils.timezone import datetime
 
-from .utils import resample_records
+from .deltas import reconstruct_records
+from .export import DEFAULT_CHUNKSIZE, iter_chunks, to_arrays, to_frame
+from .partitions import PartitionedQuery, get_partition_querysets
+from .partitions import prune_partitions
+from .resampling import as_of_queryset, iter_as_of_range
+from .resampling import resample_queryset
 
 
 class RecordQuerySet(QuerySet):
@@ -13,14 +19,196 @@ class RecordQuerySet(QuerySet):
 
     Note that record manager is created from the queryset.
     """
-    def resample(self, rule):
+    def __init__(self, model=None, query=None, *args, **kwargs):
+        # Records of partitioned record models are selected from partitions.
+        if query is None and model is not None and \
+                model.RecordMeta.partition:
+            query = PartitionedQuery(model)
+
+        super(RecordQuerySet, self).__init__(model, query, *args, **kwargs)
+
+    def delete(self):
+        """Deletes records, from each partition they're in if the record model
+        is partitioned. See `django_record.partitions`.
+
+        :return: Like `QuerySet.delete()`, numbers of deleted records on
+            Django 1.9 or later, otherwise `None`.
+        """
+        if not isinstance(self.query, PartitionedQuery):
+            return super(RecordQuerySet, self).delete()
+
+        assert self.query.can_filter(), \
+            "Cannot use 'limit' or 'offset' with delete."
+
+        querysets = get_partition_querysets(self)
+        with transaction.atomic(using=self.db, savepoint=False):
+            results = [queryset.delete() for queryset in querysets]
+
+        if results[0] is None:
+            return None
+
+        # Records deleted from partitions are counted as the record model's.
+        partition_labels = set(queryset.model._meta.label for queryset in
+                               querysets)
+        deleted = {}
+        for _, counts in results:
+            for label, count in counts.items():
+                if label in partition_labels:
+                    label = self.model._meta.label
+                deleted[label] = deleted.get(label, 0) + count
+
+        return sum(deleted.values()), deleted
+
+    def update(self, **kwargs):
+        """Updates records, in each partition they're in if the record model
+        is partitioned. See `django_record.partitions`.
+
+        Creation time of records of partitioned record models can't be
+        updated, since it tells the partitions of the records.
+
+        :return: Number of updated records.
+        :rtype: int
+        """
+        if not isinstance(self.query, PartitionedQuery):
+            return super(RecordQuerySet, self).update(**kwargs)
+
+        assert self.query.can_filter(), \
+            'Cannot update a query once a slice has been taken.'
+        if 'created' in kwargs:
+            raise ValueError(
+                "Creation time of records of partitioned record models can't "
+                "be updated, since it tells their partitions."
+            )
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            return sum(queryset.update(**kwargs) for queryset in
+                       get_partition_querysets(self))
+
+    delete.alters_data = True
+    delete.queryset_only = True
+    update.alters_data = True
+
+    def prune_partitions(self, since=None, until=None):
+        """Selects only from partitions of records created in a period, if the
+        record model is partitioned. See `django_record.partitions`.
+
+        Note that records are not filtered by the period, since partitions are
+        pruned by whole periods of partitions.
+
+        :param since: Partitions of periods ending at or before the time are
+            pruned if given.
+        :param until: Partitions of periods starting after the time are pruned
+            if given.
+        :rtype: QuerySet
+        """
+        return prune_partitions(self, since, until)
+
+    def resample(self, rule, by=None):
         """Resamples record queryset based on pandas resampling rules.
 
+        The last record of each bucket is picked in the database, so the
+        resampled queryset is lazy as any other queryset. See
+        `django_record.resampling`.
+
+        Example:
+            >>> # Hourly records of each comment in a single query.
+            >>> CommentRecord.objects.resample('H', by='recording')
+
         :param rule: The pandas resampling rule to filter queryset
+        :param by: Name or names of fields to resample records separately by,
+            e.g. `'recording'`. The whole queryset is a single series if `None`.
         :return: The queryset that has been resampled base on the given pandas
         :rtype: QuerySet
         """
-        return resample_records(self, rule)
+        return resample_queryset(self, rule, by)
+
+    def as_of(self, timestamp):
+        """Filters the latest records of each recording instance as of a
+        timestamp, i.e. the states of recording instances at the time.
+
+        Example:
+            >>> # States of all comments as of last Tuesday 09:00.
+            >>> CommentRecord.objects.as_of(datetime(2015, 11, 3, 9))
+
+        :param timestamp: The datetime to take the records as of.
+        :return: A lazy queryset of the records, a record per recording
+            instance at most.
+        :rtype: QuerySet
+        """
+        return as_of_queryset(self, timestamp)
+
+    def as_of_range(self, timestamps):
+        """Yields the latest records of each recording instance as of each of
+        timestamps, with a single query.
+
+        Example:
+            >>> # Daily states of all comments in November.
+            >>> for day, records in CommentRecord.objects.as_of_range(
+            ...         datetime(2015, 11, d) for d in range(1, 31)):
+            ...     print(day, len(records))
+
+        :param timestamps: Datetimes to take the records as of.
+        :return: An iterator of tuples of timestamps in ascending order and
+            dictionaries of primary keys of recording instances and their
+            latest records as of the timestamps.
+        """
+        return iter_as_of_range(self, timestamps)
+
+    def reconstruct(self):
+        """Returns records with full `recording_fields` values, rebuilt from
+        keyframes and delta records of record models storing deltas.
+
+        Records since the former keyframes of the records are fetched with a
+        single extra query at most. See `django_record.deltas`.
+
+        Example:
+            >>> # Full states of a profile in the last week.
+            >>> profile.records.created_in_weeks().reconstruct()
+
+        :return: A list of the records in the order of the queryset.
+        :rtype: list
+        """
+        return reconstruct_records(self)
+
+    def to_frame(self, columns=None, chunksize=DEFAULT_CHUNKSIZE, index=None):
+        """Exports columns of records into a pandas DataFrame.
+
+        Records are streamed in chunks without any model instance, and dtypes
+        are chosen from their fields. See `django_record.export`.
+
+        :param columns: Names of record fields to be exported. `created`,
+            `recording` and `recording_fields` are exported if `None`.
+        :param chunksize: Maximum number of records fetched at once.
+        :param index: Name of the column to be the index, e.g. `'created'`.
+        :rtype: pandas.DataFrame
+        """
+        return to_frame(self, columns, chunksize, index)
+
+    def to_arrays(self, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+        """Exports columns of records into NumPy arrays.
+
+        :param columns: Names of record fields to be exported. `created`,
+            `recording` and `recording_fields` are exported if `None`.
+        :param chunksize: Maximum number of records fetched at once.
+        :return: An ordered dictionary of column names and NumPy arrays.
+        :rtype: collections.OrderedDict
+        """
+        return to_arrays(self, columns, chunksize)
+
+    def iter_chunks(self, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+        """Streams columns of records in chunks, in order of primary keys.
+
+        Example:
+            >>> for chunk in profile.records.iter_chunks(['created', 'name']):
+            ...     print(chunk['created'].max())
+
+        :param columns: Names of record fields to be exported. `created`,
+            `recording` and `recording_fields` are exported if `None`.
+        :param chunksize: Maximum number of records fetched at once.
+        :return: An iterator of ordered dictionaries of column names and NumPy
+            arrays.
+        """
+        return iter_chunks(self, columns, chunksize)
 
     def created_in(self, delta):
         """Filters queryset based on the past time from it's been created.
@@ -28,7 +216,8 @@ class RecordQuerySet(QuerySet):
         :param delta: Delta threshold from now to filter the queryset.
         :type delta: datetime.timedelta
         """
-        return self.filter(created__gte=datetime.now() - delta)
+        since = datetime.now() - delta
+        return self.filter(created__gte=since).prune_partitions(since=since)
 
     def created_in_years(self, years=1):
         """Filters queryset based on past years from it's been created.
@@ -88,7 +277,14 @@ class RecordQuerySet(QuerySet):
         """
         return self.created_in(timedelta(seconds=seconds))
 
+    prune_partitions.queryset_only = False
     resample.queryset_only = False
+    as_of.queryset_only = False
+    as_of_range.queryset_only = False
+    reconstruct.queryset_only = False
+    to_frame.queryset_only = False
+    to_arrays.queryset_only = False
+    iter_chunks.queryset_only = False
     created_in.queryset_only = False
     created_in_years.queryset_only = False
     created_in_months.queryset_only = False
@@ -0,0 +1,105 @@
+from django.apps import apps
+from django.db.models.signals import post_save
+
+
+class RecorderRegistry(object):
+    """Central dispatch registry of recorders.
+
+    Maps each sender model to exactly the recorders of record models that care
+    about it. Only one receiver is connected to a signal for each sender model,
+    so saves of models that are neither recorded nor audited don't cost a
+    single recorder call.
+
+    The registry is built once when apps are ready, since relatives to audit
+    can't be resolved until all models have been loaded.
+
+    Note that record models prepared after the registry has been built are
+    connected right away.
+    """
+    dispatch_uid = 'django_record.registry'
+
+    def __init__(self):
+        self.ready = False
+        self.record_models = []
+
+        # Maps (signal, sender) pairs to lists of recorders.
+        self._recorders = {}
+
+        # Builds the registry on the first signal if `django_record` is not in
+        # `INSTALLED_APPS`, since our app config won't be ready in that case.
+        post_save.connect(self._bootstrap, weak=False,
+                          dispatch_uid=self.dispatch_uid)
+
+    def register(self, record_model):
+        """Registers a record model to the registry.
+
+        :param record_model: The RecordModel subclass to register.
+        """
+        self.record_models.append(record_model)
+
+        if self.ready:
+            self._register_recorders(record_model)
+
+    def build(self):
+        """Builds the dispatch registry from registered record models."""
+        if self.ready:
+            return
+
+        post_save.disconnect(dispatch_uid=self.dispatch_uid)
+        self.ready = True
+
+        for record_model in self.record_models:
+            self._register_recorders(record_model)
+
+    def connect(self, signal, sender, recorder):
+        """Connects a recorder to a signal of the sender.
+
+        :param signal: The model signal to listen.
+        :param sender: The model class whose signals the recorder cares about.
+        :param recorder: The recorder to be called on the sender's signals.
+        """
+        key = (signal, sender)
+
+        if key not in self._recorders:
+            self._recorders[key] = []
+            signal.connect(self.dispatch, sender=sender, weak=False,
+                           dispatch_uid=self.dispatch_uid)
+
+        self._recorders[key].append(recorder)
+
+    def get_recorders(self, signal, sender):
+        """Returns a list of recorders connected to a signal of the sender.
+
+        :param signal: The model signal.
+        :param sender: The model class.
+        :rtype: list
+        """
+        return list(self._recorders.get((signal, sender), []))
+
+    def dump_audit_plans(self):
+        """Dumps audit plans of all registered record models.
+
+        :return: A list of audit plans dumped into dictionaries of primitives.
+        :rtype: list
+        """
+        return [record_model.get_audit_plan().as_dict() for record_model in
+                self.record_models]
+
+    def dispatch(self, signal, sender, **kwargs):
+        """Dispatches a signal of the sender to it's recorders."""
+        for recorder in self._recorders.get((signal, sender), []):
+            recorder(sender=sender, **kwargs)
+
+    def _register_recorders(self, record_model):
+        record_model._register_recorder()
+        record_model._register_indirect_effect_recorder()
+
+    def _bootstrap(self, signal, sender, **kwargs):
+        if not apps.ready:
+            return
+
+        self.build()
+        self.dispatch(signal, sender, **kwargs)
+
+
+recorder_registry = RecorderRegistry()
@@ -0,0 +1,311 @@
+import bisect
+import six
+import sqlite3
+
+from django.db import connections
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Day, MonthBegin, MonthEnd
+from pandas.tseries.offsets import Tick, Week
+from pandas.tseries.offsets import YearBegin, YearEnd
+
+from .partitions import prune_partitions
+from .snapshots import DEFAULT_NULL_SAFE_EQUALS, NULL_SAFE_EQUALS
+
+
+# Buckets of fixed frequencies, i.e. seconds since the Unix epoch divided by
+# the frequency in seconds.
+EPOCH_BUCKETS = {
+    'sqlite': "CAST(strftime('%%s', {column}) AS INTEGER) / {seconds}",
+    'postgresql': 'FLOOR(EXTRACT(EPOCH FROM {column}) / {seconds})',
+    'mysql': 'FLOOR(UNIX_TIMESTAMP({column}) / {seconds})',
+}
+
+# Buckets of calendar frequencies. Weeks end on Sundays like pandas' 'W'.
+CALENDAR_BUCKETS = {
+    'sqlite': {
+        'week': "date({column}, 'weekday 0')",
+        'month': "strftime('%%Y-%%m', {column})",
+        'year': "strftime('%%Y', {column})",
+    },
+    'postgresql': {
+        'week': "DATE_TRUNC('week', {column})",
+        'month': "DATE_TRUNC('month', {column})",
+        'year': "DATE_TRUNC('year', {column})",
+    },
+    'mysql': {
+        'week': 'YEARWEEK({column}, 1)',
+        'month': "DATE_FORMAT({column}, '%%Y-%%m')",
+        'year': 'YEAR({column})',
+    },
+}
+
+NANOSECONDS_PER_SECOND = 10 ** 9
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def get_calendar_unit(offset):
+    """Returns the calendar unit of a pandas offset, or `None` if the offset
+    isn't a single calendar unit.
+
+    :param offset: A pandas `DateOffset`.
+    :rtype: str
+    """
+    if offset.n != 1:
+        return None
+    if isinstance(offset, Week) and offset.weekday == 6:
+        return 'week'
+    if isinstance(offset, (MonthBegin, MonthEnd)):
+        return 'month'
+    if isinstance(offset, YearBegin) and offset.month == 1 or \
+            isinstance(offset, YearEnd) and offset.month == 12:
+        return 'year'
+    return None
+
+
+def get_bucket_sql(connection, column, rule):
+    """Returns an SQL expression bucketing a datetime column by a pandas rule.
+
+    Fixed frequencies, e.g. `'S'`, `'15T'`, `'H'` or `'D'`, are bucketed
+    aligned to the Unix epoch, and single calendar units, e.g. `'W'`, `'M'` or
+    `'A'`, by truncating dates. Percent signs are escaped for the expression
+    to be passed along with parameters.
+
+    :param connection: The database connection.
+    :param column: Qualified datetime column to be bucketed.
+    :param rule: The pandas resampling rule.
+    :rtype: str
+    :raises ValueError: If the rule or the database is not supported.
+    """
+    offset = to_offset(rule)
+    vendor = connection.vendor
+
+    if vendor not in EPOCH_BUCKETS:
+        raise ValueError(
+            "Resampling records on {} is not supported.".format(vendor)
+        )
+
+    # Days are not ticks from pandas 3, though they're fixed frequencies in
+    # naive datetimes.
+    if isinstance(offset, Day):
+        return EPOCH_BUCKETS[vendor].format(
+            column=column, seconds=offset.n * SECONDS_PER_DAY
+        )
+
+    if isinstance(offset, Tick) and \
+            offset.nanos % NANOSECONDS_PER_SECOND == 0:
+        return EPOCH_BUCKETS[vendor].format(
+            column=column, seconds=offset.nanos // NANOSECONDS_PER_SECOND
+        )
+
+    unit = get_calendar_unit(offset)
+    if unit is None:
+        raise ValueError(
+            "Resampling rule '{}' is not supported.".format(rule)
+        )
+
+    return CALENDAR_BUCKETS[vendor][unit].format(column=column)
+
+
+def supports_window_functions(connection):
+    """Returns whether if the database supports window functions."""
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    if connection.vendor == 'mysql':
+        return getattr(connection, 'mysql_version', (0, )) >= (8, 0)
+    return True
+
+
+def get_last_records_sql(queryset, by=(), bucket=None, bucket_params=()):
+    """Returns a subquery selecting primary keys of the last records in each
+    partition of a record queryset.
+
+    Records are picked with `DISTINCT ON` on PostgreSQL, ranked by a window
+    function partitioned by buckets if the database supports it, and by a
+    correlated subquery otherwise. The last record is the latest created one,
+    or the one with the greatest primary key among those created at once.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param by: Names of fields to partition records by, e.g. `('recording', )`.
+    :param bucket: SQL expression partitioning records by their creation time,
+        formatted with the `created` column of the subquery.
+    :param bucket_params: Parameters of the bucket expression.
+    :return: A tuple of the SQL and it's parameters.
+    :rtype: tuple
+    """
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    meta = queryset.model._meta
+    if bucket is None:
+        bucket_params = ()
+
+    def get_partitions(alias):
+        partitions = ['{}.{}'.format(alias, qn(meta.get_field(name).column))
+                      for name in by]
+        if bucket is not None:
+            partitions.append(bucket.format(created='{}.{}'.format(
+                alias, qn(meta.get_field('created').column)
+            )))
+        return partitions
+
+    pk = 'source.' + qn(meta.pk.column)
+    created = 'source.' + qn(meta.get_field('created').column)
+    partitions = get_partitions('source')
+
+    source_sql, source_params = queryset \
+        .order_by() \
+        .values_list('pk', 'created', *by) \
+        .query.sql_with_params()
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            'SELECT DISTINCT ON ({partition}) {pk} FROM ({source}) source '
+            'ORDER BY {partition}, {created} DESC, {pk} DESC'
+        )
+        params = tuple(bucket_params) + tuple(source_params) + \
+            tuple(bucket_params)
+    elif supports_window_functions(connection):
+        sql = (
+            'SELECT ranked.pk FROM ('
+            'SELECT {pk} AS pk, ROW_NUMBER() OVER ('
+            'PARTITION BY {partition} ORDER BY {created} DESC, {pk} DESC'
+            ') AS recency FROM ({source}) source'
+            ') ranked WHERE ranked.recency = 1'
+        )
+        params = tuple(bucket_params) + tuple(source_params)
+    else:
+        sql = (
+            'SELECT {pk} FROM ({source}) source WHERE {pk} = ('
+            'SELECT {latest_pk} FROM ({source}) latest WHERE {comparisons} '
+            'ORDER BY {latest_created} DESC, {latest_pk} DESC LIMIT 1)'
+        )
+        params = tuple(source_params) + tuple(source_params) + \
+            tuple(bucket_params) + tuple(bucket_params)
+
+    equals = NULL_SAFE_EQUALS.get(connection.vendor, DEFAULT_NULL_SAFE_EQUALS)
+    return sql.format(
+        pk=pk,
+        partition=', '.join(partitions),
+        created=created,
+        source=source_sql,
+        latest_pk='latest.' + qn(meta.pk.column),
+        latest_created='latest.' + qn(meta.get_field('created').column),
+        comparisons=' AND '.join(
+            equals.format(latest, current) for latest, current in
+            zip(get_partitions('latest'), partitions)
+        ) or '1 = 1',
+    ), params
+
+
+def get_resample_sql(queryset, rule, by=()):
+    """Returns a subquery selecting primary keys of the last records in each
+    bucket of a record queryset.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param rule: The pandas resampling rule.
+    :param by: Names of fields to bucket records separately by, e.g.
+        `('recording', )`.
+    :return: A tuple of the SQL and it's parameters.
+    :rtype: tuple
+    """
+    connection = connections[queryset.db]
+    return get_last_records_sql(
+        queryset, by, get_bucket_sql(connection, '{created}', rule)
+    )
+
+
+def filter_by_subquery(queryset, sql, params):
+    """Filters a record queryset by a subquery selecting primary keys.
+
+    :rtype: QuerySet
+    """
+    qn = connections[queryset.db].ops.quote_name
+
+    return queryset.extra(
+        where=['{}.{} IN ({})'.format(
+            qn(queryset.model._meta.db_table),
+            qn(queryset.model._meta.pk.column),
+            sql
+        )],
+        params=params
+    )
+
+
+def resample_queryset(queryset, rule, by=None):
+    """Resamples a record queryset to the last record of each bucket in the
+    database.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param rule: The pandas resampling rule, e.g. `'H'` for hours.
+    :param by: Name or names of fields to bucket records separately by, e.g.
+        `'recording'` to resample records of each recording instance. Records
+        are resampled as a single series if `None`.
+    :return: A lazy queryset of the resampled records.
+    :rtype: QuerySet
+    """
+    by = () if by is None else \
+        (by, ) if isinstance(by, six.string_types) else tuple(by)
+    sql, params = get_resample_sql(queryset, rule, by)
+    return filter_by_subquery(queryset, sql, params)
+
+
+def as_of_queryset(queryset, timestamp):
+    """Filters a record queryset to the latest record of each recording instance
+    created at or before a timestamp.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param timestamp: The datetime to take the records as of.
+    :return: A lazy queryset of the records.
+    :rtype: QuerySet
+    """
+    queryset = prune_partitions(queryset, until=timestamp)
+    sql, params = get_last_records_sql(
+        queryset.filter(created__lte=timestamp), ('recording', )
+    )
+    return filter_by_subquery(queryset, sql, params)
+
+
+def iter_as_of_range(queryset, timestamps):
+    """Yields snapshots of a record queryset as of each of timestamps.
+
+    Records are bucketed by intervals between timestamps, and only the latest
+    record of each recording instance in each interval is fetched with a
+    single query. Snapshots are then carried forward from one timestamp to the
+    next in memory, so recording instances which haven't been changed in an
+    interval keep their former records.
+
+    :param queryset: A queryset of a RecordModel subclass.
+    :param timestamps: Datetimes to take the records as of.
+    :return: An iterator of tuples of timestamps in ascending order and
+        dictionaries of primary keys of recording instances and their latest
+        records as of the timestamps.
+    """
+    timestamps = sorted(timestamps)
+    if not timestamps:
+        return
+
+    connection = connections[queryset.db]
+    created_field = queryset.model._meta.get_field('created')
+    queryset = prune_partitions(queryset, until=timestamps[-1])
+
+    bucket = 'CASE {} END'.format(' '.join(
+        'WHEN {{created}} <= %s THEN {}'.format(i) for i in
+        range(len(timestamps))
+    ))
+    bucket_params = [created_field.get_db_prep_value(timestamp, connection)
+                     for timestamp in timestamps]
+
+    sql, params = get_last_records_sql(
+        queryset.filter(created__lte=timestamps[-1]), ('recording', ),
+        bucket, bucket_params
+    )
+
+    records_by_interval = {}
+    for record in filter_by_subquery(queryset, sql, params):
+        interval = bisect.bisect_left(timestamps, record.created)
+        records_by_interval.setdefault(interval, []).append(record)
+
+    snapshot = {}
+    for interval, timestamp in enumerate(timestamps):
+        for record in records_by_interval.get(interval, []):
+            snapshot[record.recording_id] = record
+        yield timestamp, dict(snapshot)
@@ -0,0 +1,186 @@
+from django.db import connections
+from django.utils import timezone
+
+from .partitions import get_table_sql
+
+
+# Null-safe equality operators of database vendors.
+NULL_SAFE_EQUALS = {
+    'sqlite': '{} IS {}',
+    'postgresql': '{} IS NOT DISTINCT FROM {}',
+    'mysql': '{} <=> {}',
+}
+DEFAULT_NULL_SAFE_EQUALS = '({0} = {1} OR ({0} IS NULL AND {1} IS NULL))'
+
+
+def get_snapshot_columns(record_model):
+    """Returns columns to be snapshotted in SQL.
+
+    Ordinary fields are selected by their names and columns, while expressions
+    are annotated and selected by their aliases.
+
+    :param record_model: The RecordModel subclass.
+    :return: A list of tuples of names to be selected from `recording_model`
+        querysets, their columns and their record fields.
+    :rtype: list
+    :raises ValueError: If the records can't be snapshotted in SQL.
+    """
+    meta = record_model.recording_model._meta
+    fields = dict((field.name, field) for field in meta.concrete_fields)
+
+    if record_model.RecordMeta.fingerprint:
+        raise ValueError(
+            "Fingerprinted records can't be snapshotted in SQL. "
+            "Use record_queryset() instead."
+        )
+
+    if record_model.RecordMeta.delta:
+        raise ValueError(
+            "Delta records can't be snapshotted in SQL. "
+            "Use record_queryset() instead."
+        )
+
+    if record_model.RecordMeta.partition:
+        raise ValueError(
+            "Partitioned records can't be snapshotted in SQL. "
+            "Use record_queryset() instead."
+        )
+
+    columns = []
+
+    for name in record_model.recording_fields:
+        if name in record_model.recording_expressions:
+            alias = record_model.get_expression_alias(name)
+            columns.append((alias, alias, record_model._meta.get_field(name)))
+            continue
+
+        if name not in fields or \
+                name in record_model.RecordMeta.recording_dependencies:
+            raise ValueError(
+                "'{}' is not a concrete field of {}, so records can't be "
+                "snapshotted in SQL. Use record_queryset() instead."
+                .format(name, meta.object_name)
+            )
+
+        columns.append((name, fields[name].column,
+                        record_model._meta.get_field(name)))
+
+    return columns
+
+
+def get_latest_record_pk_sql(record_model, connection, recording_column):
+    """Returns a correlated subquery selecting the latest record's primary key.
+
+    Records are ordered by their creation time and primary keys, just like
+    `RecordModel.get_latest_record_values()`, and selected from all partitions
+    of partitioned record models.
+
+    :param record_model: The RecordModel subclass.
+    :param connection: The database connection.
+    :param recording_column: Qualified column of the outer query holding
+        primary keys of recording instances.
+    :rtype: str
+    """
+    qn = connection.ops.quote_name
+    meta = record_model._meta
+
+    return (
+        'SELECT record.{pk} FROM {table} record '
+        'WHERE record.{recording} = {recording_column} '
+        'ORDER BY record.{created} DESC, record.{pk} DESC LIMIT 1'
+    ).format(
+        table=get_table_sql(record_model, connection),
+        pk=qn(meta.pk.column),
+        recording=qn(meta.get_field('recording').column),
+        recording_column=recording_column,
+        created=qn(meta.get_field('created').column),
+    )
+
+
+def get_snapshot_sql(record_model, queryset, only_changed=False):
+    """Returns an `INSERT ... SELECT` statement snapshotting a queryset.
+
+    :param record_model: The RecordModel subclass.
+    :param queryset: A queryset of the `recording_model`.
+    :param only_changed: Snapshots only recording instances whose values differ
+        from their latest records if `True`.
+    :return: A tuple of the SQL and it's parameters.
+    :rtype: tuple
+    """
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    meta = record_model._meta
+    columns = get_snapshot_columns(record_model)
+
+    table = qn(meta.db_table)
+    recording_column = qn(meta.get_field('recording').column)
+    pk_column = qn(record_model.recording_model._meta.pk.column)
+
+    source_sql, source_params = record_model \
+        .annotate_recording_values(queryset) \
+        .order_by() \
+        .values_list('pk', *[name for name, _, _ in columns]) \
+        .query.sql_with_params()
+
+    now = timezone.now()
+    params = [
+        meta.get_field('created').get_db_prep_value(now, connection),
+        meta.get_field('modified').get_db_prep_value(now, connection),
+    ]
+    params.extend(source_params)
+
+    sql = (
+        'INSERT INTO {table} ({created}, {modified}, {recording}, {columns}) '
+        'SELECT %s, %s, source.{pk}, {source_columns} '
+        'FROM ({source}) source'
+    ).format(
+        table=table,
+        created=qn(meta.get_field('created').column),
+        modified=qn(meta.get_field('modified').column),
+        recording=recording_column,
+        columns=', '.join(qn(record_field.column) for _, _, record_field in
+                          columns),
+        pk=pk_column,
+        source_columns=', '.join('source.' + qn(column) for _, column, _ in
+                                 columns),
+        source=source_sql,
+    )
+
+    if only_changed:
+        equals = NULL_SAFE_EQUALS.get(connection.vendor,
+                                      DEFAULT_NULL_SAFE_EQUALS)
+        sql += (
+            ' WHERE NOT EXISTS ('
+            'SELECT 1 FROM {table} latest '
+            'WHERE latest.{pk} = ({latest_pk}) AND {comparisons})'
+        ).format(
+            table=table,
+            pk=qn(meta.pk.column),
+            latest_pk=get_latest_record_pk_sql(
+                record_model, connection, 'source.' + pk_column
+            ),
+            comparisons=' AND '.join(
+                equals.format('latest.' + qn(record_field.column),
+                              'source.' + qn(column))
+                for _, column, record_field in columns
+            ) or '1 = 1',
+        )
+
+    return sql, params
+
+
+def insert_snapshots(record_model, queryset, only_changed=False):
+    """Snapshots a queryset into records with a single `INSERT ... SELECT`.
+
+    :param record_model: The RecordModel subclass.
+    :param queryset: A queryset of the `recording_model`.
+    :param only_changed: Snapshots only recording instances whose values differ
+        from their latest records if `True`.
+    :return: Number of created records.
+    :rtype: int
+    """
+    sql, params = get_snapshot_sql(record_model, queryset, only_changed)
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
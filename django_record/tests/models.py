@@ -1,5 +1,7 @@
+from datetime import timedelta
+
 from django.db import models
-from django.db.models import Sum
+from django.db.models import Count, Sum
 
 from django_record.models import AbstractTimeStampedModel
 from django_record.models import RecordModel
@@ -10,6 +12,7 @@ from django_record.mixins import RecordedModelMixin
 TITLE_MAX_LENGTH = 100
 POINT_MAX_LENGTH = 100
 TEXT_MAX_LENGTH = 300
+NAME_MAX_LENGTH = 100
 
 
 class Article(RecordedModelMixin, AbstractTimeStampedModel):
@@ -87,3 +90,124 @@ class Vote(RecordedModelMixin, models.Model):
         ('reverse_related_property', models.CharField(max_length=1000)),
     ]
     auditing_relatives = ['comment']
+
+
+class Forum(RecordedModelMixin, AbstractTimeStampedModel):
+    title = models.CharField(max_length=TITLE_MAX_LENGTH)
+
+    @property
+    def post_count(self):
+        return self.posts.count()
+
+    auditing_relatives = ['posts']
+    recording_fields = [
+        ('post_count', models.IntegerField(), Count('posts'))
+    ]
+
+
+class Post(AbstractTimeStampedModel):
+    forum = models.ForeignKey(Forum, related_name='posts')
+    text = models.TextField(max_length=TEXT_MAX_LENGTH)
+
+
+class Team(AbstractTimeStampedModel):
+    name = models.CharField(max_length=NAME_MAX_LENGTH)
+
+
+class Member(AbstractTimeStampedModel):
+    team = models.ForeignKey(Team, related_name='members')
+    name = models.CharField(max_length=NAME_MAX_LENGTH)
+    level = models.IntegerField(default=0)
+
+    @property
+    def next_level(self):
+        return self.level + 1
+
+    @property
+    def badge_points(self):
+        return self.badges.aggregate(Sum('points'))['points__sum'] or 0
+
+    @property
+    def team_name(self):
+        return self.team.name
+
+
+class Badge(models.Model):
+    member = models.ForeignKey(Member, related_name='badges')
+    points = models.IntegerField()
+
+
+class MemberRecord(RecordModel):
+    recording_model = Member
+    recording_fields = [
+        'name', 'level',
+        ('next_level', models.IntegerField()),
+        ('badge_points', models.IntegerField()),
+        ('team_name', models.CharField(max_length=NAME_MAX_LENGTH)),
+    ]
+
+    class RecordMeta:
+        audit_all_relatives = True
+        track_changes = True
+        recording_dependencies = {
+            'next_level': ('level', ),
+            'badge_points': ('badges__points', ),
+            'team_name': ('team__name', ),
+        }
+
+
+class Bookmark(RecordedModelMixin, models.Model):
+    article = models.ForeignKey(Article)
+    note = models.CharField(max_length=TEXT_MAX_LENGTH)
+    position = models.IntegerField(default=0)
+
+    recording_fields = ['article', 'note', 'position']
+
+    class RecordMeta:
+        fingerprint = True
+
+
+class Citation(RecordedModelMixin, models.Model):
+    article = models.ForeignKey(Article)
+    page = models.IntegerField()
+
+    recording_fields = ['article', 'page']
+
+
+class Author(RecordedModelMixin, models.Model):
+    name = models.CharField(max_length=NAME_MAX_LENGTH)
+    email = models.EmailField(null=True)
+    reputation = models.IntegerField(default=0)
+
+    recording_fields = ['name', 'email', 'reputation']
+
+    class RecordMeta:
+        index_created = True
+        retention = [
+            (timedelta(days=7), 'H'),
+            (timedelta(days=90), 'D'),
+            (timedelta(days=365), None),
+        ]
+
+
+class Profile(RecordedModelMixin, models.Model):
+    bio = models.TextField(default='')
+    views = models.IntegerField(default=0)
+    rating = models.FloatField(null=True)
+
+    recording_fields = ['bio', 'views', 'rating']
+
+    class RecordMeta:
+        delta = True
+        keyframe_interval = 3
+
+
+class Event(RecordedModelMixin, models.Model):
+    name = models.CharField(max_length=NAME_MAX_LENGTH)
+    count = models.IntegerField(default=0)
+
+    recording_fields = ['name', 'count']
+
+    class RecordMeta:
+        partition = 'month'
+        retention = [(timedelta(days=365), None)]
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from random import randint, seed
+
+from django.test import TestCase
+
+from .. import resampling
+from .models import Author
+
+
+RECORD_NUM = 60
+AUTHOR_NUM = 4
+START = datetime(2015, 11, 9, 12, 30)
+
+
+class AsOfTest(TestCase):
+    def setUp(self):
+        seed(0)
+
+        self.authors = [Author.objects.create(name='author') for _ in
+                        range(AUTHOR_NUM)]
+        self.record_model = self.authors[0].records.model
+        self.record_model.objects.bulk_create([
+            self.record_model(recording=self.authors[i % AUTHOR_NUM],
+                              name='author', reputation=i)
+            for i in range(RECORD_NUM)
+        ])
+
+        # Spread records over a month, with some of them created at once.
+        for record in self.record_model.objects.all():
+            self.record_model.objects.filter(pk=record.pk).update(
+                created=START + timedelta(hours=randint(0, 24 * 30))
+            )
+
+        self.records = self.record_model.objects.all()
+
+    def tearDown(self):
+        Author.objects.all().delete()
+
+    def latest_as_of(self, timestamp):
+        latest_records = {}
+
+        for author in self.authors:
+            record = author.records \
+                .filter(created__lte=timestamp) \
+                .order_by('-created', '-pk') \
+                .first()
+            if record is not None:
+                latest_records[author.pk] = record
+
+        return latest_records
+
+    def test_as_of(self):
+        for days in [0, 3, 10, 31]:
+            timestamp = START + timedelta(days=days)
+            expected = self.latest_as_of(timestamp)
+
+            with self.assertNumQueries(1):
+                records = list(self.records.as_of(timestamp))
+
+            self.assertEqual(
+                dict((record.recording_id, record) for record in records),
+                expected
+            )
+
+    def test_as_of_before_any_record(self):
+        self.assertFalse(
+            self.records.as_of(START - timedelta(days=1)).exists()
+        )
+
+    def test_as_of_filtered_queryset(self):
+        timestamp = START + timedelta(days=10)
+        records = self.records.filter(reputation__lt=20).as_of(timestamp)
+
+        self.assertTrue(records.exists())
+        for record in records:
+            self.assertEqual(
+                record,
+                record.recording.records
+                .filter(reputation__lt=20, created__lte=timestamp)
+                .order_by('-created', '-pk')
+                .first()
+            )
+
+    def test_as_of_without_window_functions(self):
+        supports_window_functions = resampling.supports_window_functions
+        resampling.supports_window_functions = lambda connection: False
+
+        try:
+            # Records are spread regardless of their primary keys, so the
+            # latest record of a recording is rarely the greatest primary key.
+            timestamp = START + timedelta(days=10)
+            records = self.records.filter(created__lte=timestamp)
+            self.assertEqual(
+                set(self.records.as_of(timestamp)
+                    .values_list('pk', flat=True)),
+                set(records.filter(recording=recording)
+                    .order_by('-created', '-pk')
+                    .values_list('pk', flat=True)[0]
+                    for recording in records.values_list('recording',
+                                                         flat=True)
+                    .distinct())
+            )
+
+        finally:
+            resampling.supports_window_functions = supports_window_functions
+
+    def test_as_of_range(self):
+        timestamps = [START + timedelta(days=days) for days in
+                      [20, 0, 5, 10, 15, 31]]
+
+        with self.assertNumQueries(1):
+            snapshots = list(self.records.as_of_range(timestamps))
+
+        self.assertEqual([timestamp for timestamp, _ in snapshots],
+                         sorted(timestamps))
+        for timestamp, records in snapshots:
+            self.assertEqual(records, self.latest_as_of(timestamp))
+
+    def test_as_of_range_of_no_timestamps(self):
+        self.assertEqual(list(self.records.as_of_range([])), [])
@@ -0,0 +1,125 @@
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..audit import AuditPlan, RELATED, REVERSE_RELATED
+from ..registry import recorder_registry
+from .models import Article, Comment, Vote
+from .models import CommentRecord
+
+
+class AuditPlanTest(TestCase):
+    def test_audit_plan_compiled_once(self):
+        plan = CommentRecord.get_audit_plan()
+        self.assertIsInstance(plan, AuditPlan)
+        self.assertIs(plan, CommentRecord.get_audit_plan())
+
+    def test_audit_plan_relative_models(self):
+        self.assertEqual(
+            CommentRecord.get_audit_plan().relative_models,
+            frozenset([Article, Vote])
+        )
+        self.assertEqual(
+            apps.get_model('tests', 'ArticleRecord').get_audit_plan()
+            .relative_models,
+            frozenset([Comment])
+        )
+
+    def test_audit_plan_paths(self):
+        plan = CommentRecord.get_audit_plan()
+
+        article_path, = plan.get_paths(Article)
+        self.assertEqual(article_path.accessor, 'comments')
+        self.assertEqual(article_path.direction, RELATED)
+        self.assertTrue(article_path.many)
+
+        vote_path, = plan.get_paths(Vote)
+        self.assertEqual(vote_path.accessor, 'comment')
+        self.assertEqual(vote_path.direction, REVERSE_RELATED)
+        self.assertFalse(vote_path.many)
+
+    def test_audit_all_relatives_exposed(self):
+        self.assertEqual(
+            set(CommentRecord.auditing_relatives),
+            set(CommentRecord.get_audit_plan().auditing_relatives)
+        )
+        self.assertIn('article', CommentRecord.auditing_relatives)
+        self.assertIn('votes', CommentRecord.auditing_relatives)
+
+    def test_dump_audit_plans(self):
+        plans = recorder_registry.dump_audit_plans()
+        plan, = [plan for plan in plans if
+                 plan['record_model'] == 'tests.CommentRecord']
+
+        self.assertEqual(plan['recording_model'], 'tests.Comment')
+        self.assertEqual(
+            sorted(path['relative_model'] for path in plan['paths']),
+            ['tests.Article', 'tests.Vote']
+        )
+
+    def test_audit_path_lookups(self):
+        plan = CommentRecord.get_audit_plan()
+
+        article_path, = plan.get_paths(Article)
+        self.assertEqual(article_path.lookup, 'article')
+        self.assertEqual(article_path.attname, 'pk')
+
+        vote_path, = plan.get_paths(Vote)
+        self.assertEqual(vote_path.lookup, 'pk')
+        self.assertEqual(vote_path.attname, 'comment_id')
+
+
+class AffectedRecordingsTest(TestCase):
+    def setUp(self):
+        self.article = Article.objects.create(title='title')
+        self.comments = [
+            Comment.objects.create(article=self.article, point='point',
+                                   text='text', impact=i, impact_rate=0.5)
+            for i in range(3)
+        ]
+        self.vote = Vote.objects.create(comment=self.comments[0], score=1)
+
+    def test_related_recordings_in_single_query(self):
+        with self.assertNumQueries(1):
+            pks = list(
+                CommentRecord.get_affected_recordings(self.article)
+                .values_list('pk', flat=True)
+            )
+        self.assertEqual(set(pks), set(c.pk for c in self.comments))
+
+    def test_reverse_related_recordings_in_single_query(self):
+        with self.assertNumQueries(1):
+            recordings = list(
+                CommentRecord.get_affected_recordings(self.vote)
+            )
+        self.assertEqual(recordings, [self.comments[0]])
+
+    def test_no_query_without_reachable_recordings(self):
+        with self.assertNumQueries(0):
+            recordings = list(CommentRecord.get_affected_recordings(
+                Vote(score=1)
+            ))
+        self.assertEqual(recordings, [])
+
+    def test_indirect_effect_resolved_in_single_query(self):
+        self.article.title = 'changed title'
+
+        with CaptureQueriesContext(connection) as context:
+            self.article.save()
+
+        # Comments of the article are resolved by a single query rather than
+        # a query per audit path or per comment.
+        comment_table = connection.ops.quote_name(Comment._meta.db_table)
+        resolutions = [
+            query for query in context.captured_queries if
+            'FROM {}'.format(comment_table) in query['sql'] and
+            'COUNT' not in query['sql']
+        ]
+        self.assertEqual(len(resolutions), 1)
+        self.assertEqual(
+            CommentRecord.objects.filter(
+                reverse_related_property='changed title'
+            ).count(),
+            len(self.comments)
+        )
@@ -0,0 +1,285 @@
+import threading
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+
+from random import randint, uniform
+from faker import Faker
+
+from ..backends import FanOutJob, RecordJob, SyncBackend, ThreadPoolBackend
+from ..backends import get_backend
+from .models import TITLE_MAX_LENGTH, POINT_MAX_LENGTH, TEXT_MAX_LENGTH
+from .models import Article, Comment
+from .models import CommentRecord
+from .utils import override_record_meta
+
+
+f = Faker()
+THREAD_POOL_BACKEND = {
+    'BACKEND': 'django_record.backends.ThreadPoolBackend',
+    'OPTIONS': {'workers': 2, 'max_queue_size': 10},
+}
+
+
+def create_comment():
+    article = Article.objects.create(title=f.text()[:TITLE_MAX_LENGTH])
+
+    return Comment.objects.create(
+        article=article,
+        point=f.text()[:POINT_MAX_LENGTH],
+        text=f.text()[:TEXT_MAX_LENGTH],
+        impact=randint(0, 10),
+        impact_rate=uniform(0, 1)
+    )
+
+
+class FakeJob(object):
+    key = ('tests.Fake', 1)
+
+    def __init__(self, runs, event=None):
+        self.runs = runs
+        self.event = event
+
+    def run(self):
+        if self.event is not None:
+            self.event.wait()
+        self.runs.append(self)
+
+
+class DeferringBackend(SyncBackend):
+    """Keeps deferred jobs to be run by tests."""
+    deferred = []
+
+    def defer(self, job):
+        self.deferred.append(job)
+
+
+class RecordJobTest(TestCase):
+    def setUp(self):
+        create_comment()
+
+    def tearDown(self):
+        Article.objects.all().delete()
+
+    def test_default_backend(self):
+        self.assertIsInstance(get_backend(), SyncBackend)
+
+    def test_capture_marks_properties_to_be_reevaluated(self):
+        comment = Comment.objects.first()
+        job = RecordJob.capture(CommentRecord, comment)
+
+        self.assertEqual(job.record_model, 'tests.CommentRecord')
+        self.assertEqual(job.pk, comment.pk)
+        self.assertIsNone(job.values)
+
+    def test_run_reevaluated_job(self):
+        comment = Comment.objects.first()
+        number_of_records_before_run = comment.records.count()
+
+        RecordJob.capture(CommentRecord, comment).run()
+        self.assertEqual(number_of_records_before_run, comment.records.count())
+
+        Comment.objects.filter(pk=comment.pk).update(text='changed text')
+        RecordJob.capture(CommentRecord, comment).run()
+        self.assertEqual(
+            number_of_records_before_run + 1, comment.records.count()
+        )
+        self.assertEqual(comment.records.latest().text, 'changed text')
+
+    def test_run_job_of_deleted_instance(self):
+        comment = Comment.objects.first()
+        job = RecordJob.capture(CommentRecord, comment)
+        comment.delete()
+
+        job.run()
+
+    def test_backpressure(self):
+        runs = []
+        event = threading.Event()
+        backend = ThreadPoolBackend(workers=1, max_queue_size=1, timeout=0.1)
+
+        # The worker is blocked by the first job, and the second one fills the
+        # queue.
+        backend.put(FakeJob(runs, event))
+        backend.put(FakeJob(runs))
+        self.assertEqual(runs, [])
+
+        # Jobs are run synchronously while the queue is full.
+        synchronous_job = FakeJob(runs)
+        backend.put(synchronous_job)
+        self.assertEqual(runs, [synchronous_job])
+
+        event.set()
+        backend.shutdown()
+        self.assertEqual(len(runs), 3)
+
+
+@override_settings(RECORD_BACKEND=THREAD_POOL_BACKEND)
+class ThreadPoolBackendTest(TransactionTestCase):
+    def tearDown(self):
+        get_backend().shutdown()
+        Article.objects.all().delete()
+
+    def test_recording_off_request_path(self):
+        # Tables of the shared in-memory database are locked while workers
+        # read them, so fixtures are created synchronously.
+        with self.settings(RECORD_BACKEND={}):
+            comment = create_comment()
+
+        self.assertIsInstance(get_backend(), ThreadPoolBackend)
+
+        comment.text = 'changed text'
+        comment.save()
+
+        get_backend().flush()
+
+        # Recording instances are re-evaluated by workers, so intermediate
+        # states may have been coalesced.
+        self.assertTrue(comment.records.exists())
+        self.assertEqual(comment.records.latest().text, 'changed text')
+
+
+    def test_recording_on_commit(self):
+        backend = get_backend()
+        self.assertIsInstance(backend, ThreadPoolBackend)
+
+        put_jobs = []
+        put = backend.put
+        backend.put = lambda job: put_jobs.append(job) or put(job)
+
+        # Workers can't see rows of the transaction until it commits.
+        with transaction.atomic():
+            comment = create_comment()
+            comment.text = 'changed text'
+            comment.save()
+            self.assertEqual(put_jobs, [])
+
+        backend.flush()
+
+        self.assertTrue(comment.records.exists())
+        self.assertEqual(comment.records.latest().text, 'changed text')
+
+    def test_no_recording_on_rollback(self):
+        with self.settings(RECORD_BACKEND={}):
+            comment = create_comment()
+        number_of_records_before_save = comment.records.count()
+
+        try:
+            with transaction.atomic():
+                comment.text = 'changed text'
+                comment.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        get_backend().flush()
+
+        self.assertEqual(
+            number_of_records_before_save, comment.records.count()
+        )
+        self.assertFalse(
+            comment.records.filter(text='changed text').exists()
+        )
+
+
+class FanOutTest(TestCase):
+    def setUp(self):
+        self.article = create_comment().article
+        for _ in range(4):
+            Comment.objects.create(
+                article=self.article, point='point', text='text', impact=1,
+                impact_rate=0.5
+            )
+        self.comments = list(self.article.comments.order_by('pk'))
+
+        override = override_record_meta(CommentRecord, fan_out_chunk_size=2,
+                                        fan_out_limit=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        DeferringBackend.deferred = []
+
+    def tearDown(self):
+        Article.objects.all().delete()
+
+    def get_recorded_comments(self, title):
+        return set(
+            CommentRecord.objects
+            .filter(reverse_related_property=title)
+            .values_list('recording', flat=True)
+        )
+
+    def test_fan_out_chunks(self):
+        # Chunks are fetched one by one as they're consumed.
+        chunks = CommentRecord.iter_affected_recordings(self.article)
+        with self.assertNumQueries(1):
+            chunks = [next(chunks)]
+        chunks.extend(CommentRecord.iter_affected_recordings(
+            self.article, after=chunks[0][-1].pk
+        ))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(sum(chunks, []), self.comments)
+
+        chunks = list(CommentRecord.iter_affected_recordings(
+            self.article, after=self.comments[2].pk
+        ))
+        self.assertEqual(sum(chunks, []), self.comments[3:])
+
+    @override_settings(RECORD_BACKEND={
+        'BACKEND': 'django_record.tests.test_backends.DeferringBackend'
+    })
+    def test_fan_out_overflow_deferred(self):
+        self.article.title = 'changed title'
+        self.article.save()
+
+        # Only the first chunk is recorded within the save.
+        self.assertEqual(
+            self.get_recorded_comments('changed title'),
+            set(comment.pk for comment in self.comments[:2])
+        )
+
+        job, = DeferringBackend.deferred
+        self.assertEqual(job, FanOutJob.capture(
+            CommentRecord, self.article, after=self.comments[1].pk
+        ))
+
+        # Deferred jobs are resumable chunk by chunk.
+        job = job.run(limit=2)
+        self.assertEqual(job.after, self.comments[3].pk)
+        self.assertIsNone(job.run())
+        self.assertEqual(
+            self.get_recorded_comments('changed title'),
+            set(comment.pk for comment in self.comments)
+        )
+
+    @override_settings(RECORD_BACKEND={
+        'BACKEND': 'django_record.tests.test_backends.DeferringBackend'
+    })
+    def test_fan_out_exactly_at_limit_not_deferred(self):
+        self.comments[-1].delete()
+
+        with override_record_meta(CommentRecord,
+                                  fan_out_limit=len(self.comments) - 1):
+            self.article.title = 'changed title'
+            self.article.save()
+
+        self.assertEqual(
+            self.get_recorded_comments('changed title'),
+            set(comment.pk for comment in self.comments[:-1])
+        )
+        self.assertEqual(DeferringBackend.deferred, [])
+
+    def test_fan_out_overflow_run_by_sync_backend(self):
+        self.article.title = 'changed title'
+        self.article.save()
+
+        self.assertEqual(
+            self.get_recorded_comments('changed title'),
+            set(comment.pk for comment in self.comments)
+        )
+
+    def test_fan_out_job_of_deleted_relative(self):
+        job = FanOutJob.capture(CommentRecord, self.article)
+        self.article.delete()
+
+        self.assertIsNone(job.run())
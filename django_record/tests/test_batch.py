@@ -0,0 +1,141 @@
+from unittest import skipIf, skipUnless
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from random import randint, uniform
+from faker import Faker
+
+from ..batch import BATCH_SUPPORTED
+from .models import TITLE_MAX_LENGTH, POINT_MAX_LENGTH, TEXT_MAX_LENGTH
+from .models import Article, Comment
+from .models import CommentRecord
+from .utils import override_record_meta
+
+
+f = Faker()
+
+
+@skipUnless(BATCH_SUPPORTED, 'transaction.on_commit is not supported')
+class BatchTest(TransactionTestCase):
+    def setUp(self):
+        override = override_record_meta(CommentRecord,
+                                        batch_in_transaction=True)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        article = Article.objects.create(
+            title=f.text()[:TITLE_MAX_LENGTH]
+        )
+
+        Comment.objects.create(
+            article=article,
+            point=f.text()[:POINT_MAX_LENGTH],
+            text=f.text()[:TEXT_MAX_LENGTH],
+            impact=randint(0, 10),
+            impact_rate=uniform(0, 1)
+        )
+
+    def tearDown(self):
+        Article.objects.all().delete()
+
+    def test_record_on_creation_outside_transaction(self):
+        comment = Comment.objects.first()
+        self.assertEqual(comment.records.count(), 1)
+
+    def test_recording_coalesced_on_commit(self):
+        comment = Comment.objects.first()
+        number_of_records_before_save = comment.records.count()
+
+        with transaction.atomic():
+            for impact in range(100, 105):
+                comment.impact = impact
+                comment.save()
+
+            self.assertEqual(
+                number_of_records_before_save, comment.records.count()
+            )
+
+        self.assertEqual(
+            number_of_records_before_save + 1, comment.records.count()
+        )
+        self.assertEqual(comment.records.latest().impact, 104)
+
+    def test_indirect_effect_recording_batched_on_commit(self):
+        article = Article.objects.first()
+        comments = []
+
+        with transaction.atomic():
+            for _ in range(5):
+                comments.append(Comment.objects.create(
+                    article=article,
+                    point=f.text()[:POINT_MAX_LENGTH],
+                    text=f.text()[:TEXT_MAX_LENGTH],
+                    impact=randint(0, 10),
+                    impact_rate=uniform(0, 1)
+                ))
+            article.title = 'changed title'
+            article.save()
+
+        # Created comments are recorded only once with the changed title.
+        for comment in comments:
+            self.assertEqual(comment.records.count(), 1)
+            self.assertEqual(
+                comment.records.latest().reverse_related_property,
+                'changed title'
+            )
+
+    def test_no_recording_on_rollback(self):
+        comment = Comment.objects.first()
+        number_of_records_before_save = comment.records.count()
+
+        try:
+            with transaction.atomic():
+                comment.impact = comment.impact + 1
+                comment.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(
+            number_of_records_before_save, comment.records.count()
+        )
+
+        # Following transactions are not affected by the rolled back batch.
+        with transaction.atomic():
+            comment.text = 'changed text'
+            comment.save()
+
+        self.assertEqual(
+            number_of_records_before_save + 1, comment.records.count()
+        )
+
+
+@skipIf(BATCH_SUPPORTED, 'transaction.on_commit is supported')
+class UnsupportedBatchTest(TestCase):
+    def setUp(self):
+        article = Article.objects.create(
+            title=f.text()[:TITLE_MAX_LENGTH]
+        )
+
+        Comment.objects.create(
+            article=article,
+            point=f.text()[:POINT_MAX_LENGTH],
+            text=f.text()[:TEXT_MAX_LENGTH],
+            impact=randint(0, 10),
+            impact_rate=uniform(0, 1)
+        )
+
+    def test_batch_in_transaction_not_supported(self):
+        comment = Comment.objects.first()
+        number_of_records_before_save = comment.records.count()
+
+        with override_record_meta(CommentRecord, batch_in_transaction=True):
+            with self.assertRaises(ImproperlyConfigured):
+                comment.impact = comment.impact + 1
+                comment.save()
+
+        self.assertEqual(
+            number_of_records_before_save, comment.records.count()
+        )
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.six import StringIO
+
+from ..compaction import CompactionJob, get_retention_windows
+from .models import Author
+
+
+NOW = datetime(2016, 1, 1)
+
+# Ages of records of each author, and whether if they survive compaction.
+AGES = [
+    # Kept as they are for 7 days.
+    (timedelta(days=1, minutes=10), True),
+    (timedelta(days=1, minutes=20), True),
+    # The last record of each hour for 90 days.
+    (timedelta(days=30, minutes=10), True),
+    (timedelta(days=30, minutes=20), False),
+    (timedelta(days=30, minutes=90), True),
+    # The last record of each day for a year.
+    (timedelta(days=100, hours=1), True),
+    (timedelta(days=100, hours=2), False),
+    # Deleted after a year.
+    (timedelta(days=400), False),
+]
+AUTHOR_NUM = 3
+
+
+class CompactionTest(TestCase):
+    def setUp(self):
+        self.record_model = apps.get_model('tests', 'AuthorRecord')
+        self.authors = [Author.objects.create(name='author') for _ in
+                        range(AUTHOR_NUM)]
+        self.record_model.objects.all().delete()
+
+        self.kept = set()
+        for author in self.authors:
+            for i, (age, kept) in enumerate(AGES):
+                record = self.record_model.objects.create(
+                    recording=author, name='author', reputation=i
+                )
+                self.record_model.objects.filter(pk=record.pk) \
+                    .update(created=NOW - age)
+                if kept:
+                    self.kept.add(record.pk)
+
+    def tearDown(self):
+        Author.objects.all().delete()
+
+    def remaining(self):
+        return set(self.record_model.objects.values_list('pk', flat=True))
+
+    def test_retention_windows(self):
+        self.assertEqual(get_retention_windows(self.record_model, NOW), [
+            (NOW - timedelta(days=90), NOW - timedelta(days=7), 'H'),
+            (NOW - timedelta(days=365), NOW - timedelta(days=90), 'D'),
+            (None, NOW - timedelta(days=365), None),
+        ])
+
+    def test_compact_records(self):
+        deleted = self.record_model.compact_records(NOW)
+
+        self.assertEqual(deleted, AUTHOR_NUM * 3)
+        self.assertEqual(self.remaining(), self.kept)
+
+    def test_compaction_idempotent(self):
+        self.record_model.compact_records(NOW)
+        self.assertEqual(self.record_model.compact_records(NOW), 0)
+        self.assertEqual(self.remaining(), self.kept)
+
+    def test_bounded_batches(self):
+        # A query for recording instances and a statement per retention window
+        # for each batch.
+        with CaptureQueriesContext(connection) as context:
+            self.record_model.compact_records(NOW, batch_size=2)
+        deletes = [query for query in context.captured_queries if
+                   'DELETE' in query['sql']]
+        self.assertEqual(len(deletes), 2 * 3)
+        self.assertEqual(self.remaining(), self.kept)
+
+    def test_resume(self):
+        job = CompactionJob.capture(self.record_model, NOW)
+        job = job.run(limit=1, batch_size=1)
+
+        self.assertEqual(job.after, self.authors[0].pk)
+        self.assertEqual(
+            self.record_model.objects.filter(recording=self.authors[1])
+            .count(), len(AGES)
+        )
+
+        while job is not None:
+            job = job.run(limit=1, batch_size=1)
+        self.assertEqual(self.remaining(), self.kept)
+
+    def test_limit_counts_recording_instances(self):
+        # The last batch has a single recording instance, so the limit is not
+        # reached.
+        job = CompactionJob.capture(self.record_model, NOW)
+        self.assertIsNone(job.run(limit=AUTHOR_NUM + 1, batch_size=2))
+        self.assertEqual(self.remaining(), self.kept)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('compact_records', 'tests.AuthorRecord', limit=1,
+                     batch_size=1, now=NOW.isoformat(), stdout=out)
+        self.assertIn('deleted 3 records', out.getvalue())
+        self.assertIn('--after {}'.format(self.authors[0].pk), out.getvalue())
+
+        out = StringIO()
+        call_command('compact_records', now=NOW.isoformat(), stdout=out)
+        self.assertIn('tests.AuthorRecord: deleted 6 records',
+                      out.getvalue())
+        self.assertEqual(self.remaining(), self.kept)
@@ -0,0 +1,105 @@
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from .. import dedup
+from ..dedup import DeduplicationJob
+from .models import Article, Author, Bookmark
+
+
+# Values of records of each author, with consecutive duplicates.
+EMAILS = [None, None, 'a@b.com', 'a@b.com', 'a@b.com', None, 'a@b.com']
+AUTHOR_NUM = 3
+
+
+class DeduplicationTest(TestCase):
+    def setUp(self):
+        self.record_model = apps.get_model('tests', 'AuthorRecord')
+        self.authors = [Author.objects.create(name='author') for _ in
+                        range(AUTHOR_NUM)]
+        self.record_model.objects.all().delete()
+
+        # Records of authors are interleaved.
+        self.kept = set()
+        for i, email in enumerate(EMAILS):
+            for author in self.authors:
+                record = self.record_model.objects.create(
+                    recording=author, name='author', email=email
+                )
+                if i == 0 or EMAILS[i - 1] != email:
+                    self.kept.add(record.pk)
+
+    def tearDown(self):
+        Author.objects.all().delete()
+
+    def remaining(self):
+        return set(self.record_model.objects.values_list('pk', flat=True))
+
+    def test_dry_run(self):
+        self.assertEqual(self.record_model.deduplicate_records(dry_run=True),
+                         AUTHOR_NUM * 3)
+        self.assertEqual(len(self.remaining()), AUTHOR_NUM * len(EMAILS))
+
+    def test_deduplicate_records(self):
+        self.assertEqual(self.record_model.deduplicate_records(batch_size=2),
+                         AUTHOR_NUM * 3)
+        self.assertEqual(self.remaining(), self.kept)
+        self.assertEqual(self.record_model.deduplicate_records(), 0)
+
+    def test_deduplicate_without_window_functions(self):
+        supports_window_functions = dedup.supports_window_functions
+        dedup.supports_window_functions = lambda connection: False
+
+        try:
+            self.assertEqual(self.record_model.deduplicate_records(),
+                             AUTHOR_NUM * 3)
+            self.assertEqual(self.remaining(), self.kept)
+
+        finally:
+            dedup.supports_window_functions = supports_window_functions
+
+    def test_resume(self):
+        job = DeduplicationJob.capture(self.record_model)
+        job = job.run(limit=1, batch_size=1)
+
+        self.assertEqual(job.after, self.authors[0].pk)
+        self.assertEqual(
+            self.record_model.objects.filter(recording=self.authors[1])
+            .count(), len(EMAILS)
+        )
+
+        while job is not None:
+            job = job.run(limit=1, batch_size=1)
+        self.assertEqual(self.remaining(), self.kept)
+
+    def test_fingerprints_compared(self):
+        bookmark = Bookmark.objects.create(
+            article=Article.objects.create(title='title'), note='note'
+        )
+        bookmark_record_model = apps.get_model('tests', 'BookmarkRecord')
+        bookmark_record_model.record(bookmark)
+        bookmark_record_model.record(bookmark)
+
+        self.assertEqual(bookmark.records.count(), 3)
+        self.assertEqual(bookmark_record_model.deduplicate_records(), 2)
+        self.assertEqual(bookmark.records.count(), 1)
+
+        Article.objects.all().delete()
+
+    def test_delta_records_not_deduplicated(self):
+        with self.assertRaises(ValueError):
+            apps.get_model('tests', 'ProfileRecord').deduplicate_records()
+
+    def test_command(self):
+        out = StringIO()
+        call_command('dedup_records', 'tests.AuthorRecord', dry_run=True,
+                     stdout=out)
+        self.assertIn('found 9 duplicate records of 3 recording instances',
+                      out.getvalue())
+
+        out = StringIO()
+        call_command('dedup_records', 'tests.AuthorRecord', limit=1,
+                     batch_size=1, stdout=out)
+        self.assertIn('deleted 3 duplicate records', out.getvalue())
+        self.assertIn('--after {}'.format(self.authors[0].pk), out.getvalue())
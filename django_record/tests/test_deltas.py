@@ -0,0 +1,125 @@
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..snapshots import get_snapshot_columns
+from .models import Profile
+
+
+class DeltaRecordTest(TestCase):
+    def setUp(self):
+        self.record_model = apps.get_model('tests', 'ProfileRecord')
+        self.profile = Profile.objects.create(bio='a long biography')
+
+    def tearDown(self):
+        Profile.objects.all().delete()
+
+    def stored(self):
+        return list(self.profile.records.order_by('created', 'pk').values(
+            'delta_depth', 'bio', 'views', 'rating'
+        ))
+
+    def test_only_changed_fields_stored(self):
+        self.profile.views = 1
+        self.profile.save()
+
+        keyframe, delta = self.stored()
+        self.assertEqual(keyframe, {'delta_depth': 0,
+                                    'bio': 'a long biography', 'views': 0,
+                                    'rating': None})
+        self.assertEqual(delta, {'delta_depth': 1, 'bio': None, 'views': 1,
+                                 'rating': None})
+
+    def test_keyframe_interval(self):
+        for views in range(1, 6):
+            self.profile.views = views
+            self.profile.save()
+
+        self.assertEqual([row['delta_depth'] for row in self.stored()],
+                         [0, 1, 2, 0, 1, 2])
+        self.assertEqual(self.stored()[3]['bio'], 'a long biography')
+
+    def test_unchanged_save_not_recorded(self):
+        self.profile.views = 1
+        self.profile.save()
+        self.profile.save()
+
+        self.assertEqual(self.profile.records.count(), 2)
+        self.assertEqual(
+            self.record_model.get_latest_record_values(self.profile),
+            {'bio': 'a long biography', 'views': 1, 'rating': None}
+        )
+
+    def test_change_to_none_stored(self):
+        self.profile.rating = 4.5
+        self.profile.save()
+        self.profile.rating = None
+        self.profile.save()
+
+        self.assertEqual(self.profile.records.count(), 3)
+        self.assertIsNone(self.profile.records.reconstruct()[-1].rating)
+
+    def test_reconstruct(self):
+        for views in range(1, 8):
+            self.profile.views = views
+            if views == 5:
+                self.profile.bio = 'a shorter bio'
+            self.profile.save()
+
+        records = self.profile.records.order_by('created', 'pk')
+
+        # Keyframes need no former records.
+        with CaptureQueriesContext(connection) as context:
+            keyframes = records.filter(delta_depth=0).reconstruct()
+        self.assertEqual(len(context), 1)
+        self.assertEqual([record.views for record in keyframes], [0, 3, 6])
+
+        # Records in the middle of deltas are rebuilt from their keyframes.
+        with CaptureQueriesContext(connection) as context:
+            reconstructed = records[5:].reconstruct()
+        self.assertEqual(len(context), 2)
+        self.assertEqual(
+            [(record.bio, record.views) for record in reconstructed],
+            [('a shorter bio', 5), ('a shorter bio', 6),
+             ('a shorter bio', 7)]
+        )
+
+    def test_record_many(self):
+        profiles = [self.profile, Profile.objects.create(views=3)]
+        Profile.objects.update(views=10)
+
+        instances = list(Profile.objects.all())
+
+        # A query for states of the latest records and a `bulk_create()`.
+        with CaptureQueriesContext(connection) as context:
+            recorded = self.record_model.record_many(instances,
+                                                     detect_changes=True)
+        self.assertEqual(len(recorded), 2)
+        self.assertEqual(len(context), 2)
+
+        for profile in profiles:
+            latest = profile.records.order_by('-created', '-pk').first()
+            self.assertEqual(latest.delta_depth, 1)
+            self.assertIsNone(latest.bio)
+            self.assertEqual(latest.views, 10)
+
+    def test_not_snapshotted_in_sql(self):
+        with self.assertRaises(ValueError):
+            get_snapshot_columns(self.record_model)
+
+    def test_reconstruct_many_recordings(self):
+        self.profile.views = 1
+        self.profile.save()
+
+        # Recorded only after the earliest delta record of the other profile.
+        other = Profile.objects.create(bio='another biography')
+        other.views = 2
+        other.save()
+
+        deltas = self.record_model.objects.filter(delta_depth=1) \
+            .order_by('created', 'pk').reconstruct()
+        self.assertEqual(
+            [(record.bio, record.views) for record in deltas],
+            [('a long biography', 1), ('another biography', 2)]
+        )
@@ -1,3 +1,4 @@
+from django.apps import apps
 from django.test import TestCase
 
 from random import randint, uniform
@@ -98,3 +99,11 @@ class EndurabilityTest(TestCase):
 
                 if identical:
                     self.fail('duplicate record')
+
+    def test_no_duplicate_records_in_bulk(self):
+        # Consecutive duplicates of all recording instances are found with a
+        # single query per batch.
+        for record_model in (apps.get_model('tests', 'ArticleRecord'),
+                             apps.get_model('tests', 'VoteRecord'),
+                             CommentRecord):
+            self.assertEqual(record_model.deduplicate_records(dry_run=True), 0)
@@ -0,0 +1,112 @@
+import numpy as np
+
+from django.test import TestCase
+
+from ..export import get_dtype
+from .models import Article, Author, Comment
+from .models import CommentRecord
+
+
+AUTHOR_NUM = 5
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        for i in range(AUTHOR_NUM):
+            Author.objects.create(name='author {}'.format(i), reputation=i)
+
+        self.record_model = Author.objects.first().records.model
+        self.records = self.record_model.objects.all()
+
+    def tearDown(self):
+        Author.objects.all().delete()
+        Article.objects.all().delete()
+
+    def test_dtypes(self):
+        meta = self.record_model._meta
+        self.assertEqual(get_dtype(meta.get_field('created')),
+                         'datetime64[us]')
+        self.assertEqual(get_dtype(meta.get_field('recording')), 'int64')
+        self.assertEqual(get_dtype(meta.get_field('name')), 'object')
+        self.assertEqual(get_dtype(meta.get_field('reputation')), 'int64')
+        self.assertEqual(
+            get_dtype(CommentRecord._meta.get_field('impact_rate')), 'float64'
+        )
+
+    def test_to_arrays(self):
+        arrays = self.records.to_arrays()
+
+        self.assertEqual(
+            list(arrays),
+            ['created', 'recording', 'name', 'email', 'reputation']
+        )
+        self.assertEqual(arrays['reputation'].dtype, np.int64)
+        self.assertEqual(arrays['created'].dtype, np.dtype('datetime64[us]'))
+        self.assertEqual(
+            list(arrays['reputation']), list(range(AUTHOR_NUM))
+        )
+        self.assertEqual(
+            list(arrays['recording']),
+            list(Author.objects.order_by('pk').values_list('pk', flat=True))
+        )
+        self.assertEqual(list(arrays['email']), [None] * AUTHOR_NUM)
+
+    def test_to_arrays_in_keyset_chunks(self):
+        # Chunks of 2, 2 and 1 records.
+        with self.assertNumQueries(4):
+            arrays = self.records.to_arrays(['reputation'], chunksize=2)
+
+        self.assertEqual(list(arrays['reputation']), list(range(AUTHOR_NUM)))
+
+        # Records are counted beforehand, so that no query tells that there's
+        # no more records.
+        with self.assertNumQueries(2):
+            self.records.filter(reputation__lt=2).to_arrays(chunksize=2)
+
+    def test_to_arrays_of_empty_queryset(self):
+        with self.assertNumQueries(1):
+            arrays = self.records.filter(reputation__lt=0) \
+                .to_arrays(['reputation'])
+
+        self.assertEqual(len(arrays['reputation']), 0)
+        self.assertEqual(arrays['reputation'].dtype, np.int64)
+
+    def test_iter_chunks(self):
+        chunks = self.records.iter_chunks(['reputation'], chunksize=2)
+        self.assertEqual(
+            [list(chunk['reputation']) for chunk in chunks],
+            [[0, 1], [2, 3], [4]]
+        )
+
+    def test_iter_chunks_in_order_of_primary_keys(self):
+        self.assertEqual(
+            len(list(self.records.order_by('pk').iter_chunks(chunksize=2))), 3
+        )
+
+        with self.assertRaises(ValueError):
+            self.records.order_by('-created').iter_chunks()
+        with self.assertRaises(ValueError):
+            self.records.order_by('-pk').to_arrays()
+
+    def test_iter_chunks_of_sliced_queryset(self):
+        with self.assertRaises(TypeError):
+            self.records.all()[:2].iter_chunks()
+        with self.assertRaises(TypeError):
+            self.records.all()[2:].to_frame()
+
+    def test_to_frame(self):
+        frame = self.records.filter(reputation__gte=2) \
+            .to_frame(['created', 'reputation'], chunksize=2, index='created')
+
+        self.assertEqual(list(frame.columns), ['reputation'])
+        self.assertEqual(list(frame['reputation']), [2, 3, 4])
+        self.assertTrue(np.issubdtype(frame.index.dtype, np.datetime64))
+
+    def test_to_frame_of_properties(self):
+        article = Article.objects.create(title='title')
+        Comment.objects.create(article=article, point='point', text='text',
+                               impact=1, impact_rate=0.5)
+
+        frame = CommentRecord.objects.to_frame()
+        self.assertEqual(frame['float_property'].dtype, np.float64)
+        self.assertEqual(list(frame['string_property']), ['pointtext'])
@@ -0,0 +1,120 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..audit import get_dependencies
+from .models import Forum, Post
+
+
+FORUM_NUM = 3
+POST_NUM = 2
+
+
+def create_post(forum):
+    return Post.objects.create(forum=forum, text='text')
+
+
+class ExpressionTest(TestCase):
+    def setUp(self):
+        for _ in range(FORUM_NUM):
+            forum = Forum.objects.create(title='title')
+            for _ in range(POST_NUM):
+                create_post(forum)
+
+        self.record_model = Forum.objects.first().records.model
+
+    def tearDown(self):
+        Forum.objects.all().delete()
+
+    def count_aggregations(self, context):
+        return len([query for query in context.captured_queries if
+                    'COUNT(' in query['sql']])
+
+    def test_recording_expressions(self):
+        self.assertEqual(Forum.recording_fields, ['post_count'])
+        self.assertEqual(
+            list(self.record_model.recording_expressions), ['post_count']
+        )
+        self.assertEqual(
+            get_dependencies(self.record_model),
+            {'post_count': ('posts', )}
+        )
+        self.assertEqual(
+            self.record_model.get_dependent_fields(Post),
+            frozenset(['forum', 'forum_id'])
+        )
+
+    def test_expression_recorded(self):
+        forum = Forum.objects.first()
+        self.assertEqual(forum.records.latest().post_count, POST_NUM)
+
+        create_post(forum)
+        self.assertEqual(
+            forum.records.latest().post_count, POST_NUM + 1
+        )
+        self.assertEqual(
+            forum.records.latest().post_count, forum.post_count
+        )
+
+    def test_expressions_of_many_instances_in_single_query(self):
+        forums = list(Forum.objects.all())
+
+        with CaptureQueriesContext(connection) as context:
+            self.record_model.record_many(forums)
+
+        self.assertEqual(self.count_aggregations(context), 1)
+        for forum in forums:
+            self.assertEqual(forum.records.latest().post_count,
+                             POST_NUM)
+
+    def test_annotated_expressions_consumed(self):
+        forums = list(
+            self.record_model.annotate_recording_values(Forum.objects.all())
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            self.record_model.record_many(forums)
+
+        self.assertEqual(self.count_aggregations(context), 0)
+
+        # Annotations are not reused for later recordings.
+        create_post(forums[0])
+        self.record_model.record(forums[0])
+        self.assertEqual(
+            forums[0].records.latest().post_count, POST_NUM + 1
+        )
+
+    def test_snapshot_expressions(self):
+        number_of_records_before_snapshot = self.record_model.objects.count()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.record_model.snapshot_queryset(Forum.objects.all()),
+                FORUM_NUM
+            )
+
+        self.assertEqual(
+            number_of_records_before_snapshot + FORUM_NUM,
+            self.record_model.objects.count()
+        )
+        self.assertEqual(
+            self.record_model.snapshot_queryset(Forum.objects.all(),
+                                                only_changed=True), 0
+        )
+
+        Post.objects.filter(forum=Forum.objects.first()).delete()
+        self.assertEqual(
+            self.record_model.snapshot_queryset(Forum.objects.all(),
+                                                only_changed=True), 1
+        )
+        self.assertEqual(
+            Forum.objects.first().records.latest().post_count, 0
+        )
+
+    def test_profile_expressions(self):
+        profile, = self.record_model.profile_recording_fields(
+            Forum.objects.all()
+        )
+        self.assertEqual(profile.name, 'post_count')
+        self.assertEqual(profile.calls, FORUM_NUM)
+        self.assertEqual(profile.queries, 1)
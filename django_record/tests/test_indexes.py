@@ -0,0 +1,47 @@
+from unittest import skipUnless
+
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+
+from .models import CommentRecord
+
+
+def get_indexed_columns(model):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        )
+
+    return [tuple(constraint['columns']) for constraint in
+            constraints.values() if constraint['index']]
+
+
+class IndexTest(TestCase):
+    def test_recording_created_index(self):
+        self.assertIn(('recording', 'created', 'id'),
+                      CommentRecord._meta.index_together)
+        self.assertIn(('recording_id', 'created', 'id'),
+                      get_indexed_columns(CommentRecord))
+        self.assertNotIn(('created', ), get_indexed_columns(CommentRecord))
+
+    def test_created_index(self):
+        record_model = apps.get_model('tests', 'AuthorRecord')
+
+        self.assertIn(('created', ), record_model._meta.index_together)
+        self.assertIn(('created', ), get_indexed_columns(record_model))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Query plans of SQLite')
+    def test_latest_record_looked_up_by_index(self):
+        queryset = CommentRecord.objects \
+            .filter(recording=1) \
+            .order_by('-created', '-pk')[:1]
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+        # Records are neither scanned nor sorted.
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -1,10 +1,12 @@
+from django.apps import apps
 from django.test import TestCase
 
 from random import randint, uniform
 from faker import Faker
 
 from .models import TITLE_MAX_LENGTH, POINT_MAX_LENGTH, TEXT_MAX_LENGTH
-from .models import Article, Comment, Vote
+from .models import Article, Bookmark, Comment, Vote
+from ..utils import fingerprint
 
 
 f = Faker()
@@ -96,3 +98,58 @@ class MixinTest(TestCase):
         comment.save()
 
         self.assertEqual(number_of_records_before_save, vote.records.count())
+
+    def test_fingerprinted_records(self):
+        bookmark = Bookmark.objects.create(article=Article.objects.first(),
+                                           note='note')
+        r = bookmark.records.latest()
+
+        self.assertEqual(r.fingerprint, fingerprint(
+            [r.article_id, r.note, r.position]
+        ))
+
+    def test_fingerprinted_related_instance(self):
+        article = Article.objects.first()
+        other = Article.objects.create(title=f.text()[:TITLE_MAX_LENGTH])
+        bookmark = Bookmark.objects.create(article=article, note='note')
+        self.assertEqual(bookmark.records.count(), 1)
+
+        bookmark.article = other
+        bookmark.save()
+
+        self.assertEqual(bookmark.records.count(), 2)
+        self.assertEqual(bookmark.records.latest().article, other)
+
+    def test_changed_save_recording_with_fingerprint(self):
+        bookmark = Bookmark.objects.create(article=Article.objects.first(),
+                                           note='note')
+        bookmark = Bookmark.objects.select_related('article') \
+            .get(pk=bookmark.pk)
+        record_model = apps.get_model('tests', 'BookmarkRecord')
+
+        with self.assertNumQueries(1):
+            self.assertFalse(record_model.recording_instance_changed(bookmark))
+
+        bookmark.note = 'changed note'
+        self.assertTrue(record_model.recording_instance_changed(bookmark))
+
+    def test_record_queryset_in_batched_queries(self):
+        comment = Comment.objects.first()
+        for _ in range(5):
+            Vote.objects.create(comment=comment, score=randint(0, 10))
+
+        record_model = Vote.objects.first().records.model
+        number_of_records_before_update = record_model.objects.count()
+        Vote.objects.update(score=999)
+
+        # A query for votes, a query for latest values and a query for creating
+        # records.
+        with self.assertNumQueries(3):
+            count = record_model.record_queryset(
+                Vote.objects.select_related('comment')
+            )
+
+        self.assertEqual(count, 6)
+        self.assertEqual(
+            number_of_records_before_update + 6, record_model.objects.count()
+        )
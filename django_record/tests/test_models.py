@@ -1,10 +1,15 @@
+from django.apps import apps
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from random import randint, uniform
 from faker import Faker
 
 from .models import TITLE_MAX_LENGTH, POINT_MAX_LENGTH, TEXT_MAX_LENGTH
-from .models import Article, Comment, Vote
+from .models import Article, Badge, Citation, Comment, Member, Team, Vote
+from .models import CommentRecord, MemberRecord
+from .utils import override_record_meta
 
 
 f = Faker()
@@ -58,6 +63,26 @@ class ModelTest(TestCase):
             number_of_records_before_save, comment.records.count()
         )
 
+    def test_related_instance_recording(self):
+        article = Article.objects.first()
+        citation = Citation.objects.create(article=article, page=1)
+
+        for _ in range(3):
+            citation.save()
+        self.assertEqual(citation.records.count(), 1)
+
+        # Latest values of many recording instances are compared as well.
+        record_model = apps.get_model('tests', 'CitationRecord')
+        self.assertEqual(
+            record_model.record_queryset(Citation.objects.all()), 0
+        )
+
+        citation.article = Article.objects.create(title='other')
+        citation.save()
+        self.assertEqual(citation.records.count(), 2)
+        self.assertEqual(citation.records.latest().article,
+                         citation.article)
+
     def test_indirect_effect_recording_on_related_changed_save(self):
         comment = Comment.objects.first()
         vote = comment.votes.first()
@@ -112,3 +137,229 @@ class ModelTest(TestCase):
         self.assertEqual(
             number_of_records_before_save, comment.records.count()
         )
+
+    def test_latest_record_values_in_single_query(self):
+        comment = Comment.objects.first()
+
+        with self.assertNumQueries(1):
+            latest_values = CommentRecord.get_latest_record_values(comment)
+
+        latest_record = comment.records.latest()
+        for name in CommentRecord.recording_fields:
+            self.assertEqual(latest_values[name], getattr(latest_record, name))
+
+    def test_latest_record_values_cached(self):
+        with override_record_meta(CommentRecord, cache_latest_record=True):
+            comment = Comment.objects.first()
+            comment.text = 'changed text'
+            comment.save()
+
+            with self.assertNumQueries(0):
+                latest_values = CommentRecord.get_latest_record_values(comment)
+
+            self.assertEqual(latest_values['text'], 'changed text')
+
+    def test_record_queryset(self):
+        comment = Comment.objects.first()
+        number_of_records_before_update = comment.records.count()
+
+        # `update()` doesn't send `post_save` signals.
+        Comment.objects.update(text='updated text')
+        self.assertEqual(
+            number_of_records_before_update, comment.records.count()
+        )
+
+        self.assertEqual(
+            CommentRecord.record_queryset(Comment.objects.all()), 1
+        )
+        self.assertEqual(
+            number_of_records_before_update + 1, comment.records.count()
+        )
+        self.assertEqual(comment.records.latest().text, 'updated text')
+
+        # Unchanged instances are not recorded again.
+        self.assertEqual(
+            CommentRecord.record_queryset(Comment.objects.all()), 0
+        )
+        self.assertEqual(
+            CommentRecord.record_queryset(Comment.objects.all(),
+                                          detect_changes=False), 1
+        )
+
+    def test_latest_record_values_in_bulk(self):
+        comment = Comment.objects.first()
+        comment.text = 'changed text'
+        comment.save()
+
+        # A record with a greater primary key but created earlier is not the
+        # latest one.
+        stale_record = CommentRecord._make_record(
+            comment, CommentRecord.get_recording_values(comment)
+        )
+        stale_record.text = 'stale text'
+        stale_record.save(force_insert=True)
+        CommentRecord.objects.filter(pk=stale_record.pk).update(
+            created=comment.records.earliest().created
+        )
+
+        with self.assertNumQueries(1):
+            latest_values = CommentRecord.get_latest_record_values_in_bulk(
+                [comment.pk]
+            )
+
+        self.assertEqual(
+            latest_values[comment.pk],
+            CommentRecord.get_latest_record_values(comment)
+        )
+        self.assertEqual(latest_values[comment.pk]['text'], 'changed text')
+
+    def test_recording_instances_changed(self):
+        article = Article.objects.first()
+        comments = [Comment.objects.create(
+            article=article, point='point', text='text', impact=1,
+            impact_rate=0.5
+        ) for _ in range(3)]
+        comments[0].text = 'changed text'
+
+        with self.assertNumQueries(1):
+            CommentRecord.get_latest_record_values_in_bulk(
+                [comment.pk for comment in comments]
+            )
+
+        self.assertEqual(
+            CommentRecord.recording_instances_changed(comments),
+            [comments[0]]
+        )
+
+    def test_indirect_effect_fan_out_recorded_in_bulk(self):
+        article = Article.objects.first()
+        for _ in range(10):
+            Comment.objects.create(
+                article=article, point='point', text='text', impact=1,
+                impact_rate=0.5
+            )
+
+        article.title = 'changed title'
+        with CaptureQueriesContext(connection) as context:
+            article.save()
+
+        # Latest records of all comments are fetched with a single query, and
+        # changed comments are recorded with a single insert.
+        record_queries = [
+            query['sql'] for query in context.captured_queries if
+            connection.ops.quote_name(CommentRecord._meta.db_table) in
+            query['sql']
+        ]
+        self.assertEqual(len(record_queries), 2)
+        self.assertEqual(
+            CommentRecord.objects.filter(
+                reverse_related_property='changed title'
+            ).count(),
+            article.comments.count()
+        )
+
+    def test_recording_values_evaluated_once(self):
+        comment = Comment.objects.first()
+        number_of_records_before_save = comment.records.count()
+        comment.text = 'changed text'
+
+        with CaptureQueriesContext(connection) as context:
+            comment.save()
+
+        # `related_property` aggregates scores of votes only once for both
+        # change detection and the record.
+        self.assertEqual(len([
+            query for query in context.captured_queries if
+            'SUM(' in query['sql']
+        ]), 1)
+        self.assertEqual(
+            number_of_records_before_save + 1, comment.records.count()
+        )
+
+    def test_profile_recording_fields(self):
+        comments = list(Comment.objects.all())
+        profiles = CommentRecord.profile_recording_fields(comments)
+
+        self.assertEqual(
+            set(profile.name for profile in profiles),
+            set(CommentRecord.recording_fields)
+        )
+        profiles = dict((profile.name, profile) for profile in profiles)
+        self.assertEqual(profiles['text'].queries, 0)
+        self.assertEqual(profiles['related_property'].calls, len(comments))
+        self.assertEqual(
+            profiles['related_property'].queries, 2 * len(comments)
+        )
+
+
+class TrackedModelTest(TestCase):
+    def setUp(self):
+        team = Team.objects.create(name='team')
+        member = Member.objects.create(team=team, name='member', level=1)
+        Badge.objects.create(member=member, points=10)
+
+    def tearDown(self):
+        Team.objects.all().delete()
+
+    def test_tracked_fields(self):
+        self.assertEqual(
+            set(MemberRecord.get_tracked_fields()),
+            set(['name', 'level', 'team_id'])
+        )
+
+    def test_untracked_save_without_query(self):
+        member = Member.objects.first()
+        self.assertFalse(MemberRecord.recording_instance_dirty(member))
+
+        with CaptureQueriesContext(connection) as context:
+            member.save()
+
+        self.assertFalse(any(
+            MemberRecord._meta.db_table in query['sql'] for query in
+            context.captured_queries
+        ))
+
+    def test_tracked_changed_save_recording(self):
+        member = Member.objects.first()
+
+        number_of_records_before_save = member.records.count()
+        member.level = member.level + 1
+        self.assertTrue(MemberRecord.recording_instance_dirty(member))
+        member.save()
+        self.assertFalse(MemberRecord.recording_instance_dirty(member))
+
+        self.assertEqual(
+            number_of_records_before_save + 1, member.records.count()
+        )
+        self.assertEqual(member.records.latest().next_level, member.level + 1)
+
+    def test_dependent_fields(self):
+        self.assertEqual(
+            MemberRecord.get_dependent_fields(Badge),
+            frozenset(['points', 'member', 'member_id'])
+        )
+        self.assertEqual(
+            MemberRecord.get_dependent_fields(Team), frozenset(['name'])
+        )
+
+    def test_update_fields_save_skips_recording(self):
+        member = Member.objects.first()
+        team = member.team
+
+        number_of_records_before_save = member.records.count()
+
+        # Neither `modified` of the member nor of the team is recorded.
+        member.name = 'changed name'
+        member.save(update_fields=['modified'])
+        team.name = 'changed name'
+        team.save(update_fields=['modified'])
+
+        self.assertEqual(
+            number_of_records_before_save, member.records.count()
+        )
+
+        team.save(update_fields=['name'])
+        self.assertEqual(
+            number_of_records_before_save + 1, member.records.count()
+        )
+        self.assertEqual(member.records.latest().team_name, 'changed name')
@@ -0,0 +1,233 @@
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from ..partitions import create_partition, drop_partitions
+from ..partitions import get_partition_bounds, get_partition_keys
+from ..partitions import get_partition_model
+from .models import Event
+
+
+# A month long before the current one.
+PAST_KEY = '201511'
+PAST = datetime(2015, 11, 15)
+
+
+class PartitionTest(TransactionTestCase):
+    def setUp(self):
+        self.record_model = apps.get_model('tests', 'EventRecord')
+        self.current_key = datetime.now().strftime('%Y%m')
+
+    def tearDown(self):
+        drop_partitions(self.record_model,
+                        datetime.now() + timedelta(days=100))
+        Event.objects.all().delete()
+
+    def create_past_record(self, event, **values):
+        model = create_partition(self.record_model, PAST_KEY)
+        return model.objects.create(recording=event, created=PAST,
+                                    modified=PAST, **values)
+
+    def count_rows(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM {}'.format(
+                connection.ops.quote_name(table)
+            ))
+            return cursor.fetchone()[0]
+
+    def test_partition_bounds(self):
+        self.assertEqual(get_partition_bounds(self.record_model, '201512'),
+                         (datetime(2015, 12, 1), datetime(2016, 1, 1)))
+
+    def test_records_routed_to_partitions(self):
+        event = Event.objects.create(name='event')
+        event.count = 1
+        event.save()
+
+        self.assertEqual(get_partition_keys(self.record_model, connection),
+                         [self.current_key])
+        self.assertEqual(self.count_rows(self.record_model._meta.db_table), 0)
+        self.assertEqual(self.count_rows(
+            get_partition_model(self.record_model, self.current_key)
+            ._meta.db_table
+        ), 2)
+
+        # Records are selected from all partitions.
+        self.assertEqual(event.records.count(), 2)
+        self.assertEqual(event.records.latest().count, 1)
+
+    def test_change_detected_across_partitions(self):
+        # Only the past record is left.
+        event = Event.objects.create(name='event')
+        drop_partitions(self.record_model,
+                        datetime.now() + timedelta(days=62))
+        past_record = self.create_past_record(event, name='event', count=0)
+
+        self.assertFalse(self.record_model.record_changed(event))
+        event.count = 2
+        self.assertTrue(self.record_model.record_changed(event))
+
+        # Primary keys are unique across partitions.
+        latest = event.records.latest()
+        self.assertEqual(latest.count, 2)
+        self.assertGreater(latest.pk, past_record.pk)
+
+    def test_time_filters_prune_partitions(self):
+        event = Event.objects.create(name='event')
+        self.create_past_record(event, name='past event', count=0)
+        past_table = get_partition_model(self.record_model, PAST_KEY) \
+            ._meta.db_table
+
+        with CaptureQueriesContext(connection) as context:
+            records = list(event.records.created_in_days(1))
+        self.assertEqual(len(records), 1)
+        self.assertNotIn(past_table, context.captured_queries[0]['sql'])
+
+        with CaptureQueriesContext(connection) as context:
+            records = list(self.record_model.objects.as_of(PAST))
+        self.assertEqual([record.name for record in records], ['past event'])
+        self.assertNotIn('{}_{}'.format(self.record_model._meta.db_table,
+                                        self.current_key),
+                         context.captured_queries[0]['sql'])
+
+        # Resampled across partitions.
+        self.assertEqual(
+            self.record_model.objects.resample('M', by='recording').count(), 2
+        )
+
+    def test_retention_drops_partitions(self):
+        event = Event.objects.create(name='event')
+        self.create_past_record(event, name='past event', count=0)
+
+        self.record_model.compact_records()
+
+        self.assertEqual(get_partition_keys(self.record_model, connection),
+                         [self.current_key])
+        self.assertEqual(event.records.count(), 1)
+
+    def test_create_partitions_command(self):
+        out = StringIO()
+        call_command('create_partitions', 'tests.EventRecord', ahead=2,
+                     stdout=out)
+
+        keys = get_partition_keys(self.record_model, connection)
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(keys[0], self.current_key)
+        self.assertIn('Created {}_{}.'.format(
+            self.record_model._meta.db_table, keys[-1]
+        ), out.getvalue())
+
+        # Existing partitions are left as they are.
+        call_command('create_partitions', ahead=2, stdout=StringIO())
+        self.assertEqual(get_partition_keys(self.record_model, connection),
+                         keys)
+
+    def test_unique_pks_across_partitions_created_ahead(self):
+        event = Event.objects.create(name='event')
+        call_command('create_partitions', 'tests.EventRecord', ahead=1,
+                     stdout=StringIO())
+
+        for count in range(1, 4):
+            event.count = count
+            event.save()
+
+        # Records are routed to the partition created ahead of time once it's
+        # period begins.
+        next_start = get_partition_bounds(self.record_model,
+                                          self.current_key)[1]
+        now = timezone.now
+        timezone.now = lambda: next_start + timedelta(days=1)
+        try:
+            for count in range(4, 7):
+                event.count = count
+                event.save()
+        finally:
+            timezone.now = now
+
+        self.assertEqual(len(get_partition_keys(self.record_model,
+                                                connection)), 2)
+        pks = list(event.records.values_list('pk', flat=True))
+        self.assertEqual(len(pks), 7)
+        self.assertEqual(len(set(pks)), 7)
+        self.assertEqual(event.records.latest().count, 6)
+
+    def test_delete_records(self):
+        event = Event.objects.create(name='event')
+        event.count = 1
+        event.save()
+        self.create_past_record(event, name='past event', count=0)
+
+        self.record_model.objects.filter(count=0).delete()
+        self.assertEqual(list(event.records.values_list('count', flat=True)),
+                         [1])
+
+        event.records.latest().delete()
+        self.assertFalse(event.records.exists())
+
+    def test_delete_record_of_colliding_pk(self):
+        event = Event.objects.create(name='event')
+        record = event.records.latest()
+        past_record = self.create_past_record(event, pk=record.pk,
+                                              name='past event', count=0)
+
+        # Records are told by their partitions as well as their primary keys.
+        self.record_model.objects.get(name='past event').delete()
+        self.assertEqual(list(event.records.all()), [record])
+        self.assertFalse(type(past_record).objects.exists())
+
+    def test_update_records(self):
+        event = Event.objects.create(name='event')
+        self.create_past_record(event, name='past event', count=0)
+
+        self.assertEqual(event.records.update(count=3), 2)
+        self.assertEqual(
+            list(event.records.values_list('count', flat=True)), [3, 3]
+        )
+
+        with self.assertRaises(ValueError):
+            event.records.update(created=PAST)
+
+    def test_save_records(self):
+        event = Event.objects.create(name='event')
+        self.create_past_record(event, name='past event', count=0)
+
+        # Records are updated in their partitions.
+        record = self.record_model.objects.get(name='past event')
+        record.count = 5
+        record.save()
+        self.assertEqual(event.records.count(), 2)
+        self.assertEqual(
+            self.record_model.objects.get(name='past event').count, 5
+        )
+
+        # Records are created in the current partition.
+        record = self.record_model(recording=event, name='saved', count=6)
+        record.save()
+        self.assertEqual(event.records.latest(), record)
+        self.assertEqual(self.count_rows(self.record_model._meta.db_table), 0)
+        self.assertEqual(self.count_rows(
+            get_partition_model(self.record_model, self.current_key)
+            ._meta.db_table
+        ), 2)
+
+    def test_records_deleted_with_recording_instances(self):
+        event = Event.objects.create(name='event')
+        self.create_past_record(event, name='past event', count=0)
+        other_event = Event.objects.create(name='other event')
+
+        event.delete()
+
+        self.assertEqual(self.count_rows(
+            get_partition_model(self.record_model, PAST_KEY)._meta.db_table
+        ), 0)
+        self.assertEqual(
+            list(self.record_model.objects.values_list('recording',
+                                                       flat=True)),
+            [other_event.pk]
+        )
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save
+from django.test import TestCase
+
+from ..registry import recorder_registry
+from .models import Article, Comment, Vote
+from .models import CommentRecord
+
+
+class RegistryTest(TestCase):
+    def test_registry_built_on_app_ready(self):
+        self.assertTrue(recorder_registry.ready)
+        self.assertIn(CommentRecord, recorder_registry.record_models)
+
+    def test_recorders_keyed_by_sender(self):
+        # Comment is recorded by CommentRecord and audited by both ArticleRecord
+        # and VoteRecord.
+        self.assertEqual(
+            len(recorder_registry.get_recorders(post_save, Comment)), 3
+        )
+        # Article is recorded by ArticleRecord and audited by CommentRecord.
+        self.assertEqual(
+            len(recorder_registry.get_recorders(post_save, Article)), 2
+        )
+        # Vote is recorded by VoteRecord and audited by CommentRecord.
+        self.assertEqual(
+            len(recorder_registry.get_recorders(post_save, Vote)), 2
+        )
+
+    def test_no_recorders_for_unaudited_models(self):
+        self.assertEqual(
+            recorder_registry.get_recorders(post_save, CommentRecord), []
+        )
+        self.assertFalse(post_save.has_listeners(CommentRecord))
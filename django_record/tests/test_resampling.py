@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from random import randint, seed
+
+import pandas as pd
+
+from django.db import connection
+from django.test import TestCase
+
+from .. import resampling
+from ..resampling import get_bucket_sql
+from .models import Author
+
+
+RECORD_NUM = 60
+AUTHOR_NUM = 3
+START = datetime(2015, 11, 9, 12, 30)
+
+
+class ResamplingTest(TestCase):
+    def setUp(self):
+        seed(0)
+
+        authors = [Author.objects.create(name='author') for _ in
+                   range(AUTHOR_NUM)]
+        self.record_model = authors[0].records.model
+        self.record_model.objects.bulk_create([
+            self.record_model(recording=authors[i % AUTHOR_NUM], name='author',
+                              reputation=i)
+            for i in range(RECORD_NUM)
+        ])
+
+        # Spread records over two years, with some of them created at once.
+        for record in self.record_model.objects.all():
+            self.record_model.objects.filter(pk=record.pk).update(
+                created=START + timedelta(minutes=randint(0, 60 * 24 * 700))
+            )
+
+        self.records = self.record_model.objects.all()
+
+    def tearDown(self):
+        Author.objects.all().delete()
+
+    def resample_with_pandas(self, rule, records=None):
+        records = self.records if records is None else records
+        df = pd.DataFrame.from_records(
+            list(records.order_by('created', 'pk').values('pk', 'created'))
+        )
+        return set(df.set_index('created').resample(rule).last()['pk']
+                   .dropna().astype(int))
+
+    def assert_resampled_like_pandas(self, rule):
+        self.assertEqual(
+            set(self.records.resample(rule).values_list('pk', flat=True)),
+            self.resample_with_pandas(rule)
+        )
+
+    def test_resample_fixed_frequencies(self):
+        for rule in ['15T', 'H', '6H', 'D']:
+            self.assert_resampled_like_pandas(rule)
+
+    def test_resample_calendar_frequencies(self):
+        for rule in ['W', 'M', 'MS', 'A']:
+            self.assert_resampled_like_pandas(rule)
+
+    def test_resample_without_window_functions(self):
+        supports_window_functions = resampling.supports_window_functions
+        resampling.supports_window_functions = lambda connection: False
+
+        try:
+            # Records are spread regardless of their primary keys, so the
+            # latest record of a bucket is rarely the greatest primary key.
+            for rule in ['D', 'M']:
+                self.assert_resampled_like_pandas(rule)
+
+        finally:
+            resampling.supports_window_functions = supports_window_functions
+
+    def test_resample_by_recording(self):
+        resampled = self.records.resample('M', by='recording')
+        self.assertEqual(resampled.count(), sum(
+            len(self.resample_with_pandas('M', author.records.all())) for
+            author in Author.objects.all()
+        ))
+
+        for author in Author.objects.all():
+            self.assertEqual(
+                set(resampled.filter(recording=author)
+                    .values_list('pk', flat=True)),
+                self.resample_with_pandas('M', author.records.all())
+            )
+
+        self.assertEqual(
+            set(self.records.resample('M', by=['recording', 'name'])),
+            set(resampled)
+        )
+
+    def test_resample_by_recording_in_single_query(self):
+        with self.assertNumQueries(1):
+            list(self.records.resample('D', by='recording'))
+
+    def test_resample_lazily_in_single_query(self):
+        with self.assertNumQueries(0):
+            resampled = self.records.filter(reputation__gte=10).resample('D')
+
+        with self.assertNumQueries(1):
+            records = list(resampled)
+
+        self.assertTrue(all(record.reputation >= 10 for record in records))
+        self.assertTrue(0 < len(records) < RECORD_NUM)
+
+    def test_day_buckets(self):
+        self.assertIn('/ 86400', get_bucket_sql(connection, 'created', 'D'))
+        self.assertIn('/ 172800', get_bucket_sql(connection, 'created', '2D'))
+
+    def test_unsupported_rules(self):
+        for rule in ['2M', '500L']:
+            with self.assertRaises(ValueError):
+                get_bucket_sql(connection, 'created', rule)
@@ -0,0 +1,84 @@
+from django.test import TestCase
+
+from faker import Faker
+
+from ..snapshots import get_snapshot_columns
+from .models import NAME_MAX_LENGTH
+from .models import Author, CommentRecord
+
+
+f = Faker()
+AUTHOR_NUM = 5
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        for _ in range(AUTHOR_NUM):
+            Author.objects.create(name=f.name()[:NAME_MAX_LENGTH])
+
+        self.record_model = Author.objects.first().records.model
+
+    def tearDown(self):
+        Author.objects.all().delete()
+
+    def test_snapshot_columns(self):
+        self.assertEqual(
+            [name for name, _, _ in get_snapshot_columns(self.record_model)],
+            ['name', 'email', 'reputation']
+        )
+
+        # Properties can't be snapshotted in SQL.
+        with self.assertRaises(ValueError):
+            get_snapshot_columns(CommentRecord)
+
+    def test_snapshot_queryset_in_single_query(self):
+        number_of_records_before_snapshot = self.record_model.objects.count()
+
+        with self.assertNumQueries(1):
+            count = self.record_model.snapshot_queryset(Author.objects.all())
+
+        self.assertEqual(count, AUTHOR_NUM)
+        self.assertEqual(
+            number_of_records_before_snapshot + AUTHOR_NUM,
+            self.record_model.objects.count()
+        )
+
+        author = Author.objects.first()
+        r = author.records.latest()
+        self.assertEqual(r.name, author.name)
+        self.assertEqual(r.email, author.email)
+        self.assertEqual(r.reputation, author.reputation)
+
+    def test_snapshot_only_changed(self):
+        self.assertEqual(
+            self.record_model.snapshot_queryset(Author.objects.all(),
+                                                only_changed=True), 0
+        )
+
+        # Null values are compared null-safely.
+        Author.objects.filter(pk=Author.objects.first().pk) \
+            .update(email='author@example.com')
+        Author.objects.filter(pk=Author.objects.last().pk) \
+            .update(reputation=10)
+
+        self.assertEqual(
+            self.record_model.snapshot_queryset(Author.objects.all(),
+                                                only_changed=True), 2
+        )
+        self.assertEqual(
+            Author.objects.last().records.latest().reputation, 10
+        )
+        self.assertEqual(
+            self.record_model.snapshot_queryset(Author.objects.all(),
+                                                only_changed=True), 0
+        )
+
+    def test_snapshot_filtered_queryset(self):
+        author = Author.objects.first()
+
+        self.assertEqual(
+            self.record_model.snapshot_queryset(
+                Author.objects.filter(pk=author.pk)
+            ), 1
+        )
+        self.assertEqual(author.records.count(), 2)
@@ -5,7 +5,7 @@ from faker import Faker
 
 from .models import TITLE_MAX_LENGTH, POINT_MAX_LENGTH, TEXT_MAX_LENGTH
 from .models import Article, Comment
-from ..utils import resample_records
+from ..utils import fingerprint, resample_records
 
 f = Faker()
 
@@ -39,3 +39,12 @@ class UtilsTest(TestCase):
         self.assertTrue(record_count_before_resampling >
                         record_count_after_resampling)
         self.assertEqual(record_count_after_resampling, 1)
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint([1, 'a', None]),
+                         fingerprint([1, 'a', None]))
+        self.assertEqual(len(fingerprint([1.5, 'text'])), 40)
+
+        self.assertNotEqual(fingerprint([1, 'a']), fingerprint([1, 'b']))
+        self.assertNotEqual(fingerprint(['ab', 'c']), fingerprint(['a', 'bc']))
+        self.assertNotEqual(fingerprint([None]), fingerprint(['None']))
@@ -3,3 +3,17 @@ from .test_mixins import *
 from .test_utils import *
 from .test_queryset import *
 from .test_endurability import *
+from .test_registry import *
+from .test_audit import *
+from .test_batch import *
+from .test_backends import *
+from .test_snapshots import *
+from .test_expressions import *
+from .test_resampling import *
+from .test_export import *
+from .test_indexes import *
+from .test_as_of import *
+from .test_deltas import *
+from .test_compaction import *
+from .test_dedup import *
+from .test_partitions import *
@@ -0,0 +1,37 @@
+# Stands for options not overridden by RecordMeta of record models.
+DEFAULT = object()
+
+
+class override_record_meta(object):
+    """Overrides options of RecordMeta of a record model, and restores them
+    when disabled.
+
+    Usable as a context manager, or enabled in `setUp()` of test cases along
+    with `self.addCleanup(override.disable)`.
+    """
+    def __init__(self, record_model, **options):
+        self.record_meta = record_model.RecordMeta
+        self.options = options
+        self.former = {}
+
+    def enable(self):
+        for name, value in self.options.items():
+            self.former[name] = self.record_meta.__dict__.get(name, DEFAULT)
+            setattr(self.record_meta, name, value)
+
+    def disable(self):
+        for name, value in self.former.items():
+            # Options inherited from `RecordModel.RecordMeta` are inherited
+            # again.
+            if value is DEFAULT:
+                delattr(self.record_meta, name)
+            else:
+                setattr(self.record_meta, name, value)
+        self.former = {}
+
+    def __enter__(self):
+        self.enable()
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
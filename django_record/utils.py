@@ -1,8 +1,70 @@
-import pandas as pd
+import hashlib
+
+from django.db.models import Model
+from django.utils.encoding import force_bytes
+
+from .resampling import resample_queryset
+
+
+# Separates digested values, and stands for `None` values respectively.
+FINGERPRINT_SEPARATOR = b'\x1f'
+FINGERPRINT_NONE = b'\x00'
+
+
+def chunked(iterable, size):
+    """Yields lists of items of an iterable in chunks.
+
+    Args:
+        iterable (iterable): Items to be chunked.
+        size (int): Maximum number of items in a chunk.
+    """
+    chunk = []
+
+    for item in iterable:
+        chunk.append(item)
+
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def get_comparable_value(value):
+    """Returns a recorded value to be compared with others.
+
+    Args:
+        value: A recorded value. Model instances are compared by their primary
+            keys, as related fields are fetched by `values()`.
+    """
+    return value.pk if isinstance(value, Model) else value
+
+
+def fingerprint(values):
+    """Returns a stable SHA-1 hex digest of values.
+
+    Args:
+        values (iterable): Primitive values to be digested in order. Floats are
+            digested with their `repr()` to avoid precision loss.
+    """
+    digest = hashlib.sha1()
+
+    for value in values:
+        if value is None:
+            digest.update(FINGERPRINT_NONE)
+        elif isinstance(value, float):
+            digest.update(force_bytes(repr(value)))
+        else:
+            digest.update(force_bytes(value))
+
+        digest.update(FINGERPRINT_SEPARATOR)
+
+    return digest.hexdigest()
 
 
 def resample_records(records, rule):
-    """Resamples records with pandas DataFrame.resample()
+    """Resamples records with pandas resampling rules.
 
     Args:
          records (django queryset): Ordinary django queryset to be resampled
@@ -12,12 +74,4 @@ def resample_records(records, rule):
             within hours, for example, are possible. See pandas docs for further
             details.
     """
-    # Return empty queryset itself if given records queryset is empty.
-    if not records.exists():
-        return records.none()
-
-    # Otherwise return resampled queryset.
-    df = pd.DataFrame.from_records(list(records.all().values()))
-    df = df.set_index('created')
-    df = df.resample(rule, how='last')
-    return records.filter(id__in=df['id'])
+    return resample_queryset(records, rule)
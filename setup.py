@@ -14,7 +14,11 @@ VERSION = '%s.%s.%s' % (MAJOR, MINOR, MICRO)
 
 setup(
     name='django-record',
-    packages=['django_record'],
+    packages=[
+        'django_record',
+        'django_record.management',
+        'django_record.management.commands',
+    ],
     version=VERSION,
     description='Models and mixins for recording changes in Django models',
     long_description=long_description,